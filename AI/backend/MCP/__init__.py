@@ -1,3 +1,3 @@
-from .server import  intent_classification, retrive_infor_company, get_reflection
+from .server import  intent_classification, retrive_infor_company, retrive_job_postings, get_reflection
 
-__all__ = ["intent_classification", "retrive_infor_company", "get_reflection"]
\ No newline at end of file
+__all__ = ["intent_classification", "retrive_infor_company", "retrive_job_postings", "get_reflection"]
\ No newline at end of file
@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 from pathlib import Path
 
 # Add the backend directory to Python path
@@ -10,6 +11,7 @@ from mcp.server.fastmcp import FastMCP
 
 from typing import List, Dict, Any
 from setting import Settings
+from llms.concurrency import OllamaOverloadedError
 
 
 # 1️⃣ Tạo server
@@ -75,10 +77,9 @@ def get_reflection(history: List[Dict[str, str]]) -> str:
     # Sử dụng LLM Manager thay vì tạo instance mới
     default_url = "http://host.docker.internal:11434" if os.getenv("DOCKER_ENV") == "true" else "http://localhost:11434"
     ollama_url = os.getenv("OLLAMA_URL", settings.OLLAMA_BASE_URL or default_url)
-    ollama_model = settings.OLLAMA_MODEL
     
-    # Reuse existing LLM instance từ manager
-    llm = llm_manager.get_ollama_client(base_url=ollama_url, model_name=ollama_model)
+    # Reuse existing LLM instance từ manager (model tier "reflection")
+    llm = llm_manager.get_tier_client("reflection", base_url=ollama_url)
     reflection = Reflection(llm=llm)
     
     try:
@@ -87,23 +88,30 @@ def get_reflection(history: List[Dict[str, str]]) -> str:
                 improved_answer = improved_answer.split("</think>")[-1].strip()
         print("Reflection completed.", {"improved_answer": improved_answer})
         return improved_answer
+    except OllamaOverloadedError:
+        raise
     except Exception as e:
         print(f"❌ Error in reflection process: {str(e)}")
         return "Error in reflection process."
     
 @server.tool()
-def retrive_infor_company(query: str) -> List[Dict[str, Any]]:
+def retrive_infor_company(query: str, features: Dict[str, Any] = None) -> List[Dict[str, Any]]:
     """
     Truy xuất thông tin công ty từ Qdrant dựa trên câu hỏi của user
     Args:
         query: câu hỏi của user
+        features: các trường đã trích xuất (location, company) để lọc trong Qdrant
     Returns:
         List[Dict]: danh sách công ty liên quan
-    from tool.model_manager import model_manager
     """
     from tool.model_manager import model_manager
+    from tool.retrieval.filters import FeatureFilterCompiler
+    from tool.embeddings.company import _build_company_text
     
+    started_at = time.perf_counter()
     try:
+        reranker = model_manager.get_reranker()
+
         # Lấy embedding model từ cache
         embedding_model = model_manager.get_embedding_model()
         
@@ -113,12 +121,15 @@ def retrive_infor_company(query: str) -> List[Dict[str, Any]]:
         
         # Tạo vector từ câu hỏi
         query_vector = embedding_model.encode(query)
+        if hasattr(query_vector, "tolist"):
+            query_vector = query_vector.tolist()
         
-        # Tìm kiếm trong Qdrant
+        # Tìm kiếm trong Qdrant (filter location/company chạy trong Qdrant)
         results = qdrant_client.search_vectors(
-            collection_name="companies",
+            collection_name=settings.COLLECTION_COMPANY,
             query_vector=query_vector,
-            top_k=5
+            top_k=settings.RERANK_CANDIDATES if reranker else settings.RERANK_TOP_K,
+            query_filter=FeatureFilterCompiler().compile_company_filter(features),
         )
         
         # Trích xuất thông tin công ty từ kết quả
@@ -127,6 +138,16 @@ def retrive_infor_company(query: str) -> List[Dict[str, Any]]:
             payload = res.payload
             if payload:
                 companies.append(payload)
+
+        # Rerank top-N bằng cross-encoder (bỏ qua nếu vượt latency budget)
+        if reranker:
+            companies = reranker.rerank(
+                query,
+                companies,
+                text_fn=_build_company_text,
+                top_k=settings.RERANK_TOP_K,
+                started_at=started_at,
+            )
         
         print(f"✅ Retrieved {len(companies)} companies related to the query.")
         return companies
@@ -136,6 +157,45 @@ def retrive_infor_company(query: str) -> List[Dict[str, Any]]:
         return []
 
 
+@server.tool()
+def retrive_job_postings(query: str, features: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """
+    Truy xuất các tin tuyển dụng đang mở từ Qdrant (hybrid dense + keyword search)
+    Args:
+        query: câu hỏi của user
+        features: các trường đã trích xuất bởi ExtractFeatureQuestion (title, location, experience, ...)
+    Returns:
+        List[Dict]: danh sách job posting phù hợp
+    """
+    from tool.model_manager import model_manager
+    from tool.retrieval import job_passage
+
+    started_at = time.perf_counter()
+    try:
+        job_searcher = model_manager.get_job_searcher()
+        reranker = model_manager.get_reranker()
+        top_k = settings.RERANK_CANDIDATES if reranker else settings.JOB_SEARCH_TOP_K
+        if features:
+            jobs = job_searcher.search_by_features(features, query=query, top_k=top_k)
+        else:
+            jobs = job_searcher.search(query, top_k=top_k)
+
+        if reranker:
+            jobs = reranker.rerank(
+                query,
+                jobs,
+                text_fn=job_passage,
+                top_k=settings.JOB_SEARCH_TOP_K,
+                started_at=started_at,
+            )
+
+        print(f"✅ Retrieved {len(jobs)} job postings related to the query.")
+        return jobs
+
+    except Exception as e:
+        print(f"❌ Error retrieving job postings: {str(e)}")
+        return []
+
 
 # 3️⃣ Chạy server qua STDIO
 if __name__ == "__main__":
@@ -13,7 +13,8 @@ sys.path.insert(0, str(backend_dir))
 from setting import Settings
 from tool.model_manager import model_manager
 from tool.embeddings.company import sync_company_embeddings
-from llms.ollama_llms import OllamaLLMs
+from tool.embeddings.job import sync_job_embeddings
+from llms.llm_manager import llm_manager
 
 def startup_optimization():
     """
@@ -43,16 +44,32 @@ def startup_optimization():
             print(f"✅ Company embeddings synced: {upserted} items into '{collection}'")
         except Exception as e:
             print(f"⚠️ Company embedding sync skipped: {e}")
+
+        # Đồng bộ tin tuyển dụng vào Qdrant (dense + keyword)
+        try:
+            sync_summary = sync_job_embeddings(settings=settings)
+            upserted = sync_summary.get("upserted", 0)
+            collection = sync_summary.get("collection")
+            print(f"✅ Job embeddings synced: {upserted} items into '{collection}'")
+        except Exception as e:
+            print(f"⚠️ Job embedding sync skipped: {e}")
         
-        # Preload và warm-up Ollama model
+        # Preload và warm-up các Ollama model (mỗi model của các tier một lần)
         try:
-            ollama_model = OllamaLLMs(
-                base_url=settings.OLLAMA_BASE_URL,
-                model_name=settings.OLLAMA_MODEL
-            )
-            # Set keep-alive để model không bị unload
-            ollama_model.keep_alive(settings.MODEL_KEEP_ALIVE)
-            print(f"✅ Ollama model warmed up: {settings.OLLAMA_MODEL}")
+            residency = llm_manager.start_residency(base_url=settings.OLLAMA_BASE_URL)
+            if residency is not None:
+                # Warm-up song song, sau đó thread nền gia hạn keep_alive định kỳ
+                for model in residency.status()["models"]:
+                    print(f"{'✅' if model['resident'] else '⚠️'} Ollama model {model['model']} @ {model['base_url']}: resident={model['resident']}")
+            else:
+                for model_name in sorted(set(llm_manager.tier_models(settings).values())):
+                    ollama_model = llm_manager.get_ollama_client(
+                        base_url=settings.OLLAMA_BASE_URL,
+                        model_name=model_name
+                    )
+                    # Set keep-alive để model không bị unload
+                    ollama_model.keep_alive(settings.MODEL_KEEP_ALIVE)
+                    print(f"✅ Ollama model warmed up: {model_name}")
         except Exception as e:
             print(f"⚠️ Ollama warm-up failed: {e}")
         
@@ -5,7 +5,9 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from setting import Settings
+from llms.label_classifier import LabelClassifier
 from llms.llm_manager import llm_manager
+from llms.utils import strip_think
 from prompt.promt_config import PromptConfig
 
 class Agent():
@@ -14,37 +16,38 @@ class Agent():
         self.llm_manager = llm_manager
         default_url = "http://host.docker.internal:11434" if os.getenv("DOCKER_ENV") == "true" else "http://localhost:11434"
         ollama_url = os.getenv("OLLAMA_URL",  self.Settings.OLLAMA_BASE_URL or default_url)
-        self.client = llm_manager.get_ollama_client(
-            base_url=ollama_url,
-            model_name=self.Settings.OLLAMA_MODEL
-        )
+        self.client = llm_manager.get_tier_client("extraction", base_url=ollama_url)
+        self.classification_client = llm_manager.get_tier_client("classification", base_url=ollama_url)
         self.current_message = []
         self.last_message = []
         self.prompt_config = PromptConfig()
+        self.intent_classifier = LabelClassifier(
+            self.classification_client,
+            ("intent_jd", "intent_company_info", "intent_chitchat"),
+            default="intent_chitchat",
+            stage="classification_agent_intent",
+            field="intent",
+            use_logprobs=self.Settings.INTENT_LOGPROBS,
+        )
     
     def _strip_think(self, text: str) -> str:
         """Remove <think>...</think> sections and trim whitespace."""
-        if not text:
-            return text
-        # Support nested or multiple occurrences
-        import re
-        cleaned = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
-        return cleaned.strip()
+        return strip_think(text)
     
     def classify_intent(self, message: str) -> str:
-        classification_prompt = self.prompt_config.get_prompt("classification_agent_intent", user_input=message)
-        intent = self.client.generate_content([{"role": "user", "content": classification_prompt}])
-        intent = self._strip_think(intent)
+        classification_messages = self.prompt_config.get_messages("classification_agent_intent", user_input=message)
+        choice = self.intent_classifier.classify(classification_messages)
         message = {
             "message": message,
-            "intent": intent
+            "intent": choice.label,
+            "score": choice.score
         }
         return message
     
     def extract_feature_question(self, message) -> str:
         if(message["intent"] == "intent_jd"):
-            feature_prompt = self.prompt_config.get_prompt("extract_feature_question_about_jd", user_input=message["message"])
-            feature = self.client.generate_content([{"role": "user", "content": feature_prompt}])
+            feature_messages = self.prompt_config.get_messages("extract_feature_question_about_jd", user_input=message["message"])
+            feature = self.client.generate_content(feature_messages, stage="extract_feature_question_about_jd")
             return feature
         
         
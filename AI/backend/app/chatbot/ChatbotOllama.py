@@ -5,76 +5,143 @@ from .base import BaseAI
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from setting import Settings
+from llms.concurrency import OllamaOverloadedError
+from llms.label_classifier import LabelClassifier
 from llms.llm_manager import llm_manager
+from llms.utils import strip_think
 from prompt.promt_config import PromptConfig
-from MCP import get_reflection, retrive_infor_company
+from tool.conversation_history import ConversationHistory
+from tool.model_manager import model_manager
+from tool.question_enhancer import QuestionEnhancer
+from tool.retrieval import COMPANY_FIELDS, JOB_FIELDS, ContextBuilder, estimate_tokens
+from tool.text_normalizer import normalize_key
+from monitoring.metrics import INTENTS
+from monitoring.tracing import current_span, span, traced
+from MCP import get_reflection, retrive_infor_company, retrive_job_postings
+
+
+# Intent labels của prompt classification_chat_intent (enum của constrained decoding + nhãn metric)
+KNOWN_INTENTS = (
+    "intent_chitchat",
+    "intent_incomplete_recruitment_question",
+    "intent_jd",
+    "intent_review_cv",
+    "intent_suggest_job",
+    "intent_candidate",
+    "intent_company_info",
+    "intent_guide",
+    "intent_feedback",
+)
+
+# Câu gốc có nhắc tới công ty -> prefetch retrive_infor_company trong lúc chờ reflection (dạng normalize_key)
+COMPANY_HINTS = ("cong ty", "cty", "company", "doanh nghiep")
+# Câu gốc có dấu hiệu tìm việc -> mới dựng feature extractor (nạp từ điển kỹ năng) để prefetch job
+JOB_HINTS = ("viec", "job", "tuyen")
 
 
 class ChatbotOllama(BaseAI):
-    def __init__(self, model_name: str = "", **kwargs):
+    def __init__(self, model_name: str = "", session_id: str = None, **kwargs):
         settings = Settings.load_settings()
-        resolved_model = model_name or settings.OLLAMA_MODEL
+        resolved_model = model_name or llm_manager.model_for_tier("answer", settings)
+        kwargs.setdefault("history", ConversationHistory.from_settings(settings, session_id=session_id))
 
         super().__init__(model_name=resolved_model, **kwargs)
 
         default_url = "http://host.docker.internal:11434" if os.getenv("DOCKER_ENV") == "true" else "http://localhost:11434"
         ollama_url = os.getenv("OLLAMA_URL", settings.OLLAMA_BASE_URL or default_url)
 
-        # Sử dụng LLM Manager để tránh tạo multiple instances
+        # Sử dụng LLM Manager để tránh tạo multiple instances; câu trả lời cuối chạy model tier "answer"
         self.client = llm_manager.get_ollama_client(
             base_url=ollama_url,
             model_name=resolved_model
         )
+        # Phân loại intent chạy model tier "classification" (có thể là model nhỏ hơn)
+        self.classification_client = llm_manager.get_tier_client("classification", base_url=ollama_url)
         
         # Initialize the feature extractor (chỉ tạo khi cần)
         self._feature_extractor = None
-        self._ollama_model = resolved_model
         
         # Initialize prompt config
         self.prompt_config = PromptConfig()
+        self.intent_classifier = LabelClassifier(
+            self.classification_client,
+            KNOWN_INTENTS,
+            default="intent_chitchat",
+            stage="classification_chat_intent",
+            field="intent",
+            use_logprobs=settings.INTENT_LOGPROBS,
+        )
+        self.question_enhancer = QuestionEnhancer()
+        # None khi ENABLE_SPECULATIVE_RETRIEVAL tắt
+        self.speculative_retriever = model_manager.get_speculative_retriever()
+        # None khi ENABLE_REFLECTION_GATE tắt: mọi lượt đều chạy reflection
+        self.reflection_gate = model_manager.get_reflection_gate()
+
+        # Context builders: dedupe + truncate + pack retrieved payloads under a token budget
+        self.company_context = ContextBuilder(
+            COMPANY_FIELDS,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            field_max_chars=settings.CONTEXT_FIELD_MAX_CHARS,
+        )
+        self.job_context = ContextBuilder(
+            JOB_FIELDS,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            field_max_chars=settings.CONTEXT_FIELD_MAX_CHARS,
+            id_keys=("job_posting_id",),  # nhiều tin của cùng một công ty là các job khác nhau
+        )
+
+
+    @property
+    def feature_extractor(self):
+        """Lazily create the feature extractor (chỉ tạo khi có câu hỏi intent_jd)"""
+        if self._feature_extractor is None:
+            from tool.extract_feature_question_about_jd import ExtractFeatureQuestion
+            self._feature_extractor = ExtractFeatureQuestion()  # model tier "extraction"
+        return self._feature_extractor
 
-    
     def _strip_think(self, text: str) -> str:
         """Remove <think>...</think> sections and trim whitespace."""
-        if not text:
-            return text
-        # Support nested or multiple occurrences
-        import re
-        cleaned = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
-        return cleaned.strip()
+        return strip_think(text)
 
     def add_assistant_message(self, message: str):  # override to clean
         super().add_assistant_message(self._strip_think(message))
     
 
     def chat(self, message: str, include_history: bool = True) -> str:
-        self.add_user_message(message)
+        pending = self.add_user_message(message)
         
         # Prepare messages for Ollama API
         if include_history:
-            messages = self.conversation_history.copy()
+            messages = self.conversation_history.prompt_messages()
         else:
             messages = [{"role": "user", "content": message}]
         
+        speculation = None
         try:
-            
-
-            summarise_convervation = get_reflection(messages)
+            speculation = self._start_speculation(message)
+            with span("reflection") as reflection_span:
+                if self.reflection_gate is not None:
+                    summarise_convervation, decision = self.reflection_gate.rewrite(messages, get_reflection)
+                    reflection_span.set_attribute("skipped", decision.skip)
+                    reflection_span.set_attribute("gate_reason", decision.reason)
+                else:
+                    summarise_convervation = get_reflection(messages)
             self.clear_conversation_state()  # Clear state before processing new message
-            self.add_user_message(summarise_convervation)  # Add summarized message to history
-            classification_prompt = self.prompt_config.get_prompt("classification_chat_intent", user_input=summarise_convervation)
-            intent = self._strip_think(self.client.generate_content([{"role": "user", "content": classification_prompt}]))
-            print(f"Intent classified as: {intent}")
+            # Gắn câu đã viết lại vào chính bản ghi user (không thêm message user thứ hai)
+            self.conversation_history.set_rewrite(summarise_convervation)
+            intent = self.classify_intent(summarise_convervation)
+            INTENTS.labels(intent if intent in KNOWN_INTENTS else "other").inc()
+            logging.debug("Intent classified as: %s", intent)
             
             if intent == "intent_chitchat":
-                chitchat_prompt = self.prompt_config.get_prompt("intent_chitchat", user_input=summarise_convervation)
-                assistant_response = self._strip_think(self.client.generate_content([{"role": "user", "content": chitchat_prompt}]))
+                chitchat_messages = self.prompt_config.get_messages("intent_chitchat", user_input=summarise_convervation)
+                assistant_response = self._strip_think(self.client.generate_content(chitchat_messages, stage="intent_chitchat"))
                 self.add_assistant_message(assistant_response)
                 return assistant_response
                 
             elif intent == "intent_incomplete_recruitment_question":
-                incomplete_prompt = self.prompt_config.get_prompt("recruitment_incomplete", user_input=summarise_convervation)
-                assistant_response = self._strip_think(self.client.generate_content([{"role": "user", "content": incomplete_prompt}]))
+                incomplete_messages = self.prompt_config.get_messages("recruitment_incomplete", user_input=summarise_convervation)
+                assistant_response = self._strip_think(self.client.generate_content(incomplete_messages, stage="recruitment_incomplete"))
                 self.add_assistant_message(assistant_response)
                 return assistant_response
                 
@@ -83,22 +150,36 @@ class ChatbotOllama(BaseAI):
                     # Extract job features from the user's message
                     extracted_features = self.feature_extractor.extract(
                         query=summarise_convervation,
-                        prompt_type="extract_features_question_about_job"
+                        prompt_type="extract_feature_question_about_jd"
                     )
                     
                     if extracted_features:
-                        # Process the extracted features and generate response
+                        # Retrieve matching open job postings and answer from them
                         features_text = self._format_extracted_features(extracted_features)
-                        assistant_response = f"Tôi đã hiểu yêu cầu của bạn:\n{features_text}\n\nTôi sẽ tìm kiếm các công việc phù hợp cho bạn."
+                        with span("retrieval", intent=intent) as retrieval_span:
+                            data_jobs = speculation.take("jobs", summarise_convervation, extracted_features) if speculation else None
+                            retrieval_span.set_attribute("speculative", data_jobs is not None)
+                            if data_jobs is None:
+                                data_jobs = retrive_job_postings(summarise_convervation, extracted_features)
+                        messages_jobs = self._build_retrieval_messages(
+                            "intent_jd",
+                            self.job_context,
+                            summarise_convervation,
+                            data_jobs,
+                            features=features_text,
+                        )
+                        assistant_response = self._strip_think(self.client.generate_content(messages_jobs, stage="intent_jd"))
                         self.add_assistant_message(assistant_response)
                         return assistant_response
                     else:
                         # Fallback if no features extracted
-                        incomplete_prompt = self.prompt_config.get_prompt("recruitment_incomplete", user_input=summarise_convervation)
-                        assistant_response = self._strip_think(self.client.generate_content([{"role": "user", "content": incomplete_prompt}]))
+                        incomplete_messages = self.prompt_config.get_messages("recruitment_incomplete", user_input=summarise_convervation)
+                        assistant_response = self._strip_think(self.client.generate_content(incomplete_messages, stage="recruitment_incomplete"))
                         self.add_assistant_message(assistant_response)
                         return assistant_response
                         
+                except OllamaOverloadedError:
+                    raise
                 except Exception as extraction_error:
                     logging.error(f"Error in feature extraction: {str(extraction_error)}")
                     # Fallback to normal generation
@@ -126,9 +207,16 @@ class ChatbotOllama(BaseAI):
                 
             elif intent == "intent_company_info":
                 # Handle company information requests
-                data_company = retrive_infor_company(summarise_convervation)
-                prompt_company = self.prompt_config.get_prompt("intent_company_info", user_input=summarise_convervation, data = data_company)
-                assistant_response = self._strip_think(self.client.generate_content([{"role": "user", "content": prompt_company}]))
+                company_features = self._company_features(summarise_convervation)
+                with span("retrieval", intent=intent) as retrieval_span:
+                    data_company = speculation.take("companies", summarise_convervation, company_features) if speculation else None
+                    retrieval_span.set_attribute("speculative", data_company is not None)
+                    if data_company is None:
+                        data_company = retrive_infor_company(summarise_convervation, company_features)
+                messages_company = self._build_retrieval_messages(
+                    "intent_company_info", self.company_context, summarise_convervation, data_company
+                )
+                assistant_response = self._strip_think(self.client.generate_content(messages_company, stage="intent_company_info"))
                 self.add_assistant_message(assistant_response)
                 return assistant_response
                 
@@ -149,10 +237,62 @@ class ChatbotOllama(BaseAI):
             self.add_assistant_message(assistant_response)
             return assistant_response
             
+        except OllamaOverloadedError:
+            # Để /api/chat trả 429 + Retry-After thay vì một câu trả lời lỗi; lượt này chưa
+            # được trả lời nên bỏ câu user (và rewrite) để client gửi lại không bị lặp
+            self.conversation_history.discard(pending)
+            raise
         except Exception as e:
             error_msg = f"Error communicating with Ollama: {str(e)}"
             self.add_assistant_message(error_msg)
             return error_msg
+        finally:
+            if speculation:
+                speculation.discard()
+
+    def _start_speculation(self, message: str):
+        """
+        Prefetch retrieval từ câu gốc, chạy song song với reflection + classification.
+
+        Chỉ prefetch khi filter đoán được không cần LLM: công ty khi câu nhắc tới
+        công ty, job khi rule-based extractor giải thích được toàn bộ câu. Kết quả
+        chỉ được dùng nếu câu sau reflection đủ giống câu gốc (xem SpeculativeTurn.take).
+        Feature extractor chỉ được dựng khi câu có dấu hiệu tìm việc, nên các lượt
+        chitchat không phải nạp từ điển kỹ năng.
+        """
+        if self.speculative_retriever is None:
+            return None
+
+        fetchers, features = {}, {}
+        key = normalize_key(message)
+        if any(hint in key for hint in COMPANY_HINTS):
+            features["companies"] = self._company_features(message)
+            fetchers["companies"] = lambda: retrive_infor_company(message, features["companies"])
+
+        if any(hint in key for hint in JOB_HINTS) or self.question_enhancer.extract_slots(message):
+            job_features = self.feature_extractor.rule_features(message)
+            if job_features:
+                features["jobs"] = job_features
+                fetchers["jobs"] = lambda: retrive_job_postings(message, job_features)
+
+        if not fetchers:
+            return None
+        return self.speculative_retriever.start(message, fetchers, features)
+
+    def _build_retrieval_messages(self, prompt_name: str, context_builder: ContextBuilder, query: str, documents: list, **kwargs) -> list:
+        """Format a retrieval prompt (system instructions + packed context) and log the prompt size before/after packing"""
+        packed = context_builder.build(query, documents)
+        messages = self.prompt_config.get_messages(prompt_name, user_input=query, data=packed, **kwargs)
+
+        packed_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        raw_tokens = packed_tokens - estimate_tokens(packed) + estimate_tokens(str(documents))
+        logging.info(f"{prompt_name} prompt tokens (estimated): {raw_tokens} -> {packed_tokens} after packing")
+        return messages
+
+    def _company_features(self, message: str) -> dict:
+        """Cheap (no LLM) features used to filter the company search inside Qdrant"""
+        locations = self.question_enhancer.extract_locations(message)
+        return {"location": ", ".join(locations)} if locations else {}
 
     def _format_extracted_features(self, features: dict) -> str:
         """Format extracted features for user display"""
@@ -172,12 +312,16 @@ class ChatbotOllama(BaseAI):
             
         if "experience" in features:
             formatted_parts.append(f"• Kinh nghiệm: {features['experience']}")
+
+        if "salary" in features:
+            formatted_parts.append(f"• Mức lương: {features['salary']}")
             
         if "description" in features:
             formatted_parts.append(f"• Mô tả: {features['description']}")
         
         return "\n".join(formatted_parts) if formatted_parts else "Thông tin yêu cầu tuyển dụng của bạn"
 
+    @traced("classify_intent")
     def classify_intent(self, message: str) -> str:
         """
         Classify the intent of a user message using the LLM
@@ -189,10 +333,15 @@ class ChatbotOllama(BaseAI):
             The classified intent as a string
         """
         try:
-            # Use the LLM to classify the intent
-            classification_prompt = self.prompt_config.get_prompt("classification_chat_intent", user_input=message)
-            intent = self._strip_think(self.client.generate_content([{"role": "user", "content": classification_prompt}]))
-            return intent.strip()
+            # Constrained decoding: output luôn là một nhãn trong KNOWN_INTENTS
+            classification_messages = self.prompt_config.get_messages("classification_chat_intent", user_input=message)
+            choice = self.intent_classifier.classify(classification_messages)
+            current_span().set_attribute("intent_score", choice.score)
+            if not choice.valid:
+                logging.warning("Intent classifier returned no valid label, using %s", choice.label)
+            return choice.label
+        except OllamaOverloadedError:
+            raise
         except Exception as e:
             logging.error(f"Error in intent classification: {str(e)}")
             # Return a default intent in case of error
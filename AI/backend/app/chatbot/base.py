@@ -1,30 +1,32 @@
 
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from tool.conversation_history import ConversationHistory
 
 
 class BaseAI(ABC):
-    def __init__(self, model_name: str = None, **kwargs):
+    def __init__(self, model_name: str = None, history: Optional[ConversationHistory] = None, **kwargs):
         self.model_name = model_name
-        self.conversation_history = []
+        self.conversation_history = history if history is not None else ConversationHistory()
         self.conversation_state = "idle"  # idle, waiting_for_location, waiting_for_skills, etc.
         self.recruitment_context = {}  # Store recruitment-related information
     
     def add_system_message(self, message: str):
-        self.conversation_history.append({"role": "system", "content": message})
+        self.conversation_history.append("system", message)
         
     def add_user_message(self, message: str):
-        self.conversation_history.append({"role": "user", "content": message})
+        return self.conversation_history.append("user", message)
     
     def add_assistant_message(self, message: str):
-        self.conversation_history.append({"role": "assistant", "content": message})
+        self.conversation_history.append("assistant", message)
         
     @abstractmethod
     def classify_intent(self, message: str) -> str:
         pass
     
     def clear_history(self):
-        self.conversation_history = []
+        self.conversation_history.clear()
         self.conversation_state = "idle"
         self.recruitment_context = {}
     
@@ -34,7 +36,7 @@ class BaseAI(ABC):
         self.recruitment_context = {}
 
     def get_history(self) -> List[Dict[str, str]]:
-        return self.conversation_history
+        return self.conversation_history.to_list()
     
     @abstractmethod
     def chat(self, message: str, include_history: bool = True) -> str:
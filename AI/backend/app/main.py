@@ -1,7 +1,7 @@
 """
 Simple Flask app for AI Recruitment System
 """
-from flask import Flask, jsonify, request, render_template, send_from_directory, session
+from flask import Flask, Response, jsonify, request, render_template, send_from_directory, session
 from flask_cors import CORS
 import os
 import sys
@@ -15,7 +15,11 @@ sys.path.insert(0, backend_path)
 
 from chatbot.ChatbotOllama import ChatbotOllama
 from setting import Settings
-from tool.embeddings import sync_company_embeddings
+from tool.embeddings import sync_company_embeddings, sync_job_embeddings
+from monitoring.metrics import ACTIVE_SESSIONS, CHAT_HISTORY_BYTES, CHAT_LATENCY, CHAT_REQUESTS, CONTENT_TYPE_LATEST, render_latest
+from monitoring.tracing import configure_exporter, start_trace
+from llms.concurrency import AdaptiveLimiter, OllamaOverloadedError
+from llms.ollama_pool import session_affinity
 import logging
 
 # Determine template folder path based on environment
@@ -56,6 +60,8 @@ def initialize_llm_client():
             base_url=ollama_url,
             model_name=settings.OLLAMA_MODEL
         )
+        # Warm-up song song model của mọi tier + gia hạn keep_alive định kỳ (MODEL_RESIDENCY_SCHEDULER)
+        llm_manager.start_residency(base_url=ollama_url)
         
         # Simple connection test without generating content
         import requests
@@ -78,6 +84,9 @@ def initialize_llm_client():
 
 llm_client = initialize_llm_client()
 
+app_settings = Settings.load_settings()
+configure_exporter(app_settings.TRACE_EXPORTER)
+
 
 def sync_company_embeddings_on_startup():
     """Ensure company embeddings are refreshed when the app starts."""
@@ -94,10 +103,33 @@ def sync_company_embeddings_on_startup():
         logger.warning("Company embedding sync skipped: %s", exc)
 
 
-sync_company_embeddings_on_startup()
+def sync_job_embeddings_on_startup():
+    """Ensure the job posting index is refreshed when the app starts."""
+    try:
+        settings = Settings.load_settings()
+        summary = sync_job_embeddings(settings=settings)
+        logger.info(
+            "Job embedding sync completed: status=%s collection=%s upserted=%s",
+            summary.get("status"),
+            summary.get("collection"),
+            summary.get("upserted"),
+        )
+    except Exception as exc:  # pragma: no cover - startup resilience
+        logger.warning("Job embedding sync skipped: %s", exc)
+
+
+if app_settings.SYNC_EMBEDDINGS_ON_STARTUP:
+    sync_company_embeddings_on_startup()
+    sync_job_embeddings_on_startup()
+else:
+    logger.info("Startup embedding sync disabled (SYNC_EMBEDDINGS_ON_STARTUP=false)")
 
 # Dictionary to store chatbot instances for each user session
 user_chatbots = {}
+ACTIVE_SESSIONS.set_function(lambda: len(user_chatbots))
+CHAT_HISTORY_BYTES.set_function(
+    lambda: sum(data['chatbot'].conversation_history.memory_bytes for data in list(user_chatbots.values()))
+)
 
 def get_session_id():
     """Get or create session ID for current user"""
@@ -110,7 +142,7 @@ def get_user_chatbot(session_id):
     """Get or create chatbot instance for specific user session"""
     if session_id not in user_chatbots:
         try:
-            chatbot = ChatbotOllama()
+            chatbot = ChatbotOllama(session_id=session_id)
             # chatbot.add_system_message(
             #     "Bạn là một trợ lý thân thiện trong lĩnh vực tuyển dụng. "
             #     "Hãy giúp đỡ ứng viên về việc làm, phỏng vấn và tư vấn nghề nghiệp. "
@@ -135,13 +167,13 @@ def cleanup_inactive_sessions():
     current_time = datetime.now()
     inactive_sessions = []
     
-    for session_id, data in user_chatbots.items():
+    for session_id, data in list(user_chatbots.items()):
         time_diff = current_time - data['last_activity']
         if time_diff.total_seconds() > 3600:  # 1 hour
             inactive_sessions.append(session_id)
     
     for session_id in inactive_sessions:
-        del user_chatbots[session_id]
+        user_chatbots.pop(session_id)['chatbot'].clear_history()  # xóa cả các lượt đã spill ra store
         logger.info(f"Cleaned up inactive session: {session_id}")
     
     return len(inactive_sessions)
@@ -179,6 +211,14 @@ def test_endpoint():
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Chat endpoint for recruitment conversations using ChatbotOllama"""
+    started_at = time.perf_counter()
+    result = _handle_chat()  # (response, status) hoặc (response, status, headers)
+    CHAT_LATENCY.observe(time.perf_counter() - started_at)
+    CHAT_REQUESTS.labels(str(result[1])).inc()
+    return result
+
+
+def _handle_chat():
     try:
         data = request.get_json()
         
@@ -198,8 +238,9 @@ def chat():
             }), 503
         
         try:
-            # Generate response using chatbot
-            response = bot.chat(user_message)
+            # Generate response using chatbot (mỗi request là một trace)
+            with start_trace("chat", session_id=session_id[:8]) as trace, session_affinity(session_id):
+                response = bot.chat(user_message)
             
             # Clean response (remove thinking tags if present)
             if "<think>" in response:
@@ -209,11 +250,24 @@ def chat():
             if len(user_chatbots) > 10:  # Only cleanup when we have many sessions
                 cleanup_inactive_sessions()
             
-            return jsonify({
+            payload = {
                 "response": response,
                 "session_id": session_id,
                 "status": "success"
-            })
+            }
+            if request.headers.get(app_settings.TRACE_DEBUG_HEADER):
+                payload["timings"] = trace.summary()
+
+            return jsonify(payload), 200
+
+        except OllamaOverloadedError as overloaded:
+            # Backpressure: hàng đợi Ollama đầy, client thử lại sau thay vì làm chậm mọi session
+            logger.warning(f"Ollama overloaded: {overloaded}")
+            return jsonify({
+                "error": "The assistant is busy, please retry shortly.",
+                "status": "overloaded",
+                "retry_after": overloaded.retry_after
+            }), 429, {"Retry-After": str(overloaded.retry_after)}
             
         except Exception as llm_error:
             logger.error(f"Chatbot error: {llm_error}")
@@ -240,26 +294,63 @@ def chat():
         }), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
 @app.route('/api/chat/history', methods=['GET'])
 def get_chat_history():
-    """Get conversation history for current user session"""
+    """
+    Get conversation history for current user session
+
+    Query: ``since`` (id của message cuối client đã có) và ``limit``. Response có
+    ETag; ``If-None-Match`` khớp (lịch sử không đổi) thì trả 304 không kèm body.
+    """
     try:
+        since = request.args.get('since', type=int)
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({
+                "error": "limit must be a positive integer",
+                "status": "error"
+            }), 400
+
         session_id = get_session_id()
-        bot = get_user_chatbot(session_id)
-        
-        if bot is None:
+        data = user_chatbots.get(session_id)
+        if data is None:
+            # Chưa chat lần nào: không tạo chatbot chỉ để trả về lịch sử rỗng
             return jsonify({
-                "error": "Chatbot service is not available",
-                "status": "service_unavailable"
-            }), 503
-        
-        history = bot.get_history()
-        return jsonify({
-            "history": history,
-            "total_messages": len(history),
+                "history": [],
+                "next_cursor": since,
+                "has_more": False,
+                "total_messages": 0,
+                "session_id": session_id,
+                "status": "success"
+            })
+
+        data['last_activity'] = datetime.now()
+        history = data['chatbot'].conversation_history
+        # Weak ETag (W/"..."): theo nội dung trang, gồm cả since/limit
+        etag = history.page_etag(since, limit)
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        messages, has_more = history.page(since=since, limit=limit)
+        response = jsonify({
+            "history": messages,
+            "next_cursor": messages[-1]["id"] if messages else since,
+            "has_more": has_more,
+            "total_messages": history.total_messages,
             "session_id": session_id,
             "status": "success"
         })
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"History endpoint error: {e}")
@@ -312,13 +403,14 @@ def get_sessions_info():
         cleaned_up = cleanup_inactive_sessions()
         
         sessions_info = []
-        for session_id, data in user_chatbots.items():
-            history_length = len(data['chatbot'].get_history())
+        for session_id, data in list(user_chatbots.items()):
+            history = data['chatbot'].conversation_history  # len / total_messages là O(1)
             sessions_info.append({
                 "session_id": session_id[:8] + "...",  # Truncate for privacy
                 "created_at": data['created_at'].isoformat(),
                 "last_activity": data['last_activity'].isoformat(),
-                "history_length": history_length
+                "history_length": len(history),
+                "total_messages": history.total_messages
             })
         
         return jsonify({
@@ -344,13 +436,14 @@ def get_current_session_info():
         
         if session_id in user_chatbots:
             data = user_chatbots[session_id]
-            history_length = len(data['chatbot'].get_history())
+            history = data['chatbot'].conversation_history
             
             return jsonify({
                 "session_id": session_id,
                 "created_at": data['created_at'].isoformat(),
                 "last_activity": data['last_activity'].isoformat(),
-                "history_length": history_length,
+                "history_length": len(history),
+                "total_messages": history.total_messages,
                 "status": "active"
             })
         else:
@@ -465,12 +558,19 @@ def cache_status():
     try:
         from llms.ollama_llms import OllamaLLMs
         from llms.llm_manager import llm_manager
+        from tool.model_manager import model_manager
         
         cache_info = OllamaLLMs.get_cache_info()
         manager_info = {
             "instance_count": llm_manager.get_instance_count(),
-            "instances": llm_manager.list_instances()
+            "instances": llm_manager.list_instances(),
+            "ollama_pools": llm_manager.pool_status(),
+            "model_tiers": llm_manager.tier_models(),
+            "model_residency": llm_manager.residency_status(),
+            "concurrency_limiters": AdaptiveLimiter.all_status()
         }
+        reflection_gate = model_manager.get_reflection_gate()
+        manager_info["reflection_gate"] = reflection_gate.status() if reflection_gate else None
         
         return jsonify({
             "status": "success",
@@ -504,7 +604,8 @@ def clear_cache():
         # Optional: Clear user chatbots
         clear_sessions = request.json.get('clear_sessions', False) if request.json else False
         if clear_sessions:
-            user_chatbots.clear()
+            for session_id in list(user_chatbots):
+                user_chatbots.pop(session_id)['chatbot'].clear_history()  # xóa cả các lượt đã spill ra store
             logger.info("🧹 Cleared user chatbot sessions")
         
         return jsonify({
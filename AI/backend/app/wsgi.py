@@ -0,0 +1,27 @@
+"""
+WSGI entry point cho production (gunicorn, cấu hình trong backend/gunicorn.conf.py)
+
+    gunicorn -c backend/gunicorn.conf.py wsgi:app
+
+Với ``preload_app = True`` module này được import một lần trong master trước khi
+fork: embedding model, semantic router (ma trận route mmap từ file .npy) và index
+được load ở đây rồi dùng chung copy-on-write với mọi worker. Kết nối HTTP tới
+Ollama được tạo lại trong từng worker (hook ``post_fork``).
+"""
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(APP_DIR))
+sys.path.insert(0, APP_DIR)
+
+from main import app  # noqa: E402  (import main -> MCP.server preload embedding model + semantic router)
+from setting import Settings  # noqa: E402
+from tool.model_manager import model_manager  # noqa: E402
+
+settings = Settings.load_settings()
+if settings.ENABLE_MODEL_PRELOAD:
+    # Embedding model của retrieval (có thể khác model của router) cũng load trước khi fork
+    model_manager.get_embedding_model(settings.TEXT_EMBEDDING_MODEL_ID)
+
+__all__ = ["app"]
@@ -0,0 +1 @@
+"""Offline load-test / benchmark harness (fake Ollama, in-memory Qdrant)."""
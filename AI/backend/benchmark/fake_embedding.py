@@ -0,0 +1,38 @@
+"""Deterministic hashing embedding used in place of the sentence-transformer.
+
+Keeps the benchmark offline (no Hugging Face download) while preserving the
+shape of the real model: ``encode(str)`` returns a 1-D vector and
+``encode(list)`` a 2-D array. ``encode_ms`` simulates the cost of one forward pass.
+"""
+from __future__ import annotations
+
+import time
+import zlib
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from tool.retrieval.sparse import tokenize
+
+
+class HashingEmbedding:
+    def __init__(self, dimension: int = 384, encode_ms: float = 0.0):
+        self.dimension = dimension
+        self.encode_ms = encode_ms
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode("utf-8")) % self.dimension] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, text: Union[str, Sequence[str]], **kwargs) -> np.ndarray:
+        texts: List[str] = [text] if isinstance(text, str) else list(text)
+        if self.encode_ms:
+            time.sleep(self.encode_ms / 1000)
+        vectors = np.stack([self._vector(item) for item in texts])
+        return vectors[0] if isinstance(text, str) else vectors
+
+
+__all__ = ["HashingEmbedding"]
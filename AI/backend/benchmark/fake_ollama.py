@@ -0,0 +1,305 @@
+"""Local stand-in for the Ollama HTTP API used by the benchmark harness.
+
+Implements the endpoints the backend calls (``/api/generate``, ``/api/chat``,
+``/api/version``, ``/api/tags``, ``/api/ps``) with a simple cost model:
+
+* prefill: ``prompt_tokens / prefill_tps`` seconds, where a prefix shared with
+  the last prompt of a slot is free (Ollama's KV prefix cache) and is left out
+  of ``prompt_eval_count``
+* decode: ``output_tokens * token_latency_ms`` milliseconds
+* ``parallel`` slots (like ``OLLAMA_NUM_PARALLEL``); extra requests queue
+* ``options.num_predict`` caps the output tokens, a JSON-schema ``format``
+  restricts extraction output to the schema's properties and wraps the
+  classification label in a JSON object
+* model residency: a model stays loaded for the request's ``keep_alive``
+  (Ollama's default 5m) after its last request; the next request for an
+  unloaded model pays ``load_ms`` and reports it as ``load_duration``.
+  ``/api/ps`` lists the loaded models
+* per-model profiles: ``model_speed`` scales the cost of a model (a smaller
+  model is faster) and ``label_noise`` makes it mislabel that fraction of
+  intent classifications, to compare model tiers on latency and accuracy
+
+Answers are deterministic and shaped like the real model's for each pipeline
+stage (reflection, intent classification, feature extraction, final answer),
+so every branch of ``ChatbotOllama.chat`` can be exercised without a GPU.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+LOCATIONS = ("Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Cần Thơ", "Hải Phòng")
+JOB_KEYWORDS = ("tìm việc", "tìm job", "việc làm", "job", "lập trình", "developer", "tuyển", "kỹ sư", "engineer")
+
+_LAST_QUOTED_USER = re.compile(r'(?:Người dùng|User|INPUT):\s*"(.*)"', re.IGNORECASE)
+# /api/chat nối message thành "user: user: ..." khi lịch sử nằm trong message của user (reflection)
+_HISTORY_USER = re.compile(r"^(?:user:\s*)+(.*?)\s*$", re.MULTILINE)
+
+FILLER_WORDS = (
+    "Dựa trên thông tin hiện có, đây là một số gợi ý phù hợp với yêu cầu của bạn "
+    "về vị trí, kỹ năng, mức lương và địa điểm làm việc mà bạn quan tâm"
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    token_latency_ms: float = 20.0  # thời gian sinh mỗi token output
+    prefill_tps: float = 800.0  # tốc độ xử lý prompt (token/giây)
+    max_tokens: int = 64  # số token của câu trả lời cuối
+    parallel: int = 1  # số request xử lý đồng thời
+    model: str = "fake-model"
+    load_ms: float = 0.0  # thời gian load model chưa resident
+    model_speed: Dict[str, float] = field(default_factory=dict)  # model -> hệ số thời gian (0.4 = nhanh gấp 2.5 lần)
+    label_noise: Dict[str, float] = field(default_factory=dict)  # model -> tỉ lệ nhãn intent bị phân loại sai
+
+
+def keep_alive_seconds(value: Any) -> float:
+    """Ollama ``keep_alive``: seconds or a duration string ("10m", "1h"); negative keeps the model forever."""
+    if value is None or value == "":
+        return 300.0
+    if isinstance(value, str):
+        units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        unit = next((u for u in ("ms", "s", "m", "h") if value.endswith(u)), "")
+        value = float(value[: len(value) - len(unit)]) * units.get(unit, 1)
+    return float("inf") if float(value) < 0 else float(value)
+
+
+def estimate_prompt_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+def _last_user_question(prompt: str) -> str:
+    matches = _LAST_QUOTED_USER.findall(prompt)
+    if matches:
+        return matches[-1].strip()
+    history = _HISTORY_USER.findall(prompt)
+    return history[-1].strip() if history else prompt.strip()[-200:]
+
+
+def classify(question: str) -> str:
+    lowered = question.lower()
+    if "công ty" in lowered:
+        return "intent_company_info"
+    if any(keyword in lowered for keyword in JOB_KEYWORDS):
+        return "intent_jd"
+    return "intent_chitchat"
+
+
+def extract_features(question: str) -> Dict[str, str]:
+    features: Dict[str, str] = {"title": question}
+    lowered = question.lower()
+    for location in LOCATIONS:
+        if location.lower() in lowered:
+            features["location"] = location
+            break
+    return features
+
+
+def respond(prompt: str, config: FakeOllamaConfig) -> Tuple[str, str]:
+    """Return ``(stage, text)`` for a prompt, mimicking the real model per stage."""
+    if not prompt.strip():
+        return "keep_alive", ""
+    if prompt.strip() in ("Hi", "user: Hi"):  # OllamaLLMs warm-up request
+        return "warmup", "Hello"
+    if "Viết lại YÊU CẦU" in prompt:
+        history = _HISTORY_USER.findall(prompt)
+        return "reflection", history[-1] if history else prompt.strip()
+    if "intent_chitchat" in prompt and "intent_company_info" in prompt:
+        return "classification", classify(_last_user_question(prompt))
+    if "OUTPUT:" in prompt and "INPUT:" in prompt:
+        return "extraction", json.dumps(extract_features(_last_user_question(prompt)), ensure_ascii=False)
+    words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(config.max_tokens)]
+    return "answer", " ".join(words)
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server speaking enough of the Ollama API for the backend."""
+
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeOllamaConfig()
+        self._slots = threading.BoundedSemaphore(max(1, self.config.parallel))
+        self._stats_lock = threading.Lock()
+        self.requests_by_stage: Dict[str, int] = {}
+        self.prompt_eval_by_stage: Dict[str, int] = {}
+        self.seconds_by_stage: Dict[str, float] = {}
+        self.models_by_stage: Dict[str, set] = {}
+        self._labels_by_model: Dict[str, int] = {}
+        self._expires_at: Dict[str, float] = {}  # model -> time.monotonic() khi hết keep_alive
+        self.loads_by_model: Dict[str, int] = {}
+        self._kv_prompts: List[str] = [""] * max(1, self.config.parallel)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def complete(
+        self, prompt: str, model: str, format: Any = None, num_predict: Optional[int] = None, keep_alive: Any = None  # noqa: A002
+    ) -> Dict[str, Any]:
+        """Simulate one generation and return Ollama-style timing fields."""
+        stage, text = respond(prompt, self.config)
+        if stage == "extraction" and isinstance(format, dict):
+            allowed = set((format.get("properties") or {}).keys())
+            text = json.dumps({k: v for k, v in json.loads(text).items() if k in allowed}, ensure_ascii=False)
+        if stage == "classification" and isinstance(format, dict):
+            # constrained label decoding: {"<property>": "<label>"}
+            text = json.dumps({next(iter(format.get("properties") or {"label": None})): self._noisy_label(model, text)})
+        if num_predict and num_predict > 0 and stage == "answer":
+            text = " ".join(text.split()[:num_predict])
+        prompt_tokens = max(1, estimate_prompt_tokens(prompt) - self._cached_prefix_tokens(prompt))
+        output_tokens = len(text.split()) if text else 0
+
+        model = model or self.config.model
+        load_s = self._load(model)
+        speed = self.config.model_speed.get(model, 1.0)
+        prefill_s = speed * prompt_tokens / self.config.prefill_tps
+        decode_s = speed * output_tokens * self.config.token_latency_ms / 1000
+        with self._slots:
+            time.sleep(load_s + prefill_s + decode_s)
+
+        with self._stats_lock:
+            self._expires_at[model] = time.monotonic() + keep_alive_seconds(keep_alive)
+            self.requests_by_stage[stage] = self.requests_by_stage.get(stage, 0) + 1
+            self.prompt_eval_by_stage[stage] = self.prompt_eval_by_stage.get(stage, 0) + prompt_tokens
+            self.seconds_by_stage[stage] = self.seconds_by_stage.get(stage, 0.0) + prefill_s + decode_s
+            self.models_by_stage.setdefault(stage, set()).add(model)
+
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "text": text,
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill_s * 1e9),
+            "eval_count": output_tokens,
+            "eval_duration": int(decode_s * 1e9),
+            "load_duration": int(load_s * 1e9),
+            "total_duration": int((load_s + prefill_s + decode_s) * 1e9),
+        }
+
+    @property
+    def loaded_models(self) -> List[str]:
+        now = time.monotonic()
+        with self._stats_lock:
+            return [model for model, expires_at in self._expires_at.items() if expires_at > now]
+
+    def _load(self, model: str) -> float:
+        """Seconds spent loading ``model`` for this request (0 when it is already resident)."""
+        with self._stats_lock:
+            if self._expires_at.get(model, 0.0) > time.monotonic():
+                return 0.0
+            # resident từ lúc bắt đầu load: request đồng thời không load lại lần nữa
+            self._expires_at[model] = float("inf")
+            self.loads_by_model[model] = self.loads_by_model.get(model, 0) + 1
+        return self.config.load_ms / 1000
+
+    def unload(self, model: str) -> None:
+        """Evict a model, like Ollama does when keep_alive expires."""
+        with self._stats_lock:
+            self._expires_at.pop(model, None)
+
+    def _noisy_label(self, model: str, label: str) -> str:
+        """Mislabel every ``1/label_noise``-th classification of ``model`` (deterministic, unlike sampling)."""
+        noise = self.config.label_noise.get(model, 0.0)
+        if noise <= 0:
+            return label
+        with self._stats_lock:
+            count = self._labels_by_model[model] = self._labels_by_model.get(model, 0) + 1
+        if count % max(1, round(1 / noise)):
+            return label
+        return "intent_jd" if label == "intent_chitchat" else "intent_chitchat"
+
+    def _cached_prefix_tokens(self, prompt: str) -> int:
+        """Like Ollama: reuse the slot sharing the longest prefix (else the least recently used one) and keep this prompt there."""
+        with self._stats_lock:
+            # _kv_prompts is ordered from least to most recently used
+            shared = [len(os.path.commonprefix([cached, prompt])) for cached in self._kv_prompts]
+            slot = max(range(len(shared)), key=shared.__getitem__)
+            # llama.cpp only reuses a slot whose cached prompt is mostly shared (slot_prompt_similarity = 0.5)
+            if shared[slot] * 2 < len(self._kv_prompts[slot]) or not shared[slot]:
+                slot = 0
+            self._kv_prompts.pop(slot)
+            self._kv_prompts.append(prompt)
+        return shared[slot] // 3
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - silence per-request logging
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                return json.loads(raw or b"{}")
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                elif self.path == "/api/tags":
+                    self._send_json({"models": [{"name": server.config.model, "model": server.config.model}]})
+                elif self.path == "/api/ps":
+                    self._send_json({"models": [{"name": name, "model": name} for name in server.loaded_models]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = self._read_json()
+                model = body.get("model", "")
+                format_ = body.get("format")
+                num_predict = (body.get("options") or {}).get("num_predict")
+                keep_alive = body.get("keep_alive")
+                if self.path == "/api/generate":
+                    result = server.complete(body.get("prompt") or "", model, format_, num_predict, keep_alive)
+                    result["response"] = result.pop("text")
+                    self._send_json(result)
+                elif self.path == "/api/chat":
+                    messages: List[Dict[str, str]] = body.get("messages") or []
+                    prompt = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+                    result = server.complete(prompt, model, format_, num_predict, keep_alive)
+                    result["message"] = {"role": "assistant", "content": result.pop("text")}
+                    self._send_json(result)
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+        return Handler
+
+
+__all__ = ["FakeOllamaConfig", "FakeOllamaServer", "classify", "extract_features", "keep_alive_seconds", "respond"]
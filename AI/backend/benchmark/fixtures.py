@@ -0,0 +1,88 @@
+"""Synthetic company and job posting rows, shaped like the PostgreSQL procedures.
+
+``get_company_infor`` / ``get_job_posting_infor`` rows are generated
+deterministically so every benchmark run searches the same catalogue.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+from typing import Any, Dict, List
+
+COMPANY_NAMES = (
+    "FPT Software", "MISA", "VNG", "Viettel Solutions", "Tiki", "Shopee Việt Nam", "MoMo",
+    "VNPay", "Techcombank", "KMS Technology", "NashTech", "TMA Solutions", "Base.vn",
+    "Got It", "Haravan", "CMC Global", "Rikkeisoft", "Sun Asterisk", "Bkav", "Teko",
+)
+CITIES = ("Hà Nội", "Hồ Chí Minh", "Đà Nẵng", "Cần Thơ", "Hải Phòng")
+INDUSTRIES = ("Phần mềm", "Thương mại điện tử", "Fintech", "Outsourcing", "Ngân hàng", "Game")
+POSITIONS = (
+    ("Lập trình viên Python", "Python, Django, PostgreSQL"),
+    ("Java Developer", "Java, Spring Boot, MySQL"),
+    ("Frontend Developer", "React, TypeScript, CSS"),
+    ("Mobile Developer", "Flutter, Kotlin, Swift"),
+    ("Data Analyst", "SQL, Python, Power BI"),
+    ("DevOps Engineer", "Docker, Kubernetes, AWS"),
+    ("Tester", "Manual Test, Selenium, Postman"),
+    ("AI Engineer", "Python, PyTorch, NLP"),
+    (".NET Developer", "C#, .NET, SQL Server"),
+    ("Business Analyst", "BA, UML, Jira"),
+)
+WORK_TYPES = ("Toàn thời gian", "Bán thời gian", "Remote", "Hybrid")
+
+DESCRIPTION = (
+    "{name} là công ty {industry} với đội ngũ kỹ sư giàu kinh nghiệm. "
+    "Chúng tôi phát triển sản phẩm phục vụ hàng triệu người dùng tại Việt Nam. "
+    "Văn phòng hiện đại, môi trường trẻ trung và nhiều cơ hội thăng tiến. "
+    "Công ty chú trọng đào tạo nội bộ và chia sẻ kiến thức công nghệ."
+)
+
+
+def company_records(count: int = 20, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    records = []
+    for company_id, name in enumerate(itertools.islice(itertools.cycle(COMPANY_NAMES), count), start=1):
+        industry = rng.choice(INDUSTRIES)
+        cities = rng.sample(CITIES, k=rng.randint(1, 2))
+        records.append({
+            "company_id": company_id,
+            "name": name if company_id <= len(COMPANY_NAMES) else f"{name} {company_id}",
+            "website": f"https://{name.lower().replace(' ', '')}.vn",
+            "size": rng.choice(("50-99", "100-499", "500-999", "1000+")),
+            "description": DESCRIPTION.format(name=name, industry=industry.lower()),
+            "addresses": " / ".join(f"Tòa nhà {rng.randint(1, 99)}, {city}" for city in cities),
+            "industries": industry,
+        })
+    return records
+
+
+def job_records(companies: List[Dict[str, Any]], count: int = 200, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    records = []
+    for job_id in range(1, count + 1):
+        company = rng.choice(companies)
+        position, skills = rng.choice(POSITIONS)
+        experience = rng.randint(0, 5)
+        records.append({
+            "job_posting_id": job_id,
+            "company_id": company["company_id"],
+            "company_name": company["name"],
+            "position_name": position,
+            "job_description": f"Tham gia phát triển sản phẩm của {company['name']} ở vị trí {position}.",
+            "requirements": f"Tối thiểu {experience} năm kinh nghiệm với {skills}.",
+            "salary": f"{rng.randint(8, 50)} triệu",
+            "deadline": "2030-12-31",
+            "experience_years": experience,
+            "education_level": "Đại học",
+            "benefits": "Lương tháng 13, bảo hiểm đầy đủ",
+            "working_time": "Thứ 2 - Thứ 6",
+            "status": "open" if rng.random() > 0.1 else "closed",
+            "addresses": company["addresses"],
+            "work_types": rng.choice(WORK_TYPES),
+            "industries": company["industries"],
+            "skills": skills,
+        })
+    return records
+
+
+__all__ = ["company_records", "job_records"]
@@ -0,0 +1,108 @@
+"""Measure the per-session memory of the conversation history (list of dicts vs. ConversationHistory).
+
+Usage (from AI/backend)::
+
+    python -m benchmark.history_memory --sessions 2000 --turns 30
+    python -m benchmark.history_memory --compression none --max-messages 1000 --token-budget 1000000
+
+Builds ``--sessions`` histories of ``--turns`` chat turns each and measures the
+Python heap they hold with ``tracemalloc``. The old layout stores every turn as
+three dicts (raw user message, reflected rewrite, answer) in an unbounded list.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Callable, List, Optional
+
+from tool.conversation_history import ConversationHistory, get_codec
+
+_QUESTIONS = [
+    "Tìm việc lập trình viên Python ở Hà Nội",
+    "Còn ở Đà Nẵng thì sao",
+    "Công ty đó có tuyển fresher không",
+    "Lương khoảng bao nhiêu vậy",
+]
+_ANSWER = (
+    "Dưới đây là một số vị trí phù hợp: • Vị trí: Python Developer • Công ty: FPT Software "
+    "• Địa điểm: Hà Nội • Kinh nghiệm: 1-2 năm • Mức lương: 15-25 triệu. Bạn có muốn xem thêm chi tiết "
+    "về yêu cầu công việc, quyền lợi hoặc quy trình ứng tuyển của vị trí này không? "
+)
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=30, help="chat turns per session")
+    parser.add_argument("--answer-repeat", type=int, default=3, help="answer length in multiples of a ~300 char answer")
+    parser.add_argument("--max-messages", type=int, default=64)
+    parser.add_argument("--token-budget", type=int, default=4096)
+    parser.add_argument("--hot-messages", type=int, default=8)
+    parser.add_argument("--compression", choices=("zstd", "zlib", "none"), default="zstd")
+    return parser.parse_args(argv)
+
+
+def _measure(build: Callable[[], list]) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, current
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+
+    def turns(session: int):
+        # Chuỗi mới cho mỗi lượt, tạo trong lúc đo: history là nơi duy nhất giữ chúng (như khi chạy thật)
+        rng = random.Random(session)
+        for t in range(args.turns):
+            question = rng.choice(_QUESTIONS)
+            yield f"{question} #{session}-{t}", f"Tôi muốn hỏi: {question} #{session}-{t}", f"{_ANSWER * args.answer_repeat}#{session}-{t}"
+
+    def build_lists():
+        histories = []
+        for s in range(args.sessions):
+            history = []
+            for question, rewrite, answer in turns(s):
+                history.append({"role": "user", "content": question})
+                history.append({"role": "user", "content": rewrite})
+                history.append({"role": "assistant", "content": answer})
+            histories.append(history)
+        return histories
+
+    def build_compact():
+        histories = []
+        for s in range(args.sessions):
+            history = ConversationHistory(
+                f"session-{s}",
+                max_messages=args.max_messages,
+                token_budget=args.token_budget,
+                hot_messages=args.hot_messages,
+                codec=get_codec(args.compression),
+            )
+            for question, rewrite, answer in turns(s):
+                history.append("user", question)
+                history.set_rewrite(rewrite)
+                history.append("assistant", answer)
+            histories.append(history)
+        return histories
+
+    lists, list_bytes = _measure(build_lists)
+    del lists
+    compact, compact_bytes = _measure(build_compact)
+
+    kept = sum(len(h) for h in compact) / len(compact)
+    print(f"{'layout':<22}{'MB total':>10}{'KB/session':>12}{'messages/session':>18}")
+    print(f"{'list of dicts':<22}{list_bytes / 2**20:>10.1f}{list_bytes / args.sessions / 1024:>12.1f}{args.turns * 3:>18}")
+    print(f"{'ConversationHistory':<22}{compact_bytes / 2**20:>10.1f}{compact_bytes / args.sessions / 1024:>12.1f}{kept:>18.0f}")
+    print(f"ConversationHistory.memory_bytes (estimate, per session): {sum(h.memory_bytes for h in compact) / len(compact) / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,165 @@
+"""Concurrent session driver and latency / RSS statistics for the benchmark."""
+from __future__ import annotations
+
+import os
+import resource
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import requests
+
+
+@dataclass
+class Scenario:
+    name: str
+    messages: Sequence[str]
+    intent: Optional[str] = None  # intent đúng của mọi message (để đo độ chính xác phân loại)
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    sessions: int
+    requests: int
+    errors: int
+    duration_s: float
+    requests_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    peak_rss_mb: float
+    status_codes: Dict[str, int] = field(default_factory=dict)
+    intent_accuracy: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (``q`` in 0-100), 0.0 for no samples."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is the lifetime peak (KiB on Linux); good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RssSampler:
+    """Sample the process RSS in the background and keep the peak."""
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.peak = current_rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+def run_scenario(
+    base_url: str,
+    scenario: Scenario,
+    *,
+    sessions: int = 8,
+    requests_per_session: int = 4,
+    timeout_s: float = 120.0,
+    think_s: float = 0.0,
+) -> ScenarioResult:
+    """Drive ``/api/chat`` with ``sessions`` concurrent users, each keeping its own cookie jar.
+
+    ``think_s`` is the pause between two turns of a session (not counted in the latency).
+    """
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(sessions)
+
+    def user(index: int) -> None:
+        http = requests.Session()
+        start_barrier.wait()
+        for turn in range(requests_per_session):
+            if turn and think_s:
+                time.sleep(think_s)
+            message = scenario.messages[(index + turn) % len(scenario.messages)]
+            started = time.perf_counter()
+            try:
+                response = http.post(f"{base_url}/api/chat", json={"message": message}, timeout=timeout_s)
+                status = str(response.status_code)
+            except requests.RequestException as exc:
+                status = type(exc).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                status_codes[status] = status_codes.get(status, 0) + 1
+
+    threads = [threading.Thread(target=user, args=(i,), name=f"session-{i}") for i in range(sessions)]
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+    total = len(latencies)
+    return ScenarioResult(
+        scenario=scenario.name,
+        sessions=sessions,
+        requests=total,
+        errors=total - status_codes.get("200", 0),
+        duration_s=round(duration, 3),
+        requests_per_s=round(total / duration, 2) if duration else 0.0,
+        p50_ms=round(percentile(latencies, 50), 1),
+        p95_ms=round(percentile(latencies, 95), 1),
+        p99_ms=round(percentile(latencies, 99), 1),
+        max_ms=round(max(latencies), 1) if latencies else 0.0,
+        peak_rss_mb=round(rss.peak / (1024 * 1024), 1),
+        status_codes=status_codes,
+    )
+
+
+def compare_to_baseline(
+    results: Sequence[ScenarioResult],
+    baseline: Dict[str, Dict[str, float]],
+    *,
+    max_regression: float = 0.2,
+) -> List[str]:
+    """Return a message per scenario whose p95 or throughput regressed more than ``max_regression``."""
+    regressions = []
+    for result in results:
+        previous: Optional[Dict[str, float]] = baseline.get(result.scenario)
+        if not previous:
+            continue
+        if previous.get("p95_ms") and result.p95_ms > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{result.scenario}: p95 {previous['p95_ms']} -> {result.p95_ms} ms")
+        if previous.get("requests_per_s") and result.requests_per_s < previous["requests_per_s"] * (1 - max_regression):
+            regressions.append(f"{result.scenario}: rps {previous['requests_per_s']} -> {result.requests_per_s}")
+    return regressions
+
+
+__all__ = ["RssSampler", "Scenario", "ScenarioResult", "compare_to_baseline", "percentile", "run_scenario"]
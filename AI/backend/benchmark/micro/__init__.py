@@ -0,0 +1 @@
+"""pytest-benchmark micro-benchmarks for the CPU-side hot paths."""
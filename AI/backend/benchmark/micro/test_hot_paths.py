@@ -0,0 +1,102 @@
+"""Per-call cost of the CPU work done on every chat request.
+
+Run from AI/backend (needs ``pytest-benchmark``)::
+
+    # compare against the stored baseline, fail if a mean regresses > 25 %
+    python -m pytest benchmark/micro --benchmark-storage=benchmark/baselines \
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+    # refresh the baseline after an intended change
+    python -m pytest benchmark/micro --benchmark-storage=benchmark/baselines --benchmark-save=baseline
+
+``SemanticRouter.guide`` runs on the hashing embedding from
+:mod:`benchmark.fake_embedding` so only the routing math is measured.
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from benchmark.fake_embedding import HashingEmbedding  # noqa: E402
+from llms.utils import strip_think  # noqa: E402
+from prompt.promt_config import PromptConfig  # noqa: E402
+from tool.embeddings.company import _build_company_text  # noqa: E402
+from tool.extract_feature_question_about_jd import ExtractFeatureQuestion  # noqa: E402
+from tool.question_enhancer import QuestionEnhancer  # noqa: E402
+from tool.semantic_router import Route, SemanticRouter  # noqa: E402
+from tool.semantic_router.sample import Sample  # noqa: E402
+
+QUESTIONS = [
+    "Tìm việc lập trình viên Python ở Hà Nội lương khoảng 20 triệu",
+    "Có công việc part-time nào ở Sài Gòn không?",
+    "Mình là fresher muốn tìm việc kế toán",
+    "Công ty FPT Software có tuyển Java Developer 3 năm kinh nghiệm không",
+    "Có việc nào làm từ xa không?",
+]
+
+THINK_RESPONSE = (
+    "<think>Người dùng hỏi về việc làm Python ở Hà Nội. Mình cần liệt kê các vị trí phù hợp, "
+    "kiểm tra mức lương và kinh nghiệm yêu cầu trước khi trả lời.</think>\n"
+    "Dưới đây là 3 vị trí Python Developer tại Hà Nội phù hợp với bạn: ..."
+)
+
+EXTRACTION_RESPONSE = (
+    "Dựa trên câu hỏi, các thông tin trích xuất được là:\n"
+    '```json\n{"title": "Python Developer", "location": "Hà Nội", "experience": "3 năm"}\n```'
+)
+
+COMPANY = {
+    "company_id": 1,
+    "name": "Công ty Cổ phần MISA",
+    "website": "https://misa.vn",
+    "size": "1000+",
+    "description": "MISA là công ty phần mềm kế toán hàng đầu Việt Nam với hơn 250.000 khách hàng doanh nghiệp. " * 3,
+    "addresses": "Tòa nhà Technosoft, Duy Tân, Cầu Giấy, Hà Nội / 72 Lê Thánh Tôn, Quận 1, Hồ Chí Minh",
+    "industries": "Phần mềm, Kế toán, Fintech",
+}
+
+
+@pytest.fixture(scope="module")
+def router():
+    routes = [
+        Route(name="recruitment_incomplete", samples=Sample.recruitment_incomplete),
+        Route(name="recruitment_complete", samples=Sample.recruitment_complete),
+        Route(name="chitchat", samples=Sample.chitchatSample),
+    ]
+    # cache_size=0: measure the scoring path, not route-cache hits
+    return SemanticRouter(embedding=HashingEmbedding(), routes=routes, cache_size=0)
+
+
+def test_semantic_router_guide(benchmark, router):
+    score, route = benchmark(router.guide, QUESTIONS[0])
+    assert route in {"recruitment_incomplete", "recruitment_complete", "chitchat"}
+
+
+def test_analyze_incomplete_question(benchmark):
+    enhancer = QuestionEnhancer()
+    status = benchmark(lambda: [enhancer.analyze_incomplete_question(q) for q in QUESTIONS])
+    assert len(status) == len(QUESTIONS)
+
+
+def test_strip_think(benchmark):
+    assert benchmark(strip_think, THINK_RESPONSE).startswith("Dưới đây")
+
+
+def test_get_prompt_classification(benchmark):
+    config = PromptConfig()
+    prompt = benchmark(config.get_prompt, "classification_chat_intent", user_input=QUESTIONS[0])
+    assert QUESTIONS[0] in prompt
+
+
+def test_build_company_text(benchmark):
+    assert benchmark(_build_company_text, COMPANY).startswith("Company name: Công ty Cổ phần MISA")
+
+
+def test_clear_llm_response(benchmark):
+    extractor = ExtractFeatureQuestion.__new__(ExtractFeatureQuestion)  # no Ollama client needed
+    cleaned = benchmark(extractor._clear_llm_response, EXTRACTION_RESPONSE)
+    assert cleaned.startswith('{"title": "Python Developer"')
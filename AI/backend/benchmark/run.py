@@ -0,0 +1,297 @@
+"""Load-test the Flask chat API against a local fake Ollama and in-memory Qdrant.
+
+Usage (from AI/backend)::
+
+    python -m benchmark.run --sessions 8 --requests 4
+    python -m benchmark.run --scenario company_info --token-ms 30 --output bench.json
+    python -m benchmark.run --scenario jd --speculative                   # prefetch retrieval during reflection
+    python -m benchmark.run --prompt-layout generate                     # compare prompt tokens evaluated
+    python -m benchmark.run --backends 2 --sessions 8                     # Ollama pool over 2 fake servers
+    python -m benchmark.run --tiered --small-label-noise 0.1              # small model for cheap stages
+    python -m benchmark.run --no-reflection-gate                          # reflection on every turn
+    python -m benchmark.run --load-ms 3000 --keep-alive 2 --think-ms 3000 --residency-interval 1   # cold loads
+    python -m benchmark.run --baseline bench.json --max-regression 0.2   # exit 1 on regression
+
+Everything runs in one process: the fake Ollama server, the Flask app (served
+by a threaded werkzeug server) and the load driver. Qdrant runs in memory
+(``QDRANT_URL=":memory:"``) and is seeded from :mod:`benchmark.fixtures` through
+the regular sync functions. The sentence-transformer is replaced by a hashing
+embedding unless ``--real-embeddings`` is passed. Reported RSS is therefore the
+peak of the whole process.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import warnings
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+
+from benchmark.fake_ollama import FakeOllamaConfig, FakeOllamaServer  # noqa: E402
+from benchmark.fixtures import company_records, job_records  # noqa: E402
+from benchmark.load import Scenario, ScenarioResult, compare_to_baseline, run_scenario  # noqa: E402
+
+SCENARIOS: Dict[str, Scenario] = {
+    "chitchat": Scenario("chitchat", ("Xin chào bạn", "Hôm nay trời đẹp quá", "Bạn khỏe không"), "intent_chitchat"),
+    "company_info": Scenario(
+        "company_info",
+        (
+            "Cho tôi thông tin về công ty FPT Software",
+            "Công ty MISA ở Hà Nội có gì nổi bật",
+            "Giới thiệu công ty VNG ở Hồ Chí Minh",
+        ),
+        "intent_company_info",
+    ),
+    "jd": Scenario(
+        "jd",
+        (
+            "Tìm việc lập trình viên Python ở Hà Nội",
+            "Tìm job Java Developer tại Hồ Chí Minh",
+            "Việc làm DevOps Engineer ở Đà Nẵng",
+        ),
+        "intent_jd",
+    ),
+}
+
+LARGE_MODEL = "fake-large"
+SMALL_MODEL = "fake-small"
+CHEAP_TIERS = ("reflection", "classification", "extraction")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated sessions")
+    parser.add_argument("--requests", type=int, default=4, help="chat turns per session")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="fake Ollama decode latency per token")
+    parser.add_argument("--prefill-tps", type=float, default=800.0, help="fake Ollama prompt tokens per second")
+    parser.add_argument("--max-tokens", type=int, default=64, help="tokens in the final answer")
+    parser.add_argument("--parallel", type=int, default=1, help="fake Ollama parallel slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--embed-ms", type=float, default=5.0, help="simulated embedding forward pass")
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--backends", type=int, default=1, help="fake Ollama servers behind OLLAMA_BACKENDS (pool)")
+    parser.add_argument("--prompt-layout", choices=("chat", "generate"), default="chat", help="PROMPT_LAYOUT of the backend")
+    parser.add_argument("--speculative", action="store_true", help="prefetch retrieval in parallel with reflection")
+    parser.add_argument("--no-reflection-gate", action="store_true", help="run reflection on every turn")
+    parser.add_argument("--tiered", action="store_true", help="run reflection, classification and extraction on a small model")
+    parser.add_argument("--small-speed", type=float, default=0.4, help="cost of the small model relative to the large one")
+    parser.add_argument("--small-label-noise", type=float, default=0.0, help="fraction of intents the small model mislabels")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="fake Ollama cold model load time")
+    parser.add_argument("--keep-alive", type=int, default=600, help="MODEL_KEEP_ALIVE of the backend (seconds)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause of each session between two turns")
+    parser.add_argument("--residency-interval", type=float, default=60.0, help="MODEL_RESIDENCY_INTERVAL of the backend")
+    parser.add_argument("--no-residency", action="store_true", help="disable the model residency scheduler")
+    parser.add_argument("--real-embeddings", action="store_true", help="load the configured sentence-transformer")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="keep application prints and logs")
+    return parser.parse_args(argv)
+
+
+def _configure_environment(
+    ollama_urls: List[str],
+    speculative: bool = False,
+    prompt_layout: str = "chat",
+    tiered: bool = False,
+    residency_interval: Optional[float] = 60.0,
+    keep_alive: int = 600,
+    reflection_gate: bool = True,
+) -> None:
+    os.environ["OLLAMA_BASE_URL"] = ollama_urls[0]
+    os.environ["OLLAMA_URL"] = ollama_urls[0]
+    os.environ["OLLAMA_BACKENDS"] = ",".join(ollama_urls) if len(ollama_urls) > 1 else ""
+    os.environ["QDRANT_URL"] = ":memory:"
+    os.environ["SYNC_EMBEDDINGS_ON_STARTUP"] = "false"
+    os.environ["TRACE_EXPORTER"] = "none"
+    os.environ["LOAD_SKILLS_FROM_DATABASE"] = "false"
+    os.environ.setdefault("ENABLE_RERANKING", "false")
+    os.environ["PROMPT_LAYOUT"] = prompt_layout
+    os.environ["ENABLE_SPECULATIVE_RETRIEVAL"] = "true" if speculative else "false"
+    os.environ["ENABLE_REFLECTION_GATE"] = "true" if reflection_gate else "false"
+    os.environ["OLLAMA_MODEL"] = LARGE_MODEL
+    for tier in CHEAP_TIERS:
+        os.environ[f"{tier.upper()}_MODEL"] = SMALL_MODEL if tiered else ""
+    os.environ["ANSWER_MODEL"] = ""
+    os.environ["MODEL_KEEP_ALIVE"] = str(keep_alive)
+    os.environ["MODEL_RESIDENCY_SCHEDULER"] = "true" if residency_interval is not None else "false"
+    os.environ["MODEL_RESIDENCY_INTERVAL"] = str(residency_interval or 0)
+
+
+def _prepare_backend(args: argparse.Namespace) -> None:
+    """Seed model cache and the in-memory Qdrant before the Flask app is imported."""
+    from setting import Settings
+    from tool.embeddings import sync_company_embeddings, sync_job_embeddings
+    from tool.model_manager import model_manager
+
+    settings = Settings.load_settings()
+    if not args.real_embeddings:
+        from benchmark.fake_embedding import HashingEmbedding
+
+        embedding = HashingEmbedding(encode_ms=args.embed_ms)
+        for model_name in {settings.TEXT_EMBEDDING_MODEL_ID, "dangvantuan/vietnamese-document-embedding"}:
+            model_manager.models_cache[f"embedding_{model_name}"] = embedding
+
+    companies = company_records(args.companies)
+    sync_company_embeddings(settings=settings, records=companies)
+    sync_job_embeddings(settings=settings, records=job_records(companies, args.jobs))
+
+
+def _print_report(results: List[ScenarioResult]) -> None:
+    header = (
+        f"{'scenario':<14}{'reqs':>6}{'err':>5}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'peak RSS MB':>13}{'intent acc':>12}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        accuracy = f"{r.intent_accuracy:.0%}" if r.intent_accuracy is not None else "-"
+        print(
+            f"{r.scenario:<14}{r.requests:>6}{r.errors:>5}{r.requests_per_s:>8}"
+            f"{r.p50_ms:>10}{r.p95_ms:>10}{r.p99_ms:>10}{r.peak_rss_mb:>13}{accuracy:>12}"
+        )
+
+
+def _print_tiers(servers: List[FakeOllamaServer]) -> None:
+    """Model, số lời gọi và thời gian trung bình (phía Ollama) của mỗi stage / tier."""
+    calls = _merge(s.requests_by_stage for s in servers)
+    seconds: Dict[str, float] = {}
+    models: Dict[str, set] = {}
+    for server in servers:
+        for stage, value in server.seconds_by_stage.items():
+            seconds[stage] = seconds.get(stage, 0.0) + value
+        for stage, names in server.models_by_stage.items():
+            models.setdefault(stage, set()).update(names)
+
+    header = f"{'tier':<16}{'model':<24}{'calls':>7}{'mean ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for stage in sorted(calls):
+        mean_ms = 1000 * seconds.get(stage, 0.0) / calls[stage]
+        print(f"{stage:<16}{','.join(sorted(models.get(stage, ()))):<24}{calls[stage]:>7}{mean_ms:>10.1f}")
+
+
+def _merge(counts) -> Dict[str, int]:
+    merged: Dict[str, int] = {}
+    for count in counts:
+        for key, value in count.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    config = FakeOllamaConfig(
+        token_latency_ms=args.token_ms,
+        prefill_tps=args.prefill_tps,
+        max_tokens=args.max_tokens,
+        parallel=args.parallel,
+        model=LARGE_MODEL,
+        load_ms=args.load_ms,
+        model_speed={SMALL_MODEL: args.small_speed},
+        label_noise={SMALL_MODEL: args.small_label_noise},
+    )
+
+    quiet = contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext()
+    if not args.verbose:
+        from loguru import logger as loguru_logger
+
+        logging.disable(logging.WARNING)
+        loguru_logger.disable("setting")
+        warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(FakeOllamaServer(config)) for _ in range(max(1, args.backends))]
+        _configure_environment(
+            [s.url for s in servers],
+            speculative=args.speculative,
+            prompt_layout=args.prompt_layout,
+            tiered=args.tiered,
+            residency_interval=None if args.no_residency else args.residency_interval,
+            keep_alive=args.keep_alive,
+            reflection_gate=not args.no_reflection_gate,
+        )
+        with quiet:
+            _prepare_backend(args)
+            from werkzeug.serving import make_server
+            from app.main import app as flask_app
+            from monitoring.metrics import INTENTS
+
+        http_server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+        threading.Thread(target=http_server.serve_forever, name="flask", daemon=True).start()
+        base_url = f"http://127.0.0.1:{http_server.server_port}"
+
+        names = sorted(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        results = []
+        try:
+            for name in names:
+                scenario = SCENARIOS[name]
+                correct = INTENTS.labels(scenario.intent).get()
+                with contextlib.redirect_stdout(io.StringIO()) if not args.verbose else contextlib.nullcontext():
+                    result = run_scenario(
+                        base_url,
+                        scenario,
+                        sessions=args.sessions,
+                        requests_per_session=args.requests,
+                        think_s=args.think_ms / 1000,
+                    )
+                if result.requests:
+                    result.intent_accuracy = round((INTENTS.labels(scenario.intent).get() - correct) / result.requests, 3)
+                results.append(result)
+        finally:
+            http_server.shutdown()
+
+    _print_report(results)
+    print()
+    _print_tiers(servers)
+    print()
+    print(f"fake Ollama calls by stage: {_merge(s.requests_by_stage for s in servers)}")
+    print(f"fake Ollama prompt tokens evaluated by stage: {_merge(s.prompt_eval_by_stage for s in servers)}")
+    if len(servers) > 1:
+        print(f"fake Ollama calls by backend: {[sum(s.requests_by_stage.values()) for s in servers]}")
+    if args.load_ms > 0:
+        from monitoring.metrics import OLLAMA_COLD_LOADS
+
+        cold = {"/".join(labels): int(child.get()) for labels, child in OLLAMA_COLD_LOADS._children.items()}
+        print(f"fake Ollama model loads: {_merge(s.loads_by_model for s in servers)}")
+        print(f"cold loads (model/source): {cold}")
+    if not args.no_reflection_gate:
+        from monitoring.metrics import REFLECTION_GATE, REFLECTION_SECONDS_SAVED
+
+        decisions = {"/".join(labels): int(child.get()) for labels, child in REFLECTION_GATE._children.items()}
+        print(f"reflection gate (decision/reason): {decisions}, estimated time saved: {REFLECTION_SECONDS_SAVED.get():.2f}s")
+    if args.speculative:
+        from monitoring.metrics import SPECULATIVE_RETRIEVALS
+
+        outcomes = {"/".join(labels): int(child.get()) for labels, child in SPECULATIVE_RETRIEVALS._children.items()}
+        print(f"speculative retrievals (kind/outcome): {outcomes}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump({r.scenario: r.to_dict() for r in results}, handle, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare_to_baseline(results, json.load(handle), max_regression=args.max_regression)
+        if regressions:
+            print("❌ Performance regressions:")
+            for message in regressions:
+                print(f"  - {message}")
+            return 1
+        print("✅ No regression against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
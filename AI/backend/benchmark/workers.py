@@ -0,0 +1,151 @@
+"""Measure per-worker memory of the gunicorn deployment (preload-and-fork vs. per-worker load).
+
+Usage (from AI/backend)::
+
+    python -m benchmark.workers                              # default deployment: 1 worker
+    python -m benchmark.workers --workers 4
+    python -m benchmark.workers --workers 4 --no-preload     # every worker loads its own models
+
+Starts a fake Ollama, runs ``gunicorn -c gunicorn.conf.py benchmark.wsgi:app``,
+sends a few chat requests so every worker has served traffic, then reads
+``/proc/<pid>/smaps_rollup`` of the master and each worker. RSS counts shared
+pages in every process; PSS splits them between the processes mapping them,
+so the PSS total is what the deployment really costs.
+
+It also plays one multi-turn session (``--session-turns``, same cookie, a new
+connection per turn) and checks ``/api/chat/history`` still holds every turn.
+Sessions live in worker memory, so this fails with more than one worker; the
+exit status is 1 when the check fails with a single worker.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+
+from benchmark.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from benchmark.run import BACKEND_DIR, _configure_environment
+from monitoring.metrics import process_memory
+
+_MB = 1024 * 1024
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--no-preload", action="store_true", help="load the app in every worker instead of the master")
+    parser.add_argument("--requests", type=int, default=16, help="chat requests sent before measuring")
+    parser.add_argument("--session-turns", type=int, default=4, help="turns of the multi-turn session check (0 to skip)")
+    parser.add_argument("--real-embeddings", action="store_true", help="load the configured sentence-transformer")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as handle:
+            return [int(child) for child in handle.read().split()]
+    except OSError:
+        return []
+
+
+def _wait_ready(url: str, timeout_s: float, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}")
+        try:
+            if requests.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"gunicorn not ready after {timeout_s:.0f}s")
+
+
+def _check_session(url: str, turns: int) -> tuple:
+    """(messages kept, messages expected) for one session played over a new connection per turn."""
+    cookies = requests.cookies.RequestsCookieJar()
+    questions = ["Xin chào bạn", "Tìm việc lập trình viên Python ở Hà Nội", "Còn ở Đà Nẵng thì sao", "Cảm ơn bạn"]
+    for turn in range(turns):
+        response = requests.post(
+            f"{url}/api/chat",
+            json={"message": questions[turn % len(questions)]},
+            cookies=cookies,
+            headers={"Connection": "close"},
+            timeout=120,
+        )
+        cookies.update(response.cookies)
+    history = requests.get(f"{url}/api/chat/history", cookies=cookies, headers={"Connection": "close"}, timeout=30).json()
+    return history.get("total_messages", 0), 2 * turns
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+
+    with FakeOllamaServer(FakeOllamaConfig(token_latency_ms=1, parallel=4)) as ollama:
+        _configure_environment([ollama.url])
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            GUNICORN_WORKERS=str(args.workers),
+            GUNICORN_PRELOAD="false" if args.no_preload else "true",
+            BENCHMARK_REAL_EMBEDDINGS="true" if args.real_embeddings else "false",
+        )
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"), "benchmark.wsgi:app"]
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            started = time.perf_counter()
+            _wait_ready(url, args.startup_timeout, process)
+            ready_s = time.perf_counter() - started
+
+            # new connection per request so the requests spread over the workers
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                statuses = list(pool.map(
+                    lambda i: requests.post(f"{url}/api/chat", json={"message": "Xin chào bạn"}, timeout=120).status_code,
+                    range(args.requests),
+                ))
+
+            kept, expected = _check_session(url, args.session_turns) if args.session_turns > 0 else (0, 0)
+            session_ok = kept == expected
+
+            rows = [("master", process.pid)] + [("worker", pid) for pid in sorted(_children(process.pid))]
+            print(f"gunicorn ready in {ready_s:.1f}s (preload={'no' if args.no_preload else 'yes'}), chat statuses: {sorted(set(statuses))}")
+            if args.session_turns > 0:
+                print(f"multi-turn session: {kept}/{expected} messages kept over {args.session_turns} requests "
+                      f"({'ok' if session_ok else 'history lost: the turns reached different workers'})")
+            header = f"{'process':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'shared MB':>11}"
+            print(header)
+            print("-" * len(header))
+            total_rss = total_pss = 0
+            for role, pid in rows:
+                memory = process_memory(pid)
+                total_rss += memory["rss"]
+                total_pss += memory["pss"]
+                print(f"{role:<8}{pid:>8}{memory['rss'] / _MB:>10.0f}{memory['pss'] / _MB:>10.0f}{memory['shared'] / _MB:>11.0f}")
+            print("-" * len(header))
+            print(f"{'total':<16}{total_rss / _MB:>10.0f}{total_pss / _MB:>10.0f}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    # Với nhiều worker mất lịch sử là giới hạn đã biết (xem gunicorn.conf.py), không phải lỗi
+    return 0 if session_ok or args.workers > 1 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""gunicorn entry point used by :mod:`benchmark.workers`.
+
+Seeds the in-memory Qdrant and the hashing embedding (like ``benchmark.run``)
+before loading the production ``wsgi`` module, so the same preload-and-fork
+path is measured without PostgreSQL, Qdrant or a GPU.
+"""
+import argparse
+import os
+
+from benchmark.run import _prepare_backend
+
+_prepare_backend(argparse.Namespace(
+    real_embeddings=os.getenv("BENCHMARK_REAL_EMBEDDINGS") == "true",
+    embed_ms=5.0,
+    companies=20,
+    jobs=200,
+))
+
+from wsgi import app  # noqa: E402
+
+__all__ = ["app"]
@@ -0,0 +1,74 @@
+"""
+Cấu hình gunicorn cho production (chạy từ thư mục chứa backend/, như Dockerfile)::
+
+    gunicorn -c backend/gunicorn.conf.py wsgi:app
+
+* ``preload_app``: master import app một lần (model, router, index) rồi fork;
+  các worker dùng chung các page đó copy-on-write thay vì mỗi worker load lại.
+* ``gthread``: mỗi request chủ yếu chờ Ollama (I/O), nên mỗi worker phục vụ
+  nhiều request bằng thread; số worker chỉ cần đủ cho phần CPU (embedding, router).
+
+Giới hạn: session chat (chatbot + lịch sử hội thoại trong ``user_chatbots``) nằm
+trong bộ nhớ của từng worker, và gunicorn chia request cho các worker không theo
+session. Với hơn một worker, lượt tiếp theo của một session có thể rơi vào worker
+khác và mất lịch sử. Vì vậy mặc định chỉ 1 worker, tăng ``GUNICORN_THREADS`` để
+phục vụ nhiều request hơn. Chỉ đặt ``GUNICORN_WORKERS`` > 1 khi phía trước có
+load balancer sticky theo session (mỗi worker một port) hoặc khi chấp nhận mất
+lịch sử. ``python -m benchmark.workers`` kiểm tra một session nhiều lượt còn
+đủ lịch sử.
+
+Biến môi trường: PORT, GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_TIMEOUT, GUNICORN_PRELOAD.
+"""
+import gc
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+pythonpath = ",".join([BACKEND_DIR, os.path.join(BACKEND_DIR, "app")])
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# Session nằm trong bộ nhớ worker: xem "Giới hạn" ở trên trước khi tăng số worker
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))  # một lượt chat có thể gồm nhiều lời gọi LLM
+graceful_timeout = 30
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+accesslog = "-"
+
+# HuggingFace tokenizers tự tắt song song (kèm cảnh báo) khi process bị fork sau khi đã dùng
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+_MB = 1024 * 1024
+
+
+def on_starting(server):
+    if workers > 1:
+        server.log.warning(
+            "⚠️ GUNICORN_WORKERS=%s: chat sessions live in worker memory, a session whose "
+            "requests reach another worker loses its history (use sticky routing or 1 worker)",
+            workers,
+        )
+
+
+def pre_fork(server, worker):
+    # Object đã có trong master vào "permanent generation": GC của worker không ghi vào
+    # header của chúng, nên các page đó không bị copy-on-write sang từng worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from llms.llm_manager import llm_manager
+
+        # Socket keep-alive / thread nền của master không dùng chung được giữa các process
+        llm_manager.after_fork()
+
+
+def post_worker_init(worker):
+    from monitoring.metrics import process_memory
+
+    memory = process_memory()
+    worker.log.info(
+        "👷 Worker %s ready: RSS %.0f MB, PSS %.0f MB, shared %.0f MB",
+        worker.pid, memory["rss"] / _MB, memory["pss"] / _MB, memory["shared"] / _MB,
+    )
@@ -1,3 +1,19 @@
+from .concurrency import AdaptiveLimiter, OllamaOverloadedError, OllamaRequestError
+from .label_classifier import LabelChoice, LabelClassifier
 from .ollama_llms import OllamaLLMs
+from .ollama_pool import OllamaPool, session_affinity
+from .residency import ResidencyScheduler
+from .singleflight import SingleFlight
 
-__all__ = ["OllamaLLMs"]
\ No newline at end of file
+__all__ = [
+    "AdaptiveLimiter",
+    "LabelChoice",
+    "LabelClassifier",
+    "OllamaLLMs",
+    "OllamaOverloadedError",
+    "OllamaPool",
+    "OllamaRequestError",
+    "ResidencyScheduler",
+    "SingleFlight",
+    "session_affinity",
+]
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 class BaseLLM(ABC):
@@ -13,10 +13,11 @@ class BaseLLM(ABC):
         self.model_name = model_name
 
     @abstractmethod
-    def generate_content(self, prompt: List[Dict[str, str]]) -> str:
+    def generate_content(self, prompt: List[Dict[str, str]], stage: Optional[str] = None) -> str:
         """
         Sinh output từ model dựa trên prompt.
         prompt: [{"role": "user", "content": "..."}]
+        stage: tên prompt/bước pipeline để áp dụng generation profile (tùy chọn)
         return: output text
         """
         pass
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive concurrency limiter (AIMD) cho các lời gọi Ollama.
+
+Ollama tự xếp hàng các request vượt quá ``OLLAMA_NUM_PARALLEL``: gửi thêm
+request chỉ làm mọi request chậm đi. Limiter học số request đồng thời mà một
+backend chịu được từ latency quan sát được:
+
+* latency của một stage vượt ``tolerance`` lần baseline của stage đó (hoặc
+  backend lỗi: mất kết nối, timeout, 5xx) -> giảm limit theo cấp số nhân (``backoff``);
+* limit đang được dùng hết mà latency vẫn gần baseline -> tăng thêm ``1/limit``
+  (khoảng +1 sau mỗi "cửa sổ" limit request).
+
+Latency dùng để so sánh là thời gian sinh mỗi token (``eval_duration / eval_count``
+trong thống kê Ollama, ghi qua ``LatencySample.record``): nó tăng khi GPU phải chia
+cho nhiều request song song nhưng không phụ thuộc câu trả lời dài hay ngắn, và
+không tính thời gian nạp model. Chỉ khi response không có thống kê mới dùng wall
+time của cả lời gọi. Lỗi phía client (4xx, request sai) không làm thay đổi limit.
+
+Request vượt limit chờ trong hàng đợi giới hạn ``max_queue``; hàng đợi đầy
+hoặc chờ quá ``queue_timeout`` thì ném ``OllamaOverloadedError`` để
+``/api/chat`` trả về 429 + Retry-After.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+
+from monitoring.metrics import OLLAMA_CONCURRENCY_LIMIT, OLLAMA_QUEUE_DEPTH, OLLAMA_REJECTIONS
+
+# Baseline latency mỗi stage trôi dần về latency hiện tại để quên các mức tối thiểu cũ
+_BASELINE_DRIFT = 0.05
+_EWMA_ALPHA = 0.2
+
+
+class OllamaOverloadedError(RuntimeError):
+    """Hàng đợi của limiter đầy hoặc chờ quá lâu; ``retry_after`` tính bằng giây."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OllamaRequestError(ValueError):
+    """
+    Lời gọi Ollama thất bại.
+
+    ``retryable`` chỉ đúng với lỗi phía backend (mất kết nối, timeout, HTTP 5xx);
+    lỗi phía client (4xx, model không tồn tại, schema/format sai) gửi lại ở đâu
+    cũng lỗi như vậy.
+    """
+
+    def __init__(self, message: str, *, status_code: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+    @classmethod
+    def wrap(cls, message: str, error: BaseException) -> "OllamaRequestError":
+        status_code = getattr(error, "status_code", None)
+        return cls(message, status_code=status_code if isinstance(status_code, int) else None, retryable=is_backend_failure(error))
+
+
+def _transport_errors() -> tuple:
+    errors = [ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout]
+    try:
+        import httpx  # transport của ollama.Client
+
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+_TRANSPORT_ERRORS = _transport_errors()
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """
+    Lỗi do backend (mất kết nối, timeout, HTTP 5xx) chứ không phải do request.
+
+    Chỉ các lỗi này mới được tính vào health của backend và được thử lại;
+    lỗi không nhận diện được (ValueError, KeyError...) coi là lỗi phía client.
+    """
+    if isinstance(error, OllamaRequestError):
+        return error.retryable
+    if isinstance(error, _TRANSPORT_ERRORS):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and isinstance(error, requests.HTTPError) and error.response is not None:
+        status_code = error.response.status_code
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class LatencySample:
+    """Thống kê Ollama của lời gọi đang giữ slot (``AdaptiveLimiter.slot`` yield object này)."""
+
+    __slots__ = ("per_token_seconds",)
+
+    def __init__(self):
+        self.per_token_seconds: Optional[float] = None
+
+    def record(self, response: Any) -> None:
+        """Đọc ``eval_count``/``eval_duration`` (ns) từ response của /api/chat hoặc /api/generate."""
+        def field(key: str) -> Any:
+            try:
+                return response.get(key) if hasattr(response, "get") else getattr(response, key, None)
+            except Exception:
+                return None
+
+        count, duration = field("eval_count"), field("eval_duration")
+        if count and duration:
+            self.per_token_seconds = duration / count / 1e9
+
+
+class AdaptiveLimiter:
+    _instances: Dict[str, "AdaptiveLimiter"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.waiting = 0
+        self._baselines: Dict[str, float] = {}
+        self._latency_ewma: Optional[float] = None
+        self._cond = threading.Condition()
+
+        OLLAMA_CONCURRENCY_LIMIT.labels(name).set_function(lambda: self.limit)
+        OLLAMA_QUEUE_DEPTH.labels(name).set_function(lambda: self.waiting)
+        self._rejected_full = OLLAMA_REJECTIONS.labels(name, "queue_full")
+        self._rejected_timeout = OLLAMA_REJECTIONS.labels(name, "queue_timeout")
+
+    @classmethod
+    def for_backend(cls, base_url: str, settings) -> Optional["AdaptiveLimiter"]:
+        """Một limiter cho mỗi Ollama host (các model trên cùng host dùng chung GPU)."""
+        if not settings.OLLAMA_CONCURRENCY_LIMITER:
+            return None
+        with cls._instances_lock:
+            limiter = cls._instances.get(base_url)
+            if limiter is None:
+                limiter = cls._instances[base_url] = cls(
+                    base_url,
+                    initial=settings.OLLAMA_INITIAL_CONCURRENCY,
+                    max_limit=settings.OLLAMA_MAX_CONCURRENCY,
+                    max_queue=settings.OLLAMA_QUEUE_SIZE,
+                    queue_timeout=settings.OLLAMA_QUEUE_TIMEOUT,
+                    tolerance=settings.OLLAMA_LATENCY_TOLERANCE,
+                )
+            return limiter
+
+    @classmethod
+    def all_status(cls) -> Dict[str, Dict[str, float]]:
+        with cls._instances_lock:
+            limiters = dict(cls._instances)
+        return {name: limiter.status() for name, limiter in limiters.items()}
+
+    @property
+    def retry_after(self) -> int:
+        """Ước lượng thời gian (giây) để hàng đợi hiện tại chạy hết."""
+        latency = self._latency_ewma or 1.0
+        return max(1, math.ceil(latency * (self.waiting + 1) / max(self.limit, 1.0)))
+
+    def acquire(self) -> None:
+        with self._cond:
+            if self.waiting == 0 and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            if self.waiting >= self.max_queue:
+                self._rejected_full.inc()
+                raise OllamaOverloadedError(f"Ollama queue full ({self.waiting} waiting)", self.retry_after)
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._rejected_timeout.inc()
+                        raise OllamaOverloadedError(
+                            f"Waited {self.queue_timeout:.0f}s for an Ollama slot", self.retry_after
+                        )
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+    def release(
+        self,
+        stage: Optional[str],
+        seconds: float,
+        ok: bool,
+        *,
+        per_token_seconds: Optional[float] = None,
+        backend_failure: bool = True,
+    ) -> None:
+        """
+        Trả slot. ``per_token_seconds`` (từ ``LatencySample``) được ưu tiên hơn
+        ``seconds`` (wall time); ``backend_failure=False`` khi lỗi là lỗi phía client.
+        """
+        with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self._adjust(stage or "none", seconds, ok, saturated, per_token_seconds, backend_failure)
+            self._cond.notify(max(1, int(self.limit) - self.in_flight))
+
+    def _adjust(
+        self,
+        stage: str,
+        seconds: float,
+        ok: bool,
+        saturated: bool,
+        per_token_seconds: Optional[float] = None,
+        backend_failure: bool = True,
+    ) -> None:
+        if not ok:
+            if backend_failure:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            return
+
+        self._latency_ewma = seconds if self._latency_ewma is None else (
+            self._latency_ewma + _EWMA_ALPHA * (seconds - self._latency_ewma)
+        )
+        # Baseline riêng cho từng loại số đo: per-token và wall time không so sánh được với nhau
+        key, latency = (f"{stage}/token", per_token_seconds) if per_token_seconds is not None else (stage, seconds)
+        baseline = self._baselines.get(key)
+        if baseline is None or latency < baseline:
+            self._baselines[key] = latency
+            baseline = latency
+        else:
+            self._baselines[key] = baseline + _BASELINE_DRIFT * (latency - baseline)
+
+        if latency > self.tolerance * baseline:
+            # Backend bắt đầu xếp hàng nội bộ: giảm số request đồng thời
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    @contextmanager
+    def slot(self, stage: Optional[str] = None) -> Iterator[LatencySample]:
+        """
+        Giữ một slot trong suốt lời gọi Ollama và học từ latency của nó.
+
+        Gọi ``sample.record(response)`` trong block để limiter dùng thời gian mỗi token.
+        """
+        self.acquire()
+        sample = LatencySample()
+        started_at = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            yield sample
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.release(
+                stage,
+                time.perf_counter() - started_at,
+                error is None,
+                per_token_seconds=sample.per_token_seconds,
+                backend_failure=error is None or is_backend_failure(error),
+            )
+
+    def status(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "latency_ewma_s": round(self._latency_ewma or 0.0, 3),
+            }
+
+
+__all__ = ["AdaptiveLimiter", "LatencySample", "OllamaOverloadedError", "OllamaRequestError", "is_backend_failure"]
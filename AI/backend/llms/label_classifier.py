@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Pick one label from a fixed set with Ollama structured output.
+
+The model is constrained by a JSON schema whose only property is an ``enum``
+of the labels, so the answer is always one valid label and costs a handful of
+tokens. With ``use_logprobs`` (Ollama >= 0.12.11) the joint probability of the
+generated tokens is returned as the score of the choice.
+"""
+import json
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .utils import strip_think
+
+
+@dataclass(frozen=True)
+class LabelChoice:
+    label: str
+    score: Optional[float]  # xác suất của output (logprobs); None khi không có logprobs
+    valid: bool  # False: output không chứa nhãn hợp lệ, trả về nhãn mặc định
+
+
+class LabelClassifier:
+    def __init__(
+        self,
+        llm,
+        labels: Sequence[str],
+        default: str,
+        *,
+        stage: Optional[str] = None,
+        field: str = "label",
+        use_logprobs: bool = False,
+    ):
+        if default not in labels:
+            raise ValueError(f"Default label {default!r} is not one of the labels")
+        self.llm = llm
+        self.labels = tuple(labels)
+        self.default = default
+        self.stage = stage
+        self.field = field
+        self.use_logprobs = use_logprobs
+        self._by_length = sorted(self.labels, key=len, reverse=True)
+
+    def schema(self) -> dict:
+        return {
+            "type": "object",
+            "properties": {self.field: {"type": "string", "enum": list(self.labels)}},
+            "required": [self.field],
+            "additionalProperties": False,
+        }
+
+    def _parse(self, content: str) -> Optional[str]:
+        try:
+            value = json.loads(content).get(self.field)
+        except (ValueError, AttributeError):
+            value = None
+        if value in self.labels:
+            return value
+        # Server cũ bỏ qua ``format``: tìm nhãn trong text (nhãn dài trước)
+        text = strip_think(content or "")
+        for label in self._by_length:
+            if label in text:
+                return label
+        return None
+
+    @staticmethod
+    def _score(response: Any) -> Optional[float]:
+        logprobs = response.get("logprobs") if hasattr(response, "get") else None
+        if not logprobs:
+            return None
+        return math.exp(sum(item["logprob"] for item in logprobs))
+
+    def classify(self, prompt: Union[str, List[Dict[str, str]]]) -> LabelChoice:
+        """Classify one prompt (text or chat messages); always returns one of ``labels``."""
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        options = {"format": self.schema()}
+        if self.use_logprobs:
+            options["logprobs"] = True
+        response = self.llm.chat_response(messages, stage=self.stage, **options)
+
+        label = self._parse(response["message"]["content"])
+        if label is None:
+            return LabelChoice(self.default, None, False)
+        return LabelChoice(label, self._score(response), True)
+
+
+__all__ = ["LabelChoice", "LabelClassifier"]
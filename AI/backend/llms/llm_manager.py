@@ -4,9 +4,12 @@ LLM Manager - Singleton pattern để quản lý các LLM instances
 """
 import os
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from .ollama_llms import OllamaLLMs
+from .ollama_pool import OllamaPool
+from .residency import ResidencyScheduler
 from setting import Settings
+from monitoring.metrics import record_cache_lookup
 
 try:
     from sentence_transformers import SentenceTransformer
@@ -15,13 +18,17 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     SentenceTransformer = None
 
+# Các stage của pipeline có thể chạy trên model riêng (Settings.<TIER>_MODEL)
+MODEL_TIERS = ("reflection", "classification", "extraction", "answer")
+
 
 class LLMManager:
     """Singleton manager for LLM instances and embedding models"""
     
     _instance = None
-    _instances: Dict[str, OllamaLLMs] = {}
+    _instances: Dict[str, Union[OllamaLLMs, OllamaPool]] = {}
     _embedding_models: Dict[str, Any] = {}  # Use Any instead of SentenceTransformer for type safety
+    _residency: Optional[ResidencyScheduler] = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -37,16 +44,16 @@ class LLMManager:
     
     def get_ollama_client(self, 
                          base_url: Optional[str] = None, 
-                         model_name: Optional[str] = None) -> OllamaLLMs:
+                         model_name: Optional[str] = None) -> Union[OllamaLLMs, OllamaPool]:
         """
         Get or create Ollama client instance
         
         Args:
-            base_url: Ollama server URL
+            base_url: Ollama server URL (bỏ qua khi OLLAMA_BACKENDS cấu hình pool)
             model_name: Model name
             
         Returns:
-            OllamaLLMs: Cached or new instance
+            OllamaLLMs (hoặc OllamaPool khi có OLLAMA_BACKENDS): Cached or new instance
         """
         settings = Settings.load_settings()
 
@@ -58,23 +65,96 @@ class LLMManager:
         if not model_name:
             model_name = settings.OLLAMA_MODEL
         
-        # Create instance key
-        instance_key = f"{base_url}#{model_name}"
+        # Create instance key (một pool dùng chung cho mọi base_url khi có OLLAMA_BACKENDS)
+        instance_key = f"pool#{model_name}" if settings.OLLAMA_BACKENDS else f"{base_url}#{model_name}"
         
         # Return existing instance if available
+        record_cache_lookup("llm_clients", instance_key in self._instances)
         if instance_key in self._instances:
             self.logger.info(f"♻️ Reusing existing Ollama client for {model_name}")
             return self._instances[instance_key]
         
         # Create new instance
-        self.logger.info(f"🔥 Creating new Ollama client for {model_name}")
-        client = OllamaLLMs(base_url=base_url, model_name=model_name)
+        if settings.OLLAMA_BACKENDS:
+            self.logger.info(f"🔥 Creating Ollama pool for {model_name}: {settings.OLLAMA_BACKENDS}")
+            client = OllamaPool.from_settings(settings, model_name)
+        else:
+            self.logger.info(f"🔥 Creating new Ollama client for {model_name}")
+            client = OllamaLLMs(base_url=base_url, model_name=model_name)
         self._instances[instance_key] = client
         
         return client
     
+    def model_for_tier(self, tier: str, settings: Optional[Settings] = None) -> str:
+        """
+        Model của một stage: ``<TIER>_MODEL`` trong Settings, rỗng thì dùng OLLAMA_MODEL
+        """
+        if tier not in MODEL_TIERS:
+            raise ValueError(f"Unknown model tier '{tier}', expected one of {MODEL_TIERS}")
+        settings = settings or Settings.load_settings()
+        return getattr(settings, f"{tier.upper()}_MODEL") or settings.OLLAMA_MODEL
+    
+    def tier_models(self, settings: Optional[Settings] = None) -> Dict[str, str]:
+        """Tier -> model đang được cấu hình"""
+        settings = settings or Settings.load_settings()
+        return {tier: self.model_for_tier(tier, settings) for tier in MODEL_TIERS}
+    
+    def get_tier_client(self, tier: str, base_url: Optional[str] = None) -> Union[OllamaLLMs, OllamaPool]:
+        """
+        Client cho một stage (reflection, classification, extraction, answer); các tier cùng model dùng chung client
+        """
+        return self.get_ollama_client(base_url=base_url, model_name=self.model_for_tier(tier))
+    
+    def start_residency(self, base_url: Optional[str] = None) -> Optional[ResidencyScheduler]:
+        """
+        Warm-up song song model của mọi tier rồi chạy thread gia hạn keep_alive (một lần cho cả process)
+        
+        Returns:
+            ResidencyScheduler, hoặc None khi MODEL_RESIDENCY_SCHEDULER tắt
+        """
+        settings = Settings.load_settings()
+        if not settings.MODEL_RESIDENCY_SCHEDULER:
+            return None
+        if self._residency is None:
+            clients = [
+                self.get_ollama_client(base_url=base_url, model_name=model_name)
+                for model_name in sorted(set(self.tier_models(settings).values()))
+            ]
+            scheduler = ResidencyScheduler(
+                clients,
+                keep_alive=settings.MODEL_KEEP_ALIVE,
+                interval=settings.MODEL_RESIDENCY_INTERVAL,
+            )
+            scheduler.warm_all()
+            LLMManager._residency = scheduler.start()
+        return self._residency
+    
+    def residency_status(self) -> Optional[Dict[str, Any]]:
+        """Model nào đang resident trên host nào (None khi scheduler chưa chạy)"""
+        return self._residency.status() if self._residency else None
+    
+    def after_fork(self):
+        """
+        Gọi trong mỗi worker ngay sau fork (gunicorn ``post_fork``): client được tạo trong master
+        giữ lại (cùng limiter, cùng model), nhưng kết nối HTTP và thread nền được tạo lại
+        """
+        OllamaLLMs._client_cache.clear()
+        for instance in self._instances.values():
+            if isinstance(instance, OllamaPool):
+                instance.after_fork()
+            else:
+                instance.reconnect()
+        # Thread của residency scheduler chỉ chạy trong master: một scheduler cho mọi worker
+        LLMManager._residency = None
+    
     def clear_cache(self):
         """Clear all cached instances"""
+        if self._residency is not None:
+            self._residency.stop()
+            LLMManager._residency = None
+        for instance in self._instances.values():
+            if isinstance(instance, OllamaPool):
+                instance.close()
         self._instances.clear()
         self.logger.info("🧹 Cleared all LLM instances cache")
     
@@ -86,6 +166,10 @@ class LLMManager:
         """List all cached instances"""
         return {key: str(instance) for key, instance in self._instances.items()}
     
+    def pool_status(self) -> List[Dict[str, Any]]:
+        """Trạng thái các Ollama pool (backend, request đang chạy, health)"""
+        return [instance.status() for instance in self._instances.values() if isinstance(instance, OllamaPool)]
+    
     def get_embedding_model(self, model_name: str = 'all-MiniLM-L6-v2') -> Optional[Any]:
         """
         Get or create embedding model instance
@@ -3,9 +3,14 @@ import ollama
 import requests
 import json
 import logging
+from contextlib import nullcontext
 from typing import List, Dict, Optional, Callable, Any, Union
 from .base import BaseLLM
+from .concurrency import AdaptiveLimiter, OllamaOverloadedError, OllamaRequestError
+from .singleflight import SingleFlight
 from setting import Settings
+from monitoring.tracing import current_span, record_ollama_stats, span
+from prompt.promt_config import PromptConfig
 
 
 
@@ -13,6 +18,7 @@ class OllamaLLMs(BaseLLM):
     # Class-level cache để tránh multiple warm-up
     _warmed_models = set()  # Cache các models đã warm-up
     _client_cache = {}  # Cache các client instances
+    _single_flight = SingleFlight("llm")  # Gộp các request giống hệt nhau đang chạy (mọi instance)
     
     def __init__(self, base_url: str = "http://localhost:11434", model_name: str = "", **kwargs):
         """
@@ -27,10 +33,29 @@ class OllamaLLMs(BaseLLM):
 
         super().__init__(model_name=resolved_model, **kwargs)
         self.base_url = resolved_base_url.rstrip("/")
+        self.default_keep_alive = settings.MODEL_KEEP_ALIVE
+        self.timeout = settings.OLLAMA_TIMEOUT
+        self.prompt_layout = settings.PROMPT_LAYOUT
+        # None khi OLLAMA_CONCURRENCY_LIMITER tắt; dùng chung cho mọi model trên cùng host
+        self.limiter = AdaptiveLimiter.for_backend(self.base_url, settings)
+        self.single_flight = self._single_flight if settings.SINGLE_FLIGHT else None
         
         # Create cache key
         self.cache_key = f"{self.base_url}#{self.model_name}"
+        self._connect()
         
+        # Only warm-up if not already warmed
+        if self.cache_key in self.__class__._warmed_models:
+            self.logger.info(f"⚡ Model {self.model_name} already warmed up, skipping...")
+        elif settings.MODEL_RESIDENCY_SCHEDULER:
+            # ResidencyScheduler.warm_all warm-up mọi model song song lúc khởi động
+            self.logger.info(f"⏳ Warm-up of {self.model_name} left to the residency scheduler")
+        else:
+            self._ensure_model_loaded()
+            self.__class__._warmed_models.add(self.cache_key)
+    
+    def _connect(self):
+        """Tạo (hoặc lấy từ cache) ollama.Client và requests.Session cho host + model này"""
         # Reuse existing client if available
         if self.cache_key in self.__class__._client_cache:
             cached_client = self.__class__._client_cache[self.cache_key]
@@ -61,15 +86,22 @@ class OllamaLLMs(BaseLLM):
                 'session': self.session,
                 'logger': self.logger
             }
-        
-        # Only warm-up if not already warmed
-        if self.cache_key not in self.__class__._warmed_models:
-            self._ensure_model_loaded()
+    
+    def reconnect(self):
+        """
+        Tạo lại kết nối HTTP (gọi trong worker sau fork): socket keep-alive mở trong master
+        không được dùng chung giữa các process. Gọi ``_client_cache.clear()`` trước.
+        """
+        self._connect()
+    
+    def warm_up(self) -> bool:
+        """Warm-up model (dùng bởi ResidencyScheduler); True khi model đã được load"""
+        ok = self._ensure_model_loaded()
+        if ok:
             self.__class__._warmed_models.add(self.cache_key)
-        else:
-            self.logger.info(f"⚡ Model {self.model_name} already warmed up, skipping...")
+        return ok
     
-    def _ensure_model_loaded(self):
+    def _ensure_model_loaded(self) -> bool:
         """
         Đảm bảo model đã được load vào memory (warm-up)
         """
@@ -78,73 +110,154 @@ class OllamaLLMs(BaseLLM):
             warmup_response = self.client.chat(
                 model=self.model_name,
                 messages=[{"role": "user", "content": "Hi"}],
-                options={"num_predict": 1}  # Chỉ generate 1 token
+                options={"num_predict": 1},  # Chỉ generate 1 token
+                keep_alive=self.default_keep_alive
             )
             self.logger.info(f"🔥 Model {self.model_name} warmed up successfully")
+            return True
         except Exception as e:
             self.logger.warning(f"⚠️ Model warm-up failed: {e}")
+            return False
     
-    def keep_alive(self, duration: int = 300):
+    def keep_alive(self, duration: int = 300) -> bool:
         """
-        Giữ model trong memory trong khoảng thời gian nhất định
+        Giữ model trong memory trong khoảng thời gian nhất định (load model nếu chưa được load)
         Args:
             duration: Thời gian giữ model (giây), -1 = vĩnh viễn
+        Returns:
+            bool: True khi Ollama chấp nhận request
         """
         try:
             payload = {
                 "model": self.model_name,
                 "keep_alive": duration if duration > 0 else -1
             }
-            self.session.post(f"{self.base_url}/api/generate", json=payload)
+            resp = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+            if resp.status_code != 200:
+                self.logger.warning(f"⚠️ Keep-alive failed for {self.model_name}: {resp.status_code}, {resp.text}")
+                return False
             self.logger.info(f"🔄 Model {self.model_name} keep-alive set to {duration}s")
+            return True
         except Exception as e:
             self.logger.warning(f"⚠️ Keep-alive failed: {e}")
+            return False
 
-    def generate_content(self, prompt: List[Dict[str, str]]) -> str:
+    def _generation_params(self, stage: Optional[str], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Generate content using the legacy API (backward compatibility)
+        Options + keep_alive cho một request: profile của stage (PromptConfig), ghi đè bởi options truyền vào.
         """
+        profile = PromptConfig.get_generation_profile(stage)
+        merged = profile.options() if profile else {}
+        merged.update(options or {})
+        keep_alive = profile.keep_alive if profile and profile.keep_alive is not None else self.default_keep_alive
+
+        params: Dict[str, Any] = {"keep_alive": keep_alive}
+        if merged:
+            params["options"] = merged
+        return params
+
+    def _slot(self, stage: Optional[str]):
+        """Slot của adaptive concurrency limiter (no-op, yield None khi limiter tắt)"""
+        return self.limiter.slot(stage) if self.limiter is not None else nullcontext()
+
+    def _coalesce(self, body: Dict[str, Any], function: Callable[[], Any]) -> Any:
+        """
+        Chạy ``function`` qua single-flight: request đồng thời cùng host, model, prompt và options dùng chung một lần gọi Ollama.
+        """
+        if self.single_flight is None:
+            return function()
+        key = json.dumps({"base_url": self.base_url, **body}, sort_keys=True, ensure_ascii=False, default=str)
+        result, shared = self.single_flight.do(key, function)
+        if shared:
+            current_span().set_attribute("coalesced", True)
+        return result
+
+    def generate_content(self, prompt: List[Dict[str, str]], stage: Optional[str] = None) -> str:
+        """
+        Generate content for a list of messages.
+
+        With ``PROMPT_LAYOUT=chat`` the messages go unchanged to /api/chat, so a system
+        message from ``PromptConfig.get_messages`` stays a stable, cacheable prefix;
+        otherwise they are flattened into one prompt for /api/generate (legacy API).
+
+        Args:
+            prompt: List of message dicts with 'role' and 'content'
+            stage: Prompt name whose generation profile (num_predict, stop, ...) applies
+        """
+        if self.prompt_layout == "chat":
+            return self.chat(prompt, stage=stage)
+
         messages = "\n".join([f"{p['role']}: {p['content']}" for p in prompt])
 
         payload = {
             "model": self.model_name,
             "prompt": messages,
             "stream": False,
+            **self._generation_params(stage),
         }
 
-        resp = requests.post(
-            f"{self.base_url}/api/generate",
-            json=payload,
-        )
+        def generate():
+            with span("llm.generate", model=self.model_name, stage=stage) as generate_span, self._slot(stage) as sample:
+                resp = requests.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                )
 
-        if resp.status_code != 200:
-            raise ValueError(f"Ollama request failed: {resp.status_code}, {resp.text}")
+                if resp.status_code != 200:
+                    raise OllamaRequestError(
+                        f"Ollama request failed: {resp.status_code}, {resp.text}",
+                        status_code=resp.status_code,
+                        retryable=resp.status_code >= 500,
+                    )
 
-        data = resp.json()
-        return data.get("response", "")
+                data = resp.json()
+                record_ollama_stats(generate_span, data, stage)
+                if sample is not None:
+                    sample.record(data)
+            return data
 
-    def chat(self, messages: List[Dict[str, str]], **options) -> str:
+        return self._coalesce({"endpoint": "generate", **payload}, generate).get("response", "")
+
+    def chat(self, messages: List[Dict[str, str]], stage: Optional[str] = None, **options) -> str:
         """
         Chat using Ollama 0.4 API without tools
         
         Args:
             messages: List of message dicts with 'role' and 'content'
-            **options: Additional options (temperature, etc.)
+            stage: Prompt name whose generation profile (num_predict, stop, ...) applies
+            **options: Additional client.chat arguments (format, options={...}); explicit options win over the profile
         
         Returns:
             str: Generated response
         """
-        
+        return self.chat_response(messages, stage=stage, **options)['message']['content']
+
+    def chat_response(self, messages: List[Dict[str, str]], stage: Optional[str] = None, **options) -> Any:
+        """
+        Same as ``chat`` but returns the full Ollama response (message, timings, logprobs...).
+        """
         try:
-            response = self.client.chat(
-                model=self.model_name,
-                messages=messages,
-                **options
-            )
-            return response['message']['content']
+            params = self._generation_params(stage, options.pop("options", None))
+            params.update(options)
+
+            def chat():
+                with span("llm.chat", model=self.model_name, stage=stage) as chat_span, self._slot(stage) as sample:
+                    response = self.client.chat(
+                        model=self.model_name,
+                        messages=messages,
+                        **params
+                    )
+                    record_ollama_stats(chat_span, response, stage)
+                    if sample is not None:
+                        sample.record(response)
+                return response
+
+            return self._coalesce({"endpoint": "chat", "model": self.model_name, "messages": messages, **params}, chat)
+        except (OllamaOverloadedError, OllamaRequestError):
+            raise
         except Exception as e:
             self.logger.error(f"Chat error: {e}")
-            raise ValueError(f"Chat request failed: {str(e)}")
+            raise OllamaRequestError.wrap(f"Chat request failed: {str(e)}", e) from e
 
     
 
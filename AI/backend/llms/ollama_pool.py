@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Pool nhiều Ollama backend cho cùng một model.
+
+* Routing: backend có ít request đang chạy nhất (chia theo ``weight``).
+* Session affinity: các lượt của cùng một session ưu tiên backend cũ để KV
+  cache (system prompt, lịch sử) còn nóng, trừ khi backend đó bận hơn backend
+  rảnh nhất quá ``affinity_slack`` request.
+* Health: ``max_failures`` lỗi backend liên tiếp (mất kết nối, timeout, 5xx)
+  thì backend bị loại (eject); lỗi phía client (4xx, schema sai, ValueError)
+  được ném lại ngay, không thử lại và không tính vào health. Một
+  thread probe ``/api/version`` và nhận lại backend khi probe thành công.
+  Thời gian eject tăng gấp đôi sau mỗi lần probe thất bại.
+
+``OllamaPool`` có cùng interface với ``OllamaLLMs`` (generate_content, chat,
+chat_response) nên ``llm_manager`` trả về pool khi ``OLLAMA_BACKENDS`` được cấu hình.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+from .base import BaseLLM
+from .concurrency import OllamaOverloadedError, is_backend_failure
+from monitoring.metrics import OLLAMA_BACKEND_EJECTIONS, OLLAMA_BACKEND_OUTSTANDING, OLLAMA_BACKEND_REQUESTS
+from monitoring.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+_session = contextvars.ContextVar("ollama_session", default=None)
+
+# Eject tối đa eject_seconds * 2**5 khi backend chết lâu
+_MAX_BACKOFF_EXPONENT = 5
+
+
+@contextmanager
+def session_affinity(session_id: Optional[str]) -> Iterator[None]:
+    """Gắn các lời gọi LLM bên trong (kể cả thread copy context) với một session."""
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def parse_backends(spec: str) -> List[Tuple[str, float]]:
+    """
+    "http://gpu1:11434=3,http://gpu2:11434" -> [("http://gpu1:11434", 3.0), ("http://gpu2:11434", 1.0)]
+    """
+    backends = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, weight = item.partition("=")
+        backends.append((url.strip().rstrip("/"), float(weight) if weight.strip() else 1.0))
+    return backends
+
+
+def _probe_version(url: str) -> bool:
+    try:
+        return requests.get(f"{url}/api/version", timeout=2).status_code == 200
+    except requests.RequestException:
+        return False
+
+
+class Backend:
+    __slots__ = ("url", "weight", "llm", "outstanding", "healthy", "failures", "ejections", "ejected_until", "requests", "errors")
+
+    def __init__(self, url: str, weight: float, llm: Any):
+        self.url = url
+        self.weight = max(weight, 0.01)
+        self.llm = llm
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0  # lỗi liên tiếp
+        self.ejections = 0  # số lần eject liên tiếp (backoff)
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def load(self) -> float:
+        # +1: khi cùng rảnh, backend weight lớn hơn được chọn trước
+        return (self.outstanding + 1) / self.weight
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "consecutive_failures": self.failures,
+            "ejected_for_s": round(max(0.0, self.ejected_until - time.monotonic()), 1) if not self.healthy else 0.0,
+        }
+
+
+class OllamaPool(BaseLLM):
+    def __init__(
+        self,
+        backends: Sequence[Tuple[str, float]],
+        model_name: str,
+        *,
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        probe_interval: float = 10.0,
+        affinity_slack: int = 2,
+        max_sessions: int = 10000,
+        client_factory: Optional[Callable[[str, str], Any]] = None,
+        probe: Optional[Callable[[str], bool]] = None,
+    ):
+        if not backends:
+            raise ValueError("OllamaPool needs at least one backend")
+        super().__init__(model_name=model_name)
+
+        if client_factory is None:
+            from .ollama_llms import OllamaLLMs
+
+            client_factory = lambda url, model: OllamaLLMs(base_url=url, model_name=model)  # noqa: E731
+
+        self.backends = [Backend(url, weight, client_factory(url, model_name)) for url, weight in backends]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.affinity_slack = affinity_slack
+        self.max_sessions = max_sessions
+        self.probe = probe or _probe_version
+        self._affinity: "OrderedDict[str, Backend]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        for backend in self.backends:
+            OLLAMA_BACKEND_OUTSTANDING.labels(backend.url).set_function(lambda b=backend: b.outstanding)
+
+        self.probe_interval = probe_interval
+        self._stop = threading.Event()
+        self._probe_thread = None
+        self._start_probe()
+
+    @classmethod
+    def from_settings(cls, settings, model_name: str) -> "OllamaPool":
+        return cls(
+            parse_backends(settings.OLLAMA_BACKENDS),
+            model_name,
+            max_failures=settings.OLLAMA_POOL_MAX_FAILURES,
+            eject_seconds=settings.OLLAMA_POOL_EJECT_SECONDS,
+            probe_interval=settings.OLLAMA_POOL_PROBE_INTERVAL,
+            affinity_slack=settings.OLLAMA_POOL_AFFINITY_SLACK,
+        )
+
+    @property
+    def base_url(self) -> str:
+        """URL của backend khỏe đầu tiên (cho các endpoint kiểm tra /api/version, /api/tags)"""
+        return next((b.url for b in self.backends if b.healthy), self.backends[0].url)
+
+    # --- routing -----------------------------------------------------------
+
+    def _acquire(self, exclude: Sequence[Backend] = ()) -> Backend:
+        with self._lock:
+            candidates = [b for b in self.backends if b.healthy and b not in exclude]
+            if not candidates:
+                # Tất cả đều bị eject: thử backend sắp hết hạn eject nhất thay vì fail ngay
+                remaining = [b for b in self.backends if b not in exclude]
+                if not remaining:
+                    raise ValueError("No Ollama backend available")
+                candidates = [min(remaining, key=lambda b: b.ejected_until)]
+
+            chosen = min(candidates, key=lambda b: b.load)
+            session_id = _session.get()
+            if session_id is not None:
+                sticky = self._affinity.get(session_id)
+                if sticky in candidates and sticky.outstanding - chosen.outstanding <= self.affinity_slack:
+                    chosen = sticky
+                self._affinity[session_id] = chosen
+                self._affinity.move_to_end(session_id)
+                while len(self._affinity) > self.max_sessions:
+                    self._affinity.popitem(last=False)
+
+            chosen.outstanding += 1
+            return chosen
+
+    def _release(self, backend: Backend, outcome: str) -> None:
+        """
+        outcome: ok, error (lỗi backend), client_error (request sai, không tính là lỗi
+        health) hoặc rejected (limiter của backend đầy, không tính là lỗi health)
+        """
+        with self._lock:
+            backend.outstanding -= 1
+            backend.requests += 1
+            if outcome == "ok":
+                backend.failures = 0
+            elif outcome == "error":
+                backend.errors += 1
+                backend.failures += 1
+                if backend.healthy and backend.failures >= self.max_failures:
+                    self._eject(backend)
+        OLLAMA_BACKEND_REQUESTS.labels(backend.url, outcome).inc()
+
+    def _eject(self, backend: Backend) -> None:
+        backoff = self.eject_seconds * 2 ** min(backend.ejections, _MAX_BACKOFF_EXPONENT)
+        backend.healthy = False
+        backend.ejected_until = time.monotonic() + backoff
+        backend.ejections += 1
+        OLLAMA_BACKEND_EJECTIONS.labels(backend.url).inc()
+        logger.warning(f"⚠️ Ejected Ollama backend {backend.url} for {backoff:.0f}s after {backend.failures} failures")
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        # Lỗi ở một backend (kết nối, timeout, 5xx): thử lại một lần trên backend khác (nếu có);
+        # lỗi phía client: ném lại ngay, gửi lại ở backend khác cũng lỗi như vậy;
+        # backend quá tải (hàng đợi limiter đầy): thử lần lượt các backend còn lại
+        tried: List[Backend] = []
+        errors = 0
+        while True:
+            backend = self._acquire(tried)
+            current_span().set_attribute("ollama_backend", backend.url)
+            try:
+                result = getattr(backend.llm, method)(*args, **kwargs)
+            except OllamaOverloadedError:
+                self._release(backend, "rejected")
+                tried.append(backend)
+                if len(tried) >= len(self.backends):
+                    raise
+                continue
+            except Exception as error:
+                if not is_backend_failure(error):
+                    self._release(backend, "client_error")
+                    raise
+                self._release(backend, "error")
+                tried.append(backend)
+                errors += 1
+                if errors >= 2 or len(tried) >= len(self.backends):
+                    raise
+                logger.warning(f"Ollama backend {backend.url} failed, retrying on another backend")
+                continue
+            self._release(backend, "ok")
+            return result
+
+    # --- health probes -----------------------------------------------------
+
+    def _start_probe(self) -> None:
+        if self.probe_interval > 0:
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, args=(self.probe_interval,), name="ollama-pool-probe", daemon=True
+            )
+            self._probe_thread.start()
+
+    def after_fork(self) -> None:
+        """Trong worker sau fork: kết nối mới cho mỗi backend, lock mới và chạy lại thread probe."""
+        self._lock = threading.Lock()
+        for backend in self.backends:
+            backend.llm.reconnect()
+        if not self._stop.is_set():
+            self._start_probe()
+
+    def _probe_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.probe_ejected()
+
+    def probe_ejected(self) -> None:
+        """Probe các backend đã hết thời gian eject; nhận lại nếu probe thành công."""
+        now = time.monotonic()
+        due = [b for b in self.backends if not b.healthy and b.ejected_until <= now]
+        for backend in due:
+            healthy = self.probe(backend.url)
+            with self._lock:
+                if healthy:
+                    backend.healthy = True
+                    backend.failures = 0
+                    backend.ejections = 0
+                    logger.info(f"✅ Ollama backend {backend.url} re-admitted")
+                else:
+                    backoff = self.eject_seconds * 2 ** min(backend.ejections, _MAX_BACKOFF_EXPONENT)
+                    backend.ejected_until = time.monotonic() + backoff
+                    backend.ejections += 1
+
+    def close(self) -> None:
+        self._stop.set()
+
+    # --- OllamaLLMs interface ------------------------------------------------
+
+    def generate_content(self, prompt: List[Dict[str, str]], stage: Optional[str] = None) -> str:
+        return self._call("generate_content", prompt, stage=stage)
+
+    def chat(self, messages: List[Dict[str, str]], stage: Optional[str] = None, **options) -> str:
+        return self._call("chat", messages, stage=stage, **options)
+
+    def chat_response(self, messages: List[Dict[str, str]], stage: Optional[str] = None, **options) -> Any:
+        return self._call("chat_response", messages, stage=stage, **options)
+
+    def keep_alive(self, duration: int = 300) -> bool:
+        return all([backend.llm.keep_alive(duration) for backend in self.backends if backend.healthy])
+
+    def is_warmed_up(self) -> bool:
+        return any(backend.llm.is_warmed_up() for backend in self.backends if backend.healthy)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "backends": [backend.status() for backend in self.backends],
+                "sticky_sessions": len(self._affinity),
+            }
+
+    def __str__(self) -> str:
+        return f"OllamaPool({self.model_name}, {[b.url for b in self.backends]})"
+
+
+__all__ = ["Backend", "OllamaPool", "parse_backends", "session_affinity"]
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Residency scheduler: giữ các model đã cấu hình luôn nằm trong bộ nhớ Ollama.
+
+* Khởi động: warm-up mọi model (mọi tier, mọi backend của pool) song song thay
+  vì lần lượt trong constructor của ``OllamaLLMs``.
+* Định kỳ (``interval``): đọc ``/api/ps`` của từng host. Model còn resident thì
+  gia hạn ``keep_alive``; model đã bị unload (idle quá lâu, bị model khác đẩy ra)
+  thì load lại ngay, ngoài đường đi của request. Mỗi lần load lại được đếm vào
+  ``ollama_cold_loads_total{source="scheduler"}``.
+
+Lượt load mà request của người dùng phải chịu được đo từ ``load_duration`` của
+chính response (``source="request"``, xem ``record_ollama_stats``).
+
+Các model của mọi tier phải vừa bộ nhớ cùng lúc, nếu không scheduler sẽ load
+lại chúng luân phiên.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import requests
+
+from monitoring.metrics import OLLAMA_COLD_LOADS, OLLAMA_MODEL_RESIDENT
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model_name(name: str) -> str:
+    """Ollama báo "qwen3:latest" cho model được cấu hình là "qwen3"."""
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+def _leaf_clients(clients: Iterable[Any]) -> List[Any]:
+    """OllamaPool -> OllamaLLMs của từng backend; bỏ trùng (cùng host + model)."""
+    leaves: Dict[str, Any] = {}
+    for client in clients:
+        for llm in [backend.llm for backend in client.backends] if hasattr(client, "backends") else [client]:
+            leaves.setdefault(f"{llm.base_url}#{llm.model_name}", llm)
+    return list(leaves.values())
+
+
+class ResidencyScheduler:
+    def __init__(self, clients: Iterable[Any], *, keep_alive: int = 600, interval: float = 60.0, timeout: float = 5.0):
+        self.clients = _leaf_clients(clients)
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.timeout = timeout
+        self._resident: Dict[str, Optional[bool]] = {self._key(llm): None for llm in self.clients}
+        self._last_refresh: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(llm: Any) -> str:
+        return f"{llm.base_url}#{llm.model_name}"
+
+    def warm_all(self) -> Dict[str, bool]:
+        """Warm-up mọi model song song; trả về cache key -> thành công."""
+        if not self.clients:
+            return {}
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.clients), thread_name_prefix="ollama-warmup") as pool:
+            results = dict(zip(map(self._key, self.clients), pool.map(lambda llm: llm.warm_up(), self.clients)))
+        for key, ok in results.items():
+            self._resident[key] = ok
+        logger.info(f"🔥 Warmed {sum(results.values())}/{len(results)} Ollama models in {time.perf_counter() - started_at:.2f}s")
+        return results
+
+    def resident_models(self, base_url: str) -> Optional[Set[str]]:
+        """Model đang nằm trong bộ nhớ của một host (``/api/ps``); None khi host không trả lời."""
+        try:
+            response = requests.get(f"{base_url}/api/ps", timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Ollama /api/ps failed for {base_url}: {e}")
+            return None
+        names = set()
+        for model in response.json().get("models") or []:
+            for field in ("name", "model"):
+                if model.get(field):
+                    names.add(normalize_model_name(model[field]))
+        return names
+
+    def refresh(self) -> None:
+        """Gia hạn keep_alive của model còn resident, load lại model đã bị unload."""
+        by_host: Dict[str, Optional[Set[str]]] = {}
+        for llm in self.clients:
+            if llm.base_url not in by_host:
+                by_host[llm.base_url] = self.resident_models(llm.base_url)
+            resident = by_host[llm.base_url]
+            if resident is None:
+                continue  # host không trả lời: health check của pool xử lý
+
+            key = self._key(llm)
+            is_resident = normalize_model_name(llm.model_name) in resident
+            OLLAMA_MODEL_RESIDENT.labels(llm.base_url, llm.model_name).set(1 if is_resident else 0)
+            if not is_resident:
+                OLLAMA_COLD_LOADS.labels(llm.model_name, "scheduler").inc()
+                logger.info(f"🔄 Model {llm.model_name} was unloaded from {llm.base_url}, reloading")
+            # keep_alive không kèm prompt: load model nếu cần và đặt lại thời gian giữ model
+            self._resident[key] = llm.keep_alive(self.keep_alive)
+        self._last_refresh = time.monotonic()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:  # không để thread chết vì một lần refresh lỗi
+                logger.warning(f"⚠️ Model residency refresh failed: {e}")
+
+    def start(self) -> "ResidencyScheduler":
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name="ollama-residency", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval,
+            "keep_alive_s": self.keep_alive,
+            "last_refresh_s_ago": round(time.monotonic() - self._last_refresh, 1) if self._last_refresh else None,
+            "models": [
+                {"base_url": llm.base_url, "model": llm.model_name, "resident": self._resident[self._key(llm)]}
+                for llm in self.clients
+            ],
+        }
+
+
+__all__ = ["ResidencyScheduler", "normalize_model_name"]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight: các lời gọi giống hệt nhau đang chạy đồng thời dùng chung một lần tính.
+
+Caller đầu tiên với một key chạy ``function``; các caller tới trong lúc đó chờ
+và nhận cùng kết quả (hoặc cùng exception). Key được xóa ngay khi lời gọi xong,
+nên đây không phải cache: request tới sau vẫn gọi lại model.
+
+Kết quả được chia sẻ giữa các caller, vì vậy caller không được sửa nó tại chỗ.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from monitoring.metrics import COALESCED_REQUESTS
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._coalesced = COALESCED_REQUESTS.labels(name)
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True when another caller computed it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._coalesced.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+__all__ = ["SingleFlight"]
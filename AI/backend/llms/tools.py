@@ -9,28 +9,9 @@ from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 
-from MCP.server import find_documents, enhance_question, intent_classification
+from MCP.server import intent_classification, retrive_job_postings
 
 
-# tool for mongoDB
-def search_job_info_from_mongo(collection: str, query: str) -> Dict:
-    """
-    Tìm kiếm thông tin công việc từ MongoDB
-
-    Args:
-        collection: Tên collection trong MongoDB
-        query: Từ khóa tìm kiếm
-
-    Returns:
-        dict: Kết quả tìm kiếm
-    """
-    # Simple text search in MongoDB
-    filter_query = {"$text": {"$search": query}}
-    results = find_documents(collection, filter_query)
-    if not results:
-        return {"message": "No jobs found matching the query."}
-    return results
-
 def tool_self_query() -> str:
     """
     Tool này trả về tên và chức năng của chính nó
@@ -85,53 +66,31 @@ def get_current_time() -> str:
 
 
 
-def search_job_info(query: str, job_type: str = "all") -> Dict:
+def search_job_info(query: str, job_type: str = "all", location: str = "") -> Dict:
     """
-    Tìm kiếm thông tin công việc (mock function)
+    Tìm kiếm các tin tuyển dụng đang mở (hybrid search trên Qdrant)
 
     Args:
-        query: Từ khóa tìm kiếm
-        job_type: Loại công việc (full-time, part-time, internship, all)
+        query: Từ khóa tìm kiếm (vị trí, kỹ năng, công ty...)
+        job_type: Loại công việc (full-time, part-time, internship, remote, all)
+        location: Địa điểm làm việc (tùy chọn)
 
     Returns:
         dict: Thông tin các công việc tìm được
     """
-    # Mock data - trong thực tế sẽ query database
-    mock_jobs = [
-        {
-            "id": 1,
-            "title": "Python Developer",
-            "company": "Tech Corp",
-            "type": "full-time",
-            "location": "Ho Chi Minh City",
-            "salary": "$1000-2000"
-        },
-        {
-            "id": 2,
-            "title": "AI Engineer",
-            "company": "AI Solutions",
-            "type": "full-time",
-            "location": "Hanoi",
-            "salary": "$1500-3000"
-        }
-    ]
-    
-    # Filter by job_type
-    if job_type != "all":
-        mock_jobs = [job for job in mock_jobs if job["type"] == job_type]
-    
-    # Filter by query (simple contains)
-    query_lower = query.lower()
-    filtered_jobs = [
-        job for job in mock_jobs 
-        if query_lower in job["title"].lower() or query_lower in job["company"].lower()
-    ]
-    
+    features = {"title": query}
+    if job_type and job_type != "all":
+        features["description"] = job_type
+    if location:
+        features["location"] = location
+
+    jobs = retrive_job_postings(query, features)
+
     return {
         "query": query,
         "job_type": job_type,
-        "total_found": len(filtered_jobs),
-        "jobs": filtered_jobs
+        "total_found": len(jobs),
+        "jobs": jobs
     }
 
 
@@ -218,11 +177,9 @@ AVAILABLE_TOOLS = {
     # "add_two_numbers": add_two_numbers,
     # "calculate_percentage": calculate_percentage,
     # "get_current_time": get_current_time,
-    # "search_job_info": search_job_info,
     # "format_json_response": format_json_response,
     # "make_safe_http_request": make_safe_http_request,
-    "search_job_info_from_mongo": search_job_info_from_mongo,
-    
+    "search_job_info": search_job_info,
 }
 
 
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""Helpers for cleaning raw LLM output."""
+import re
+
+# Compiled once; <think> blocks from reasoning models (Qwen3) can be long and multiple
+THINK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+
+
+def strip_think(text: str) -> str:
+    """Remove <think>...</think> sections and trim whitespace."""
+    if not text:
+        return text
+    if "<" not in text:  # fast path: most answers have no tags at all
+        return text.strip()
+    return THINK_PATTERN.sub("", text).strip()
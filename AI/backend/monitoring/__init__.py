@@ -0,0 +1,3 @@
+from .tracing import configure_exporter, current_span, current_trace, record_ollama_stats, span, start_trace, traced
+
+__all__ = ["configure_exporter", "current_span", "current_trace", "record_ollama_stats", "span", "start_trace", "traced"]
@@ -0,0 +1,443 @@
+"""Prometheus-style metrics with a tiny in-process registry.
+
+Hot-path updates never take a lock: every metric child keeps one value array
+per thread (a shard) and only the owning thread writes to it. Shards are
+summed when ``/metrics`` is scraped; the shard of a finished thread is folded
+into a "retired" total so the per-request threads of the Flask dev server do
+not accumulate. Label children are bound once (``.labels(...)``) and can be
+kept in module globals so the hot path is a thread-local lookup and an add.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import threading
+import weakref
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets (seconds) sized for a pipeline whose LLM stages take 0.1 - 60 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+PROMPT_TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+class _ThreadToken:
+    """Dies with the thread's local storage and triggers folding of its shard."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _ShardedArray:
+    __slots__ = ("size", "_local", "_lock", "_live", "_retired")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live: Dict[int, List[float]] = {}
+        self._retired = [0.0] * size
+
+    def cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            return self._register()
+
+    def _register(self) -> List[float]:
+        cell = [0.0] * self.size
+        token = _ThreadToken()
+        with self._lock:
+            self._live[id(token)] = cell
+        weakref.finalize(token, self._retire, id(token))
+        self._local.cell = cell
+        self._local.token = token
+        return cell
+
+    def _retire(self, key: int) -> None:
+        with self._lock:
+            cell = self._live.pop(key, None)
+            if cell is not None:
+                for i, value in enumerate(cell):
+                    self._retired[i] += value
+
+    def snapshot(self) -> List[float]:
+        with self._lock:
+            total = list(self._retired)
+            for cell in self._live.values():
+                for i, value in enumerate(cell):
+                    total[i] += value
+        return total
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class _CounterChild:
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _ShardedArray(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._values.cell()[0] += amount
+
+    def get(self) -> float:
+        return self._values.snapshot()[0]
+
+
+class _GaugeChild:
+    """Gauges are set, not accumulated: a single attribute assignment is atomic."""
+
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Evaluate ``function`` at scrape time (e.g. ``len(user_chatbots)``)."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_values")
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = tuple(buckets)
+        # One slot per bucket + the +Inf bucket, then sum and count
+        self._values = _ShardedArray(len(self._buckets) + 3)
+
+    def observe(self, value: float) -> None:
+        cell = self._values.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def snapshot(self) -> Tuple[List[Tuple[float, float]], float, float]:
+        values = self._values.snapshot()
+        cumulative = 0.0
+        buckets = []
+        for bound, count in zip(self._buckets + (math.inf,), values[:-2]):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets, values[-2], values[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str, **kwargs: str):
+        """Return (and cache) the child for these label values; bind once, reuse on the hot path."""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> Iterable[Tuple[Tuple[Tuple[str, str], ...], object]]:
+        for values, child in list(self._children.items()):
+            yield tuple(zip(self.labelnames, values)), child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.get())}" for labels, child in self._samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def get(self) -> float:
+        return self._children[()].get()
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Current value of every label child, e.g. ``{("skip", "first_turn"): 3.0}``."""
+        return {labels: child.get() for labels, child in list(self._children.items())}
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._children[()].set_function(function)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, child in self._samples():
+            buckets, total, count = child.snapshot()
+            for bound, cumulative in buckets:
+                bucket_labels = labels + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(count)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- Service metrics -------------------------------------------------------
+
+CHAT_REQUESTS = Counter("chat_requests_total", "Chat requests by outcome", ["status"])
+CHAT_LATENCY = Histogram("chat_latency_seconds", "End-to-end /api/chat latency")
+STAGE_LATENCY = Histogram("chat_stage_latency_seconds", "Latency of each traced pipeline stage", ["stage"])
+INTENTS = Counter("chat_intent_total", "Classified intents", ["intent"])
+ACTIVE_SESSIONS = Gauge("chat_active_sessions", "Chatbot sessions kept in memory")
+CHAT_HISTORY_BYTES = Gauge("chat_history_bytes", "Estimated memory of the in-memory conversation histories of all sessions")
+CHAT_HISTORY_EVICTIONS = Counter(
+    "chat_history_evictions_total", "Messages pushed out of the per-session history ring buffer (spilled to the store or dropped)", ["outcome"]
+)
+PROCESS_MEMORY = Gauge(
+    "process_memory_bytes", "Memory of this worker process: rss, pss (shared pages split between processes), shared", ["kind"]
+)
+
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_tokens_per_second", "Ollama generation speed (eval_count / eval_duration)", buckets=TOKENS_PER_SECOND_BUCKETS
+)
+OLLAMA_TOKENS = Counter("ollama_tokens_total", "Tokens processed by Ollama", ["kind"])
+_PROMPT_TOKENS = OLLAMA_TOKENS.labels(kind="prompt")
+_COMPLETION_TOKENS = OLLAMA_TOKENS.labels(kind="completion")
+# prompt_eval_count chỉ gồm token phải prefill lại: prefix đã có trong KV cache của Ollama không được tính
+OLLAMA_PROMPT_EVAL_TOKENS = Histogram(
+    "ollama_prompt_eval_tokens",
+    "Prompt tokens evaluated per Ollama request by stage (drops when the cached system prefix is reused)",
+    ["stage"],
+    buckets=PROMPT_TOKEN_BUCKETS,
+)
+
+OLLAMA_BACKEND_REQUESTS = Counter("ollama_backend_requests_total", "Ollama pool calls by backend and outcome", ["backend", "outcome"])
+OLLAMA_BACKEND_OUTSTANDING = Gauge("ollama_backend_outstanding", "In-flight Ollama pool calls per backend", ["backend"])
+OLLAMA_BACKEND_EJECTIONS = Counter("ollama_backend_ejections_total", "Ollama backends ejected after consecutive failures", ["backend"])
+OLLAMA_CONCURRENCY_LIMIT = Gauge("ollama_concurrency_limit", "Adaptive concurrency limit per Ollama host", ["backend"])
+OLLAMA_QUEUE_DEPTH = Gauge("ollama_queue_depth", "Calls waiting for an Ollama slot per host", ["backend"])
+OLLAMA_MODEL_RESIDENT = Gauge("ollama_model_resident", "1 when the model is loaded on the host (Ollama /api/ps)", ["backend", "model"])
+OLLAMA_COLD_LOADS = Counter(
+    "ollama_cold_loads_total", "Model loads paid by a user request or done by the residency scheduler", ["model", "source"]
+)
+OLLAMA_REJECTIONS = Counter("ollama_rejections_total", "Calls rejected by the concurrency limiter (queue_full, queue_timeout)", ["backend", "reason"])
+
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit ratio = hit / total)", ["cache", "result"])
+COALESCED_REQUESTS = Counter(
+    "singleflight_coalesced_total", "Calls served by an identical in-flight call instead of running again", ["call"]
+)
+EMBEDDING_CALLS = Counter("embedding_calls_total", "Sentence embedding encode calls")
+QDRANT_CALLS = Counter("qdrant_calls_total", "Qdrant queries by operation", ["operation"])
+SPECULATIVE_RETRIEVALS = Counter(
+    "speculative_retrieval_total",
+    "Speculative prefetches by kind and outcome (used, discarded, failed, unused)",
+    ["kind", "outcome"],
+)
+REFLECTION_GATE = Counter(
+    "reflection_gate_total",
+    "Reflection gate decisions: skip (first_turn, self_contained) or run (follow_up, reference, incomplete)",
+    ["decision", "reason"],
+)
+REFLECTION_SECONDS_SAVED = Counter(
+    "reflection_seconds_saved_total", "Estimated reflection LLM time avoided by the gate (rewrite latency EWMA per skip)"
+)
+FEATURE_EXTRACTIONS = Counter(
+    "feature_extraction_total",
+    "JD feature extractions by path: rules (no LLM call), rules+llm, llm; rules / total = fraction resolved without the LLM",
+    ["path"],
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_LATENCY.labels(stage).observe(seconds)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_ollama_tokens(
+    eval_count: Optional[int],
+    eval_duration_ns: Optional[int],
+    prompt_eval_count: Optional[int],
+    stage: Optional[str] = None,
+) -> None:
+    if prompt_eval_count is not None:
+        OLLAMA_PROMPT_EVAL_TOKENS.labels(stage or "none").observe(prompt_eval_count)
+    if prompt_eval_count:
+        _PROMPT_TOKENS.inc(prompt_eval_count)
+    if eval_count:
+        _COMPLETION_TOKENS.inc(eval_count)
+        if eval_duration_ns:
+            OLLAMA_TOKENS_PER_SECOND.observe(eval_count / (eval_duration_ns / 1e9))
+
+
+# load_duration của model đã resident chỉ vài ms; vượt ngưỡng này là request phải chờ load model
+COLD_LOAD_THRESHOLD_NS = 500_000_000
+
+
+def record_model_load(model: Optional[str], load_duration_ns: Optional[int]) -> None:
+    if model and load_duration_ns and load_duration_ns >= COLD_LOAD_THRESHOLD_NS:
+        OLLAMA_COLD_LOADS.labels(model, "request").inc()
+
+
+_SMAPS_FIELDS = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared"}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    RSS, PSS và phần shared (bytes) của một process từ /proc/<pid>/smaps_rollup (Linux).
+
+    Sau preload + fork, các page của model nằm trong "shared": RSS của mỗi worker
+    vẫn tính đủ, còn PSS chia page dùng chung cho số process đang map nó.
+    """
+    memory = {"rss": 0, "pss": 0, "shared": 0}
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup") as handle:
+            for line in handle:
+                key, _, value = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    memory[_SMAPS_FIELDS[key]] += int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+for _kind in ("rss", "pss", "shared"):
+    PROCESS_MEMORY.labels(_kind).set_function(lambda kind=_kind: process_memory()[kind])
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+
+__all__ = [
+    "ACTIVE_SESSIONS",
+    "CACHE_LOOKUPS",
+    "CHAT_LATENCY",
+    "CHAT_REQUESTS",
+    "COALESCED_REQUESTS",
+    "CONTENT_TYPE_LATEST",
+    "Counter",
+    "EMBEDDING_CALLS",
+    "FEATURE_EXTRACTIONS",
+    "Gauge",
+    "Histogram",
+    "INTENTS",
+    "OLLAMA_BACKEND_EJECTIONS",
+    "OLLAMA_BACKEND_OUTSTANDING",
+    "OLLAMA_BACKEND_REQUESTS",
+    "OLLAMA_COLD_LOADS",
+    "OLLAMA_CONCURRENCY_LIMIT",
+    "OLLAMA_MODEL_RESIDENT",
+    "OLLAMA_QUEUE_DEPTH",
+    "OLLAMA_REJECTIONS",
+    "OLLAMA_PROMPT_EVAL_TOKENS",
+    "OLLAMA_TOKENS",
+    "OLLAMA_TOKENS_PER_SECOND",
+    "PROCESS_MEMORY",
+    "QDRANT_CALLS",
+    "REGISTRY",
+    "Registry",
+    "SPECULATIVE_RETRIEVALS",
+    "STAGE_LATENCY",
+    "observe_stage",
+    "process_memory",
+    "record_cache_lookup",
+    "record_model_load",
+    "record_ollama_tokens",
+    "render_latest",
+]
@@ -0,0 +1,268 @@
+"""Lightweight per-request tracing for the chat pipeline.
+
+A trace is opened per ``/api/chat`` request with :func:`start_trace`; every
+stage wrapped in :func:`span` (or decorated with :func:`traced`) records its
+wall time, nesting and attributes (e.g. Ollama ``eval_count``). Spans opened
+outside a trace cost a ``ContextVar`` lookup and are dropped.
+
+Finished traces are handed to the configured exporter: a JSON log line
+(default) or OpenTelemetry when the SDK is installed.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .metrics import observe_stage, record_model_load, record_ollama_tokens
+
+logger = logging.getLogger(__name__)
+
+# Ollama returns durations in nanoseconds
+OLLAMA_STAT_KEYS = (
+    "eval_count",
+    "prompt_eval_count",
+    "eval_duration",
+    "prompt_eval_duration",
+    "load_duration",
+    "total_duration",
+)
+
+
+class Span:
+    __slots__ = ("name", "parent", "depth", "start", "end", "start_ns", "attributes")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"name": self.name, "ms": round(self.duration_ms, 1), "depth": self.depth}
+        data.update(self.attributes)
+        return data
+
+
+class Trace:
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, attributes=attributes)
+        self.spans: List[Span] = []
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact timing breakdown (returned to the client behind the debug header)."""
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration_ms, 1),
+            "stages": [span.to_dict() for span in self.spans],
+        }
+
+
+class _NoopSpan:
+    """Returned when no trace is active so call sites never branch."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class JsonLogExporter:
+    """Write each finished trace as one JSON log line."""
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self.log = log or logging.getLogger("monitoring.trace")
+
+    def export(self, trace: Trace) -> None:
+        self.log.info(json.dumps({"trace": trace.root.name, **trace.summary()}, ensure_ascii=False))
+
+
+class OpenTelemetryExporter:
+    """Replay finished spans into an OpenTelemetry tracer (needs ``opentelemetry-sdk``)."""
+
+    def __init__(self, tracer: Any = None):
+        if tracer is None:
+            from opentelemetry import trace as otel_trace
+
+            tracer = otel_trace.get_tracer("recruitment-chatbot")
+        self.tracer = tracer
+
+    def export(self, trace: Trace) -> None:
+        from opentelemetry import trace as otel_trace
+
+        def _end_ns(span: Span) -> int:
+            return span.start_ns + int(span.duration_ms * 1_000_000)
+
+        root = self.tracer.start_span(trace.root.name, start_time=trace.root.start_ns, attributes=_otel_attributes(trace.root))
+        otel_spans = {id(trace.root): root}
+        for span in trace.spans:
+            parent = otel_spans.get(id(span.parent), root)
+            otel_span = self.tracer.start_span(
+                span.name,
+                context=otel_trace.set_span_in_context(parent),
+                start_time=span.start_ns,
+                attributes=_otel_attributes(span),
+            )
+            otel_spans[id(span)] = otel_span
+        for span in reversed(trace.spans):
+            otel_spans[id(span)].end(end_time=_end_ns(span))
+        root.end(end_time=_end_ns(trace.root))
+
+
+def _otel_attributes(span: Span) -> Dict[str, Any]:
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else str(value)
+        for key, value in span.attributes.items()
+        if value is not None
+    }
+
+
+_exporter: Any = None
+
+
+def configure_exporter(kind: str = "log") -> Any:
+    """Select the trace exporter: ``"log"``, ``"otel"`` or ``"none"``."""
+    global _exporter
+    kind = (kind or "none").lower()
+    if kind == "otel":
+        try:
+            _exporter = OpenTelemetryExporter()
+        except ImportError:
+            logger.warning("opentelemetry is not installed, falling back to JSON log traces")
+            _exporter = JsonLogExporter()
+    elif kind == "log":
+        _exporter = JsonLogExporter()
+    else:
+        _exporter = None
+    return _exporter
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """Open a trace for one request; spans created inside are attached to it."""
+    trace = Trace(name, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if _exporter is not None:
+            try:
+                _exporter.export(trace)
+            except Exception as exc:  # pragma: no cover - exporters must never break a request
+                logger.warning("Trace export failed: %s", exc)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time a pipeline stage inside the current trace (no-op outside a trace)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, parent=_current_span.get(), attributes=attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as exc:
+        current.set_attribute("error", type(exc).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        observe_stage(name, current.end - current.start)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of :func:`span`."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_span() -> Any:
+    """Innermost open span (a no-op span outside a trace), e.g. to attach attributes from a ``@traced`` function."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def record_ollama_stats(target: Any, response: Any, stage: Optional[str] = None) -> None:
+    """Copy Ollama's own counters (``eval_count``, ``prompt_eval_duration``...) onto a span.
+
+    Token counts and generation speed are also fed to the metrics registry
+    (``prompt_eval_count`` per ``stage``).
+    """
+    def field(key: str) -> Any:
+        try:
+            return response.get(key) if hasattr(response, "get") else getattr(response, key, None)
+        except Exception:
+            return None
+
+    stats = {}
+    for key in OLLAMA_STAT_KEYS:
+        value = field(key)
+        if value is None:
+            continue
+        stats[key] = value
+        if key.endswith("_duration"):
+            target.set_attribute(key.replace("_duration", "_ms"), round(value / 1_000_000, 1))
+        else:
+            target.set_attribute(key, value)
+
+    record_ollama_tokens(stats.get("eval_count"), stats.get("eval_duration"), stats.get("prompt_eval_count"), stage)
+    record_model_load(field("model"), stats.get("load_duration"))
+
+
+__all__ = [
+    "JsonLogExporter",
+    "OpenTelemetryExporter",
+    "Span",
+    "Trace",
+    "configure_exporter",
+    "current_span",
+    "current_trace",
+    "record_ollama_stats",
+    "span",
+    "start_trace",
+    "traced",
+]
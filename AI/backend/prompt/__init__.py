@@ -1,3 +1,3 @@
-from .promt_config import PromptConfig
+from .promt_config import GENERATION_PROFILES, GenerationProfile, PromptConfig
 
-__all__ = ["PromptConfig"]
\ No newline at end of file
+__all__ = ["GENERATION_PROFILES", "GenerationProfile", "PromptConfig"]
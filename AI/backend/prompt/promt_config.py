@@ -1,4 +1,89 @@
+import textwrap
+from dataclasses import dataclass
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    Tham số sinh (Ollama ``options`` + ``keep_alive``) cho một bước của pipeline.
+
+    None = dùng mặc định của model/server. ``num_ctx`` nên giống nhau giữa các bước:
+    đổi ``num_ctx`` giữa hai request buộc Ollama load lại model.
+    """
+    num_predict: Optional[int] = None
+    temperature: Optional[float] = None
+    stop: Tuple[str, ...] = ()
+    num_ctx: Optional[int] = None
+    keep_alive: Optional[str] = None
+
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if self.num_predict is not None:
+            options["num_predict"] = self.num_predict
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        if self.stop:
+            options["stop"] = list(self.stop)
+        if self.num_ctx is not None:
+            options["num_ctx"] = self.num_ctx
+        return options
+
+
+# Profile theo tên prompt (key của PromptConfig.prompts); OllamaLLMs áp dụng khi được gọi với stage=<tên>
+GENERATION_PROFILES: Dict[str, GenerationProfile] = {
+    # Phân loại bằng JSON enum ({"intent": "<nhãn>"}, xem llms/label_classifier.py): vài token là đủ
+    "classification_chat_intent": GenerationProfile(num_predict=24, temperature=0.0),
+    "classification_agent_intent": GenerationProfile(num_predict=24, temperature=0.0),
+    # Nhãn dạng text thuần, dừng ngay khi xuống dòng
+    "classification_recruitment_intent": GenerationProfile(num_predict=4, temperature=0.0, stop=("\n",)),
+    # Trích xuất JSON ngắn (kèm JSON schema qua ``format``)
+    "extract_feature_question_about_jd": GenerationProfile(num_predict=128, temperature=0.0),
+    "extract_features_cv": GenerationProfile(num_predict=512, temperature=0.0),
+    # Viết lại câu hỏi cuối (prompt nằm trong tool/reflection/core.py): một câu
+    "reflection": GenerationProfile(num_predict=96, temperature=0.2, stop=("\n\n",)),
+    # Câu trả lời cho người dùng
+    "intent_chitchat": GenerationProfile(num_predict=256, temperature=0.7),
+    "chitchat_to_recruitment": GenerationProfile(num_predict=256, temperature=0.7),
+    "recruitment_incomplete": GenerationProfile(num_predict=128, temperature=0.5),
+    "intent_company_info": GenerationProfile(num_predict=768, temperature=0.3),
+    "intent_jd": GenerationProfile(num_predict=768, temperature=0.3),
+}
+
+
+def _has_placeholder(line: str) -> bool:
+    # Formatter.parse bỏ qua "{{" / "}}" (JSON mẫu trong prompt), chỉ trả về field thật
+    return any(field is not None for _, field, _, _ in Formatter().parse(line))
+
+
+def split_template(template: str) -> Tuple[str, str]:
+    """
+    Tách template thành (phần tĩnh, phần biến đổi).
+
+    Phần biến đổi bắt đầu từ đoạn (khối cách nhau bởi dòng trống) chứa placeholder
+    đầu tiên; nếu đó là đoạn đầu tiên thì từ dòng chứa placeholder. Phần tĩnh đã
+    được format (bỏ escape "{{ }}") và dedent/strip nên giống nhau từng byte giữa các lần gọi.
+    """
+    lines = textwrap.dedent(template).strip().split("\n")
+    first = next((i for i, line in enumerate(lines) if _has_placeholder(line)), None)
+    if first is None:
+        return "\n".join(lines).format(), ""
+
+    start = first
+    while start > 0 and lines[start - 1].strip():
+        start -= 1
+    if start == 0:
+        start = first
+
+    static = "\n".join(lines[:start]).strip().format()
+    return static, "\n".join(lines[start:]).strip()
+
+
 class PromptConfig:
+    # prompt_name -> (system, user template); template không đổi nên tách một lần cho cả process
+    _split_cache: Dict[str, Tuple[str, str]] = {}
+
     def __init__(self):
         self.prompts = {
             "job_description_analysis": (
@@ -15,6 +100,7 @@ SCHEMA (only these fields allowed):
 - location: work location (e.g., "Hà Nội", "Hồ Chí Minh", "Đà Nẵng")
 - skills: required skills/technologies (e.g., "Python", "React.js")
 - experience: experience level (e.g., "1-2 năm", "Internship", "3 năm")
+- salary: expected salary as written, with its unit (e.g., "20 triệu", "15-20 triệu", "1000 USD", "dưới 20 triệu")
 
 OUTPUT RULES:
 1) Output valid JSON only (no extra text, no comments, no code fences).
@@ -51,6 +137,8 @@ DECISION RULES:
 - experience:
   - Vietnamese: patterns like "<n> năm", "1-2 năm", "thực tập", "thực tập sinh".
   - English: "Intern"/"Internship", "<n> years".
+- salary:
+  - Extract when an amount with a unit is given ("lương 20 triệu", "15-20tr", "trên 1000 USD"). Keep words like "dưới"/"tối đa" in the value.
 - description:
   - General non-technical keywords that describe the job but are not clearly title/skills/company/location/experience (e.g., "remote", "toàn thời gian", "full-time", "onsite").
 
@@ -86,6 +174,9 @@ Output: {{"location": "Hà Nội", "title": "IT"}}
 Input: "Công việc tại Đà Nẵng"
 Output: {{"location": "Đà Nẵng"}}
 
+Input: "Tìm việc Python lương 15-20 triệu"
+Output: {{"skills": "Python", "salary": "15-20 triệu"}}
+
 Input: "Job in Ho Chi Minh City for React.js developer"
 Output: {{"location": "Hồ Chí Minh", "title": "React.js developer", "skills": "React.js"}}
 
@@ -97,14 +188,17 @@ OUTPUT:
             
           "chitchat_to_recruitment": (
                 """
-            Người dùng đang nói chuyện phiếm về: "{user_input}"
+            Người dùng đang nói chuyện phiếm.
             Hãy trả lời một cách thân thiện và tự nhiên, sau đó khéo léo chuyển hướng cuộc trò chuyện về chủ đề tuyển dụng và tìm việc làm. 
 
             Ví dụ:
             - Nếu hỏi về thời tiết: "Thời tiết đẹp thật! Ngày đẹp trời như này thích hợp để cập nhật CV và tìm kiếm cơ hội việc làm mới đấy. Bạn có muốn tôi giúp tìm việc làm phù hợp không?"
             - Nếu hỏi về bản thân bot: "Cảm ơn bạn quan tâm! Tôi là trợ lý tuyển dụng, chuyên giúp mọi người tìm kiếm cơ hội nghề nghiệp. Bạn đang tìm kiếm công việc nào?"
 
-            Hãy trả lời ngắn gọn, thân thiện và chuyển hướng một cách tự nhiên."""
+            Hãy trả lời ngắn gọn, thân thiện và chuyển hướng một cách tự nhiên.
+
+            Người dùng: "{user_input}"
+            """
             ),
           
           "classification_recruitment_intent": (
@@ -220,7 +314,7 @@ VÍ DỤ RÕ (phải học thuộc):
 - "Tìm job Java" → intent_jd ("Java" là kỹ năng cụ thể).
 - "Có tuyển dụng gì không ở đây" → intent_incomplete_recruitment_question.
 
-CHỈ TRẢ VỀ duy nhất 1 trong các key intent ở trên.
+CHỈ TRẢ VỀ JSON dạng {{"intent": "<key>"}} với duy nhất 1 trong các key intent ở trên.
 
 Người dùng: "{user_input}"
 Trả lời:
@@ -259,6 +353,26 @@ Trả lời:
     Nếu bạn muốn biết thêm thông tin về công ty khác hoặc tìm kiếm theo ngành nghề, hãy cho tôi biết!
     ---
     """
+),
+          "intent_jd": (
+    """
+    Bạn là một chatbot tuyển dụng. Người dùng đang tìm kiếm công việc.
+    Bạn được cung cấp danh sách các tin tuyển dụng đang mở phù hợp nhất với yêu cầu.
+    Nhiệm vụ:
+    - Giới thiệu ngắn gọn từng công việc: vị trí, công ty, địa điểm, kỹ năng, kinh nghiệm, mức lương (nếu có).
+    - Chỉ dùng thông tin trong dữ liệu, không tự bịa thêm công việc.
+    - Trình bày bằng Markdown gọn gàng, không dùng *** hoặc ** để in đậm.
+    - Nếu danh sách rỗng, hãy nói chưa có công việc phù hợp và gợi ý người dùng nới lỏng tiêu chí.
+
+    Tiêu chí người dùng:
+    {features}
+
+    Dữ liệu công việc:
+    {data}
+
+    Người dùng: "{user_input}"
+    ---
+    """
 ),
           "classification_agent_intent": (
     """
@@ -281,7 +395,7 @@ Trả lời:
     - "Thông tin về công ty FPT" → intent_company_info
     - "Chào bạn" / "Trời hôm nay đẹp" → intent_chitchat
 
-    Chỉ trả về DUY NHẤT 1 key intent.
+    Chỉ trả về JSON dạng {{"intent": "<key>"}} với DUY NHẤT 1 key intent.
     
     Người dùng: "{user_input}"
     Trả lời:
@@ -299,3 +413,29 @@ Trả lời:
         """
         template = self.prompts.get(prompt_name, "Prompt not found.")
         return template.format(**kwargs)  # <-- inject user_input etc.
+
+    def get_messages(self, prompt_name: str, **kwargs) -> List[Dict[str, str]]:
+        """
+        Return the prompt as chat messages: static instructions as a system message, the formatted variable part last.
+
+        The system message is byte-identical on every call, so Ollama can reuse the KV cache of that prefix
+        (only the user message is prefilled again).
+        """
+        split = self._split_cache.get(prompt_name)
+        if split is None:
+            template = self.prompts.get(prompt_name)
+            if template is None:
+                return [{"role": "user", "content": "Prompt not found."}]
+            split = self._split_cache.setdefault(prompt_name, split_template(template))
+
+        system, user_template = split
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": user_template.format(**kwargs)})
+        return messages
+
+    @staticmethod
+    def get_generation_profile(prompt_name: Optional[str]) -> Optional[GenerationProfile]:
+        """
+        Return the generation profile declared for a prompt (None if the stage has none).
+        """
+        return GENERATION_PROFILES.get(prompt_name) if prompt_name else None
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from loguru import logger
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -31,10 +33,86 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "hf.co/unsloth/Qwen3-4B-Instruct-2507-GGUF:Q4_K_M"  # Add this field
     OLLAMA_TIMEOUT: int = 120
     MODEL_KEEP_ALIVE: int = 600  # Giữ model trong 10 phút
+    # Model tiering: model riêng cho từng stage, rỗng = OLLAMA_MODEL.
+    # Vd: REFLECTION/CLASSIFICATION/EXTRACTION_MODEL = RAG_MODEL_ID (1.7B) để chỉ câu trả lời cuối chạy model 4B
+    REFLECTION_MODEL: str = ""
+    CLASSIFICATION_MODEL: str = ""
+    EXTRACTION_MODEL: str = ""
+    ANSWER_MODEL: str = ""
+    # "chat": instructions tĩnh là system message qua /api/chat (Ollama tái sử dụng KV cache của prefix);
+    # "generate": ghép các message thành một prompt qua /api/generate như trước
+    PROMPT_LAYOUT: str = "chat"
+    # Pool nhiều Ollama host: "http://gpu1:11434=3,http://gpu2:11434" (url=weight); rỗng = chỉ dùng OLLAMA_BASE_URL
+    OLLAMA_BACKENDS: str = ""
+    OLLAMA_POOL_MAX_FAILURES: int = 3  # Lỗi liên tiếp trước khi eject backend
+    OLLAMA_POOL_EJECT_SECONDS: float = 30.0  # Thời gian eject ban đầu, gấp đôi sau mỗi probe thất bại
+    OLLAMA_POOL_PROBE_INTERVAL: float = 10.0
+    OLLAMA_POOL_AFFINITY_SLACK: int = 2  # Session giữ backend cũ nếu nó bận hơn backend rảnh nhất <= N request
+    # Adaptive concurrency limiter (AIMD) trước mỗi Ollama host; hàng đợi đầy -> /api/chat trả 429
+    OLLAMA_CONCURRENCY_LIMITER: bool = True
+    OLLAMA_INITIAL_CONCURRENCY: int = 4
+    OLLAMA_MAX_CONCURRENCY: int = 32
+    OLLAMA_QUEUE_SIZE: int = 32  # Số lời gọi được chờ slot
+    OLLAMA_QUEUE_TIMEOUT: float = 30.0  # Giây chờ slot tối đa
+    OLLAMA_LATENCY_TOLERANCE: float = 2.0  # Latency > N x baseline của stage => giảm limit
+    SINGLE_FLIGHT: bool = True  # Gộp các lời gọi LLM / embedding giống hệt nhau đang chạy đồng thời
     ENABLE_MODEL_PRELOAD: bool = True
+    # Mảng NumPy chỉ đọc (router embeddings) lưu thành .npy và mmap: các worker gunicorn dùng chung page cache
+    MMAP_ARTIFACTS: bool = True
+    SHARED_ARTIFACT_DIR: str = ""  # Rỗng = <thư mục tạm>/ai-recruitment-artifacts
+    # Residency scheduler: warm-up mọi model song song lúc khởi động, định kỳ đọc /api/ps để
+    # gia hạn keep_alive (MODEL_KEEP_ALIVE) hoặc load lại model đã bị unload
+    MODEL_RESIDENCY_SCHEDULER: bool = True
+    MODEL_RESIDENCY_INTERVAL: float = 60.0  # Giây giữa hai lần refresh, nên nhỏ hơn MODEL_KEEP_ALIVE
+    SYNC_EMBEDDINGS_ON_STARTUP: bool = True  # Tắt khi chạy benchmark / offline (không có PostgreSQL)
     BATCH_SIZE: int = 32  # Batch size cho embedding
     MAX_WORKERS: int = 4  # Số threads cho parallel processing
-    
+
+    # Job search settings
+    JOB_SEARCH_TOP_K: int = 5  # Số job trả về cho người dùng
+    JOB_SEARCH_PREFETCH_LIMIT: int = 50  # Số ứng viên lấy từ mỗi nhánh dense/keyword trước khi fusion
+
+    # Intent classification (JSON enum constrained decoding)
+    INTENT_LOGPROBS: bool = False  # Chấm điểm nhãn bằng logprobs (cần Ollama >= 0.12.11, ollama-python >= 0.6.1)
+
+    # Feature extraction settings (rule-based trước, LLM cho phần còn thiếu)
+    ENABLE_RULE_EXTRACTION: bool = True
+    RULE_EXTRACTION_MIN_CONFIDENCE: float = 1.0  # Bỏ qua LLM khi mọi từ nội dung trong câu đã được giải thích
+    LOAD_SKILLS_FROM_DATABASE: bool = True  # Từ điển kỹ năng từ bảng skill; false = danh sách mặc định
+    # Tên cũ (trước generation profile): đặt thì ghi đè num_predict/temperature của profile
+    # extract_feature_question_about_jd trong PromptConfig; để trống thì dùng profile
+    EXTRACTION_NUM_PREDICT: Optional[int] = None
+    EXTRACTION_TEMPERATURE: Optional[float] = None
+
+    # Speculative retrieval: prefetch công ty/job từ câu gốc song song với reflection + classification
+    ENABLE_SPECULATIVE_RETRIEVAL: bool = False
+    SPECULATIVE_SIMILARITY_THRESHOLD: float = 0.9  # Cosine giữa câu gốc và câu đã viết lại để dùng kết quả prefetch
+    SPECULATIVE_WORKERS: int = 4
+    # Reflection gate: bỏ qua LLM viết lại câu hỏi ở lượt đầu và khi câu đã tự đủ nghĩa
+    ENABLE_REFLECTION_GATE: bool = True
+
+    # Conversation history (mỗi session): ring buffer giới hạn số message + token, nén các lượt cũ
+    HISTORY_MAX_MESSAGES: int = 64
+    HISTORY_TOKEN_BUDGET: int = 4096  # Token (ước lượng) tối đa giữ trong bộ nhớ, cũng là giới hạn prompt reflection
+    HISTORY_HOT_MESSAGES: int = 8  # Số message mới nhất không nén
+    HISTORY_COMPRESSION: str = "zstd"  # "zstd" (cần zstandard, thiếu thì dùng zlib), "zlib" hoặc "none"
+    HISTORY_SPILL_DIR: str = ""  # Thư mục lưu các lượt bị đẩy khỏi ring buffer (JSONL); rỗng = bỏ
+
+    # Reranking settings (cross-encoder, tùy chọn)
+    ENABLE_RERANKING: bool = False
+    RERANK_CANDIDATES: int = 20  # Số kết quả lấy từ Qdrant trước khi rerank (top-N)
+    RERANK_TOP_K: int = 5  # Số kết quả giữ lại sau rerank
+    RERANK_LATENCY_BUDGET_MS: int = 150  # Quá budget thì bỏ qua rerank, giữ thứ tự Qdrant
+    RERANK_CACHE_SIZE: int = 2048  # Số cặp (query, document) được cache điểm
+
+    # Retrieval context packing (giảm prefill cho LLM)
+    CONTEXT_TOKEN_BUDGET: int = 600  # Số token tối đa cho phần dữ liệu truy xuất trong prompt
+    CONTEXT_FIELD_MAX_CHARS: int = 300  # Độ dài tối đa mặc định của mỗi trường (vd: description)
+
+    # Tracing settings
+    TRACE_EXPORTER: str = "log"  # "log" (JSON log), "otel" (OpenTelemetry) hoặc "none"
+    TRACE_DEBUG_HEADER: str = "X-Debug-Timing"  # Header bật trả về timing breakdown trong response
+
     
     @classmethod
     def load_settings(cls) -> "Settings":
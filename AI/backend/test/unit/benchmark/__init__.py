@@ -0,0 +1 @@
+# Unit test benchmark harness
@@ -0,0 +1,97 @@
+import sys
+import os
+import json
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from benchmark.fake_ollama import FakeOllamaConfig, FakeOllamaServer, classify
+from benchmark.load import ScenarioResult, compare_to_baseline, percentile
+from prompt.promt_config import PromptConfig
+
+
+def test_percentile_interpolates():
+    assert percentile([], 95) == 0.0
+    assert percentile([10.0], 99) == 10.0
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([0, 10], 95) == 9.5
+
+
+def test_classify_matches_scenarios():
+    assert classify("Cho tôi thông tin về công ty FPT") == "intent_company_info"
+    assert classify("Tìm việc lập trình viên Python ở Hà Nội") == "intent_jd"
+    assert classify("Xin chào bạn") == "intent_chitchat"
+
+
+def test_fake_ollama_answers_each_stage():
+    prompts = PromptConfig()
+    config = FakeOllamaConfig(token_latency_ms=0, prefill_tps=1e9, max_tokens=5)
+    with FakeOllamaServer(config) as server:
+        classification = requests.post(f"{server.url}/api/generate", json={
+            "model": "m",
+            "prompt": "user: " + prompts.get_prompt("classification_chat_intent", user_input="Tìm job Java ở Hà Nội"),
+        }).json()
+        extraction = requests.post(f"{server.url}/api/chat", json={
+            "model": "m",
+            "messages": [{"role": "user", "content": prompts.get_prompt("extract_feature_question_about_jd", user_input="Tìm job Java ở Hà Nội")}],
+        }).json()
+
+    assert classification["response"] == "intent_jd"
+    assert classification["prompt_eval_count"] > 0
+    assert json.loads(extraction["message"]["content"])["location"] == "Hà Nội"
+    assert server.requests_by_stage == {"classification": 1, "extraction": 1}
+
+
+def test_fake_ollama_reuses_cached_prefix():
+    messages = PromptConfig().get_messages("classification_chat_intent", user_input="Tìm job Java ở Hà Nội")
+    config = FakeOllamaConfig(token_latency_ms=0, prefill_tps=1e9, max_tokens=5)
+    with FakeOllamaServer(config) as server:
+        first = requests.post(f"{server.url}/api/chat", json={"model": "m", "messages": messages}).json()
+        messages[-1]["content"] = 'Người dùng: "Xin chào bạn"\nTrả lời:'
+        second = requests.post(f"{server.url}/api/chat", json={"model": "m", "messages": messages}).json()
+
+    assert second["message"]["content"] == "intent_chitchat"
+    # only the user message after the shared system prefix is prefilled again
+    assert second["prompt_eval_count"] < 20 < first["prompt_eval_count"]
+
+
+def test_fake_ollama_model_profiles_change_speed_and_accuracy():
+    messages = PromptConfig().get_messages("classification_chat_intent", user_input="Tìm job Java ở Hà Nội")
+    schema = {"type": "object", "properties": {"intent": {"enum": ["intent_jd", "intent_chitchat"]}}}
+    config = FakeOllamaConfig(token_latency_ms=0, model_speed={"small": 0.5}, label_noise={"small": 0.5})
+    with FakeOllamaServer(config) as server:
+        labels = [
+            json.loads(requests.post(f"{server.url}/api/chat", json={"model": "small", "messages": messages, "format": schema}).json()["message"]["content"])["intent"]
+            for _ in range(4)
+        ]
+        large = requests.post(f"{server.url}/api/chat", json={"model": "large", "messages": messages, "format": schema}).json()
+
+    assert labels == ["intent_jd", "intent_chitchat", "intent_jd", "intent_chitchat"]
+    assert json.loads(large["message"]["content"]) == {"intent": "intent_jd"}
+    assert server.models_by_stage == {"classification": {"small", "large"}}
+
+
+def test_fake_ollama_unloads_model_after_keep_alive():
+    config = FakeOllamaConfig(token_latency_ms=0, prefill_tps=1e9, load_ms=1)
+    with FakeOllamaServer(config) as server:
+        first = requests.post(f"{server.url}/api/generate", json={"model": "m", "prompt": "", "keep_alive": "50ms"}).json()
+        second = requests.post(f"{server.url}/api/generate", json={"model": "m", "prompt": "", "keep_alive": 0.05}).json()
+        assert requests.get(f"{server.url}/api/ps").json()["models"][0]["name"] == "m"
+        time.sleep(0.1)
+        assert requests.get(f"{server.url}/api/ps").json()["models"] == []
+
+    assert first["load_duration"] > 0 and second["load_duration"] == 0
+    assert server.loads_by_model == {"m": 1}
+
+
+def _result(p95, rps):
+    return ScenarioResult("jd", 4, 8, 0, 1.0, rps, 1.0, p95, p95, p95, 100.0)
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"jd": {"p95_ms": 1000.0, "requests_per_s": 10.0}}
+    assert compare_to_baseline([_result(1100.0, 9.5)], baseline) == []
+    regressions = compare_to_baseline([_result(1500.0, 5.0)], baseline)
+    assert len(regressions) == 2
@@ -0,0 +1,134 @@
+import sys
+import os
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+import requests
+
+from llms.concurrency import AdaptiveLimiter, LatencySample, OllamaOverloadedError, OllamaRequestError, is_backend_failure
+
+
+def test_limit_grows_while_saturated_and_latency_stays_flat():
+    limiter = AdaptiveLimiter("grow", initial=1, max_limit=4)
+    for _ in range(10):
+        slots = int(limiter.limit)
+        for _ in range(slots):
+            limiter.acquire()
+        for _ in range(slots):
+            limiter.release("intent_jd", 1.0, ok=True)
+    assert limiter.limit == 4
+
+    # a single caller never saturates the limit, so it does not grow further
+    idle = AdaptiveLimiter("idle", initial=2)
+    for _ in range(10):
+        idle.acquire()
+        idle.release("intent_jd", 1.0, ok=True)
+    assert idle.limit == 2
+
+
+def test_limit_backs_off_on_latency_spike_and_errors():
+    limiter = AdaptiveLimiter("shrink", initial=10)
+    limiter.acquire()
+    limiter.release("intent_jd", 1.0, ok=True)
+    limiter.acquire()
+    limiter.release("intent_jd", 5.0, ok=True)  # 5x the stage baseline: Ollama is queueing
+    assert limiter.limit == pytest.approx(9.0)
+
+    limiter.acquire()
+    limiter.release("intent_jd", 0.0, ok=False)
+    assert limiter.limit == pytest.approx(8.1)
+
+
+def test_long_answers_at_steady_token_speed_are_not_congestion():
+    limiter = AdaptiveLimiter("tokens", initial=10)
+    for output_tokens in (20, 400):  # same 20ms/token, 20x more tokens
+        with limiter.slot("intent_jd") as sample:
+            sample.record({"eval_count": output_tokens, "eval_duration": output_tokens * 20_000_000})
+    assert limiter.limit == 10
+
+    with limiter.slot("intent_jd") as sample:
+        sample.record({"eval_count": 20, "eval_duration": 20 * 80_000_000})  # 4x slower per token
+    assert limiter.limit == pytest.approx(9.0)
+
+
+def test_client_errors_do_not_back_off():
+    limiter = AdaptiveLimiter("client", initial=10)
+    for error in (ValueError("invalid format schema"), OllamaRequestError("model not found", status_code=404)):
+        with pytest.raises(ValueError):
+            with limiter.slot("intent_jd"):
+                raise error
+    assert limiter.limit == 10 and limiter.in_flight == 0
+
+    with pytest.raises(OllamaRequestError):
+        with limiter.slot("intent_jd"):
+            raise OllamaRequestError("Ollama request failed: 503", status_code=503, retryable=True)
+    assert limiter.limit == pytest.approx(9.0)
+
+
+def test_latency_sample_reads_ollama_stats():
+    class ChatResponse:  # như ollama.ChatResponse (thuộc tính, không phải dict)
+        eval_count = 50
+        eval_duration = 1_000_000_000
+
+    sample = LatencySample()
+    sample.record(ChatResponse())
+    assert sample.per_token_seconds == pytest.approx(0.02)
+
+    sample = LatencySample()
+    sample.record({"message": {"content": "..."}})
+    assert sample.per_token_seconds is None
+
+
+def test_stage_baselines_are_independent():
+    limiter = AdaptiveLimiter("stages", initial=10)
+    for stage, seconds in (("classification_chat_intent", 0.2), ("intent_jd", 4.0)):
+        limiter.acquire()
+        limiter.release(stage, seconds, ok=True)
+    # an answer 20x slower than a classification is not congestion
+    assert limiter.limit == 10
+
+
+def test_full_queue_rejects_with_retry_after():
+    limiter = AdaptiveLimiter("queue", initial=1, max_queue=1, queue_timeout=5)
+    limiter.acquire()  # the only slot
+    waiter = threading.Thread(target=limiter.acquire)
+    waiter.start()
+    while limiter.waiting == 0:
+        pass
+
+    with pytest.raises(OllamaOverloadedError) as error:
+        limiter.acquire()
+    assert error.value.retry_after >= 1
+
+    limiter.release("intent_jd", 1.0, ok=True)  # hands the slot to the queued caller
+    waiter.join(2)
+    assert not waiter.is_alive()
+    assert limiter.in_flight == 1
+
+
+def test_queue_timeout():
+    limiter = AdaptiveLimiter("timeout", initial=1, queue_timeout=0.05)
+    with limiter.slot("intent_jd"):
+        with pytest.raises(OllamaOverloadedError):
+            limiter.acquire()
+    assert limiter.in_flight == 0
+
+
+def test_backend_failures_are_told_apart_from_client_errors():
+    class ResponseError(Exception):  # như ollama.ResponseError
+        def __init__(self, status_code):
+            super().__init__("error")
+            self.status_code = status_code
+
+    assert is_backend_failure(requests.ConnectionError("refused"))
+    assert is_backend_failure(TimeoutError())
+    assert is_backend_failure(ResponseError(502))
+    assert not is_backend_failure(ResponseError(400))
+    assert not is_backend_failure(ValueError("bad schema"))
+
+    wrapped = OllamaRequestError.wrap("Chat request failed", ResponseError(503))
+    assert isinstance(wrapped, ValueError) and wrapped.status_code == 503 and is_backend_failure(wrapped)
+    assert not is_backend_failure(OllamaRequestError.wrap("Chat request failed", KeyError("message")))
@@ -0,0 +1,58 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.ollama_llms import OllamaLLMs
+from prompt import GENERATION_PROFILES, PromptConfig
+
+
+def _llm():
+    llm = OllamaLLMs.__new__(OllamaLLMs)  # skip client creation and warm-up
+    llm.model_name = "test-model"
+    llm.base_url = "http://ollama"
+    llm.default_keep_alive = 600
+    llm.prompt_layout = "generate"
+    llm.limiter = None
+    llm.single_flight = None
+    llm.client = MagicMock()
+    llm.client.chat.return_value = {"message": {"content": "ok"}}
+    llm.logger = MagicMock()
+    return llm
+
+
+def test_every_profile_has_a_prompt_or_known_stage():
+    prompts = PromptConfig().prompts
+    assert set(GENERATION_PROFILES) - set(prompts) == {"reflection"}
+
+
+def test_generate_content_applies_stage_profile():
+    llm = _llm()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"response": "intent_jd"}
+    with patch("llms.ollama_llms.requests.post", return_value=response) as post:
+        assert llm.generate_content([{"role": "user", "content": "hi"}], stage="classification_recruitment_intent") == "intent_jd"
+
+    payload = post.call_args.kwargs["json"]
+    assert payload["options"] == {"num_predict": 4, "temperature": 0.0, "stop": ["\n"]}
+    assert payload["keep_alive"] == 600
+
+
+def test_generate_content_without_stage_sends_no_options():
+    llm = _llm()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"response": "text"}
+    with patch("llms.ollama_llms.requests.post", return_value=response) as post:
+        llm.generate_content([{"role": "user", "content": "hi"}])
+
+    assert "options" not in post.call_args.kwargs["json"]
+
+
+def test_chat_explicit_options_override_profile():
+    llm = _llm()
+    llm.chat([{"role": "user", "content": "hi"}], stage="intent_jd", options={"temperature": 1.0}, format="json")
+
+    kwargs = llm.client.chat.call_args.kwargs
+    assert kwargs["options"] == {"num_predict": 768, "temperature": 1.0}
+    assert kwargs["format"] == "json"
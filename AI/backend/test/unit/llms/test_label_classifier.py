@@ -0,0 +1,50 @@
+import sys
+import os
+import json
+import math
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.label_classifier import LabelClassifier
+
+LABELS = ("intent_jd", "intent_company_info", "intent_chitchat")
+
+
+def _classifier(content, logprobs=None, use_logprobs=False):
+    llm = MagicMock()
+    llm.chat_response.return_value = {"message": {"content": content}, "logprobs": logprobs}
+    classifier = LabelClassifier(llm, LABELS, default="intent_chitchat", stage="classification_agent_intent", field="intent", use_logprobs=use_logprobs)
+    return classifier, llm
+
+
+def test_schema_is_an_enum_of_labels():
+    classifier, llm = _classifier(json.dumps({"intent": "intent_jd"}))
+    choice = classifier.classify("prompt")
+
+    assert (choice.label, choice.valid, choice.score) == ("intent_jd", True, None)
+    kwargs = llm.chat_response.call_args.kwargs
+    assert kwargs["stage"] == "classification_agent_intent"
+    assert kwargs["format"]["properties"]["intent"]["enum"] == list(LABELS)
+    assert "logprobs" not in kwargs
+
+
+def test_score_from_logprobs():
+    logprobs = [{"token": '{"', "logprob": 0.0}, {"token": "intent_company", "logprob": math.log(0.8)}]
+    classifier, llm = _classifier('{"intent": "intent_company_info"}', logprobs, use_logprobs=True)
+    choice = classifier.classify("prompt")
+
+    assert choice.label == "intent_company_info"
+    assert choice.score == pytest.approx(0.8)
+    assert llm.chat_response.call_args.kwargs["logprobs"] is True
+
+
+def test_unconstrained_output_is_still_mapped_to_a_label():
+    classifier, _ = _classifier('<think>...</think> "intent_company_info" vì người dùng hỏi về công ty')
+    assert classifier.classify("prompt").label == "intent_company_info"
+
+    classifier, _ = _classifier("không biết")
+    choice = classifier.classify("prompt")
+    assert (choice.label, choice.valid) == ("intent_chitchat", False)
@@ -0,0 +1,31 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.llm_manager import MODEL_TIERS, llm_manager
+
+
+def test_unset_tiers_fall_back_to_ollama_model(monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL", "qwen3-4b")
+    for tier in MODEL_TIERS:
+        monkeypatch.setenv(f"{tier.upper()}_MODEL", "")
+
+    assert llm_manager.tier_models() == {tier: "qwen3-4b" for tier in MODEL_TIERS}
+
+
+def test_cheap_stages_resolve_to_their_own_model(monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL", "qwen3-4b")
+    monkeypatch.setenv("REFLECTION_MODEL", "qwen3-1.7b")
+    monkeypatch.setenv("CLASSIFICATION_MODEL", "qwen3-1.7b")
+    monkeypatch.setenv("EXTRACTION_MODEL", "")
+    monkeypatch.setenv("ANSWER_MODEL", "")
+
+    assert llm_manager.model_for_tier("reflection") == "qwen3-1.7b"
+    assert llm_manager.model_for_tier("classification") == "qwen3-1.7b"
+    assert llm_manager.model_for_tier("extraction") == "qwen3-4b"
+    assert llm_manager.model_for_tier("answer") == "qwen3-4b"
+    with pytest.raises(ValueError):
+        llm_manager.model_for_tier("rerank")
@@ -0,0 +1,126 @@
+import sys
+import os
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.concurrency import OllamaRequestError
+from llms.ollama_pool import OllamaPool, parse_backends, session_affinity
+
+
+class _FakeBackend:
+    def __init__(self, url):
+        self.url = url
+        self.calls = 0
+        self.fail = False
+        self.error = None
+        self.block = None
+
+    def chat(self, messages, stage=None, **options):
+        self.calls += 1
+        if self.block is not None:
+            self.block.wait(2)
+        if self.error is not None:
+            raise self.error
+        if self.fail:
+            raise OllamaRequestError("Chat request failed: connection refused", retryable=True)
+        return self.url
+
+    def is_warmed_up(self):
+        return True
+
+
+def _pool(urls, **kwargs):
+    fakes = {}
+
+    def factory(url, model):
+        fakes[url] = _FakeBackend(url)
+        return fakes[url]
+
+    kwargs.setdefault("probe_interval", 0)
+    pool = OllamaPool([(url, weight) for url, weight in urls], "m", client_factory=factory, **kwargs)
+    return pool, fakes
+
+
+def test_parse_backends():
+    assert parse_backends(" http://a:11434=3, http://b:11434/ ,") == [("http://a:11434", 3.0), ("http://b:11434", 1.0)]
+    assert parse_backends("") == []
+
+
+def test_idle_pool_prefers_heavier_backend_then_least_outstanding():
+    pool, fakes = _pool([("a", 1), ("b", 2)])
+    assert pool.chat([]) == "b"
+
+    # b is busy with one request: a (0 in flight) is now the least loaded
+    fakes["b"].block = threading.Event()
+    worker = threading.Thread(target=pool.chat, args=([],))
+    worker.start()
+    while pool.backends[1].outstanding == 0:
+        pass
+    assert pool.chat([]) == "a"
+    fakes["b"].block.set()
+    worker.join()
+
+
+def test_session_sticks_to_its_backend():
+    pool, _ = _pool([("a", 1), ("b", 1)])
+    with session_affinity("s1"):
+        first = pool.chat([])
+    # another session takes the other backend; s1 stays on its own
+    with session_affinity("s2"):
+        pool.chat([])
+    with session_affinity("s1"):
+        assert pool.chat([]) == first
+    assert pool.status()["sticky_sessions"] == 2
+
+
+def test_failing_backend_is_ejected_and_readmitted_after_probe():
+    probes = []
+    pool, fakes = _pool([("a", 1), ("b", 1)], max_failures=2, eject_seconds=0, probe=lambda url: probes.append(url) or True)
+    fakes["a"].fail = True
+
+    # each failed call is retried on the other backend
+    for _ in range(3):
+        assert pool.chat([]) == "b"
+    status = {b["url"]: b for b in pool.status()["backends"]}
+    assert status["a"]["healthy"] is False
+    assert status["a"]["errors"] == 2
+
+    fakes["a"].fail = False
+    pool.probe_ejected()
+    assert probes == ["a"]
+    assert pool.status()["backends"][0]["healthy"] is True
+
+
+def test_error_is_raised_when_every_backend_fails():
+    pool, fakes = _pool([("a", 1), ("b", 1)])
+    fakes["a"].fail = fakes["b"].fail = True
+    with pytest.raises(ValueError):
+        pool.chat([])
+
+
+def test_client_errors_are_not_retried_or_counted():
+    pool, fakes = _pool([("a", 1), ("b", 1)], max_failures=1)
+    for error in (
+        OllamaRequestError("Chat request failed: model 'm' not found", status_code=404),
+        ValueError("invalid format schema"),
+    ):
+        for fake in fakes.values():
+            fake.error = error
+        with pytest.raises(ValueError):
+            pool.chat([])
+
+    assert sum(fake.calls for fake in fakes.values()) == 2  # không thử lại ở backend kia
+    assert all(b["healthy"] and b["errors"] == 0 for b in pool.status()["backends"])
+
+
+def test_server_errors_and_timeouts_are_retried():
+    pool, fakes = _pool([("a", 1), ("b", 1)])
+    fakes["a"].error = OllamaRequestError("Ollama request failed: 503", status_code=503, retryable=True)
+    fakes["b"].error = TimeoutError("read timed out")
+    with pytest.raises(TimeoutError):
+        pool.chat([])
+    assert fakes["a"].calls + fakes["b"].calls == 2
+    assert all(b["errors"] == 1 for b in pool.status()["backends"])
@@ -0,0 +1,51 @@
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.ollama_llms import OllamaLLMs
+from prompt.promt_config import PromptConfig, split_template
+
+
+def test_static_instructions_become_identical_system_message():
+    prompts = PromptConfig()
+    first = prompts.get_messages("classification_chat_intent", user_input="Tìm job Java")
+    second = prompts.get_messages("classification_chat_intent", user_input="Công ty FPT ở đâu")
+
+    assert [m["role"] for m in first] == ["system", "user"]
+    assert first[0]["content"] == second[0]["content"]
+    assert "{user_input}" not in first[0]["content"]
+    # escaped JSON braces are rendered in the system message
+    assert '{"intent": "<key>"}' in first[0]["content"]
+    assert first[1]["content"] == 'Người dùng: "Tìm job Java"\nTrả lời:'
+
+
+def test_variable_part_is_last():
+    messages = PromptConfig().get_messages("intent_jd", user_input="Tìm việc Python", features="• Kỹ năng: Python", data="[]")
+    assert "Tiêu chí người dùng" not in messages[0]["content"]
+    assert messages[1]["content"].startswith("Tiêu chí người dùng:\n• Kỹ năng: Python")
+
+
+def test_split_template_falls_back_to_the_placeholder_line():
+    assert split_template("""
+        Bạn là chatbot.
+        Người dùng: "{user_input}"
+    """) == ("Bạn là chatbot.", 'Người dùng: "{user_input}"')
+    assert split_template('Câu hỏi: "{user_input}"') == ("", 'Câu hỏi: "{user_input}"')
+
+
+def test_chat_layout_sends_messages_to_chat_api():
+    llm = OllamaLLMs.__new__(OllamaLLMs)  # skip client creation and warm-up
+    llm.model_name = "test-model"
+    llm.default_keep_alive = 600
+    llm.prompt_layout = "chat"
+    llm.limiter = None
+    llm.single_flight = None
+    llm.client = MagicMock()
+    llm.client.chat.return_value = {"message": {"content": "ok"}, "prompt_eval_count": 12}
+    llm.logger = MagicMock()
+
+    messages = PromptConfig().get_messages("intent_chitchat", user_input="Xin chào")
+    assert llm.generate_content(messages, stage="intent_chitchat") == "ok"
+    assert llm.client.chat.call_args.kwargs["messages"] == messages
@@ -0,0 +1,69 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from benchmark.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from llms.ollama_llms import OllamaLLMs
+from llms.residency import ResidencyScheduler, normalize_model_name
+from monitoring.metrics import OLLAMA_COLD_LOADS, OLLAMA_MODEL_RESIDENT, record_model_load
+
+
+def test_normalize_model_name():
+    assert normalize_model_name("qwen3") == "qwen3:latest"
+    assert normalize_model_name("qwen3:4b") == "qwen3:4b"
+    assert normalize_model_name("hf.co/unsloth/Qwen3-4B-GGUF:Q4_K_M") == "hf.co/unsloth/Qwen3-4B-GGUF:Q4_K_M"
+
+
+def test_models_are_warmed_concurrently():
+    with FakeOllamaServer(FakeOllamaConfig(load_ms=300, parallel=2)) as server:
+        clients = [OllamaLLMs(base_url=server.url, model_name=name) for name in ("res-small", "res-large")]
+        scheduler = ResidencyScheduler(clients, interval=0)
+
+        started = time.perf_counter()
+        assert all(scheduler.warm_all().values())
+        assert time.perf_counter() - started < 0.55  # serial warm-up would take >= 0.6s
+
+        assert sorted(server.loaded_models) == ["res-large", "res-small"]
+        assert all(client.is_warmed_up() for client in clients)
+
+
+def test_refresh_reloads_unloaded_model_and_counts_it():
+    with FakeOllamaServer(FakeOllamaConfig(load_ms=0)) as server:
+        client = OllamaLLMs(base_url=server.url, model_name="res-evicted")
+        scheduler = ResidencyScheduler([client], keep_alive=60, interval=0)
+        scheduler.warm_all()
+        before = OLLAMA_COLD_LOADS.labels("res-evicted", "scheduler").get()
+
+        scheduler.refresh()  # resident: only extends keep_alive
+        assert OLLAMA_COLD_LOADS.labels("res-evicted", "scheduler").get() == before
+
+        server.unload("res-evicted")
+        scheduler.refresh()
+        assert OLLAMA_COLD_LOADS.labels("res-evicted", "scheduler").get() == before + 1
+        assert OLLAMA_MODEL_RESIDENT.labels(server.url, "res-evicted").get() == 0
+        assert server.loaded_models == ["res-evicted"]
+        assert scheduler.status()["models"][0]["resident"] is True
+
+
+def test_slow_load_duration_counts_as_request_cold_load():
+    before = OLLAMA_COLD_LOADS.labels("res-cold", "request").get()
+    record_model_load("res-cold", 20_000_000)  # 20ms: model was already loaded
+    record_model_load("res-cold", 3_000_000_000)
+    assert OLLAMA_COLD_LOADS.labels("res-cold", "request").get() == before + 1
+
+
+def test_after_fork_opens_new_connections():
+    from llms.llm_manager import LLMManager, llm_manager
+
+    client = OllamaLLMs(base_url="http://127.0.0.1:9", model_name="res-forked")
+    LLMManager._instances["test#res-forked"] = client
+    try:
+        session, ollama_client = client.session, client.client
+        llm_manager.after_fork()
+        assert client.session is not session
+        assert client.client is not ollama_client
+        assert OllamaLLMs._client_cache[client.cache_key]["session"] is client.session
+    finally:
+        LLMManager._instances.pop("test#res-forked", None)
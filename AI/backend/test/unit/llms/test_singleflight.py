@@ -0,0 +1,93 @@
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from llms.ollama_llms import OllamaLLMs
+from llms.singleflight import SingleFlight
+from monitoring.metrics import COALESCED_REQUESTS
+
+
+def _run_concurrently(flight, key, function, callers=4):
+    """Start ``callers`` calls; the first one blocks in ``function`` until all others are waiting."""
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        futures = [pool.submit(flight.do, key, function)]
+        while flight.in_flight() == 0:
+            pass
+        futures += [pool.submit(flight.do, key, function) for _ in range(callers - 1)]
+        return futures
+
+
+def test_identical_concurrent_calls_share_one_result():
+    flight = SingleFlight("test_share")
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return {"answer": 42}
+
+    futures = _run_concurrently(flight, "k", compute)
+    while COALESCED_REQUESTS.labels("test_share").get() < 3:
+        pass
+    release.set()
+    results = [f.result() for f in futures]
+
+    assert calls == [1]
+    assert results[0] == ({"answer": 42}, False)
+    assert all(result == ({"answer": 42}, True) for result in results[1:])
+    assert flight.in_flight() == 0
+
+
+def test_error_is_shared_and_key_is_released():
+    flight = SingleFlight("test_error")
+    release = threading.Event()
+
+    def broken():
+        release.wait(2)
+        raise ValueError("Chat request failed")
+
+    futures = _run_concurrently(flight, "k", broken, callers=2)
+    while COALESCED_REQUESTS.labels("test_error").get() < 1:
+        pass
+    release.set()
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result()
+
+    # not a cache: the next call runs again
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_ollama_chat_coalesces_only_identical_requests():
+    llm = OllamaLLMs.__new__(OllamaLLMs)  # skip client creation and warm-up
+    llm.model_name = "test-model"
+    llm.base_url = "http://ollama:11434"
+    llm.default_keep_alive = 600
+    llm.limiter = None
+    llm.single_flight = SingleFlight("test_llm")
+    llm.logger = MagicMock()
+    release = threading.Event()
+    llm.client = MagicMock()
+    llm.client.chat.side_effect = lambda **kwargs: release.wait(2) and {"message": {"content": kwargs["messages"][0]["content"]}}
+
+    messages = [{"role": "user", "content": "Xin chào"}]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(llm.chat, messages, stage="intent_chitchat")
+        while llm.single_flight.in_flight() == 0:
+            pass
+        same = pool.submit(llm.chat, [dict(m) for m in messages], stage="intent_chitchat")
+        other = pool.submit(llm.chat, [{"role": "user", "content": "Tạm biệt"}], stage="intent_chitchat")
+        while COALESCED_REQUESTS.labels("test_llm").get() < 1 or llm.single_flight.in_flight() < 2:
+            pass
+        release.set()
+
+        assert first.result() == same.result() == "Xin chào"
+        assert other.result() == "Tạm biệt"
+    assert llm.client.chat.call_count == 2
@@ -0,0 +1 @@
+# Unit test monitoring package
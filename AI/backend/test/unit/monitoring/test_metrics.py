@@ -0,0 +1,80 @@
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from monitoring.metrics import Counter, Gauge, Histogram, Registry, record_ollama_tokens, REGISTRY
+
+
+def test_counter_sums_thread_shards():
+    registry = Registry()
+    requests_total = Counter("requests_total", "Requests", ["status"], registry=registry)
+    ok = requests_total.labels("200")
+
+    def worker():
+        for _ in range(1000):
+            ok.inc()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ok.inc()
+
+    # Shards của các thread đã kết thúc được gộp vào tổng
+    assert ok.get() == 8001
+    assert 'requests_total{status="200"} 8001' in registry.render()
+
+
+def test_labels_are_bound_once():
+    registry = Registry()
+    calls = Counter("calls_total", "Calls", ["operation"], registry=registry)
+    assert calls.labels("search") is calls.labels(operation="search")
+
+    calls.labels("search").inc(2)
+    calls.labels("index").inc()
+    assert calls.values() == {("search",): 2.0, ("index",): 1.0}
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert "latency_seconds_sum 3.65" in text
+
+
+def test_gauge_function_and_label_escaping():
+    registry = Registry()
+    sessions = Gauge("active_sessions", "Sessions", registry=registry)
+    store = {"a": 1, "b": 2}
+    sessions.set_function(lambda: len(store))
+    intents = Counter("intent_total", "Intents", ["intent"], registry=registry)
+    intents.labels('say "hi"').inc()
+
+    text = registry.render()
+    assert "active_sessions 2" in text
+    assert 'intent_total{intent="say \\"hi\\""} 1' in text
+
+
+def test_ollama_tokens_per_second():
+    tokens_per_second = REGISTRY.get("ollama_tokens_per_second").labels()
+    completion = REGISTRY.get("ollama_tokens_total").labels("completion")
+    _, total_before, count_before = tokens_per_second.snapshot()
+    completion_before = completion.get()
+
+    record_ollama_tokens(eval_count=50, eval_duration_ns=2_000_000_000, prompt_eval_count=300)
+
+    _, total, count = tokens_per_second.snapshot()
+    assert count == count_before + 1
+    assert total - total_before == 25.0
+    assert completion.get() - completion_before == 50
@@ -0,0 +1,97 @@
+import sys
+import os
+import json
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from monitoring.tracing import (
+    JsonLogExporter,
+    configure_exporter,
+    current_trace,
+    record_ollama_stats,
+    span,
+    start_trace,
+    traced,
+)
+
+
+@traced("decorated_stage")
+def _decorated(value):
+    with span("inner", value=value):
+        return value * 2
+
+
+def test_spans_are_recorded_with_nesting():
+    with start_trace("chat") as trace:
+        with span("reflection"):
+            pass
+        assert _decorated(3) == 6
+
+    summary = trace.summary()
+    names = [(stage["name"], stage["depth"]) for stage in summary["stages"]]
+    assert names == [("reflection", 1), ("decorated_stage", 1), ("inner", 2)]
+    assert summary["stages"][2]["value"] == 3
+    assert summary["total_ms"] >= summary["stages"][1]["ms"]
+    assert current_trace() is None
+
+
+def test_span_outside_trace_is_noop():
+    with span("orphan") as orphan:
+        orphan.set_attribute("eval_count", 1)
+    assert current_trace() is None
+
+
+def test_failed_stage_is_tagged_and_reraised():
+    with start_trace("chat") as trace:
+        try:
+            with span("llm.generate"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+    assert trace.summary()["stages"][0]["error"] == "ValueError"
+
+
+def test_record_ollama_stats_converts_durations():
+    with start_trace("chat") as trace:
+        with span("llm.generate") as generate_span:
+            record_ollama_stats(generate_span, {
+                "eval_count": 42,
+                "prompt_eval_count": 300,
+                "prompt_eval_duration": 150_000_000,
+                "eval_duration": 900_000_000,
+            })
+
+    stage = trace.summary()["stages"][0]
+    assert stage["eval_count"] == 42
+    assert stage["prompt_eval_count"] == 300
+    assert stage["prompt_eval_ms"] == 150.0
+    assert stage["eval_ms"] == 900.0
+
+
+def test_json_log_exporter(caplog):
+    configure_exporter("log")
+    try:
+        with caplog.at_level(logging.INFO, logger="monitoring.trace"):
+            with start_trace("chat"):
+                with span("qdrant.search"):
+                    pass
+    finally:
+        configure_exporter("none")
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["trace"] == "chat"
+    assert record["stages"][0]["name"] == "qdrant.search"
+
+
+def test_otel_falls_back_to_log_when_missing():
+    try:
+        import opentelemetry  # noqa: F401
+        return
+    except ImportError:
+        pass
+    try:
+        assert isinstance(configure_exporter("otel"), JsonLogExporter)
+    finally:
+        configure_exporter("none")
@@ -0,0 +1 @@
+# Unit test retrieval package
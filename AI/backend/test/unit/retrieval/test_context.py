@@ -0,0 +1,97 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from tool.retrieval.context import COMPANY_FIELDS, JOB_FIELDS, ContextBuilder, estimate_tokens
+
+
+LONG_DESCRIPTION = (
+    "Công ty thành lập năm 2010 tại Hà Nội. "
+    "Chúng tôi có văn phòng đẹp và nhiều hoạt động team building. "
+    "Sản phẩm chính là phần mềm kế toán cho doanh nghiệp vừa và nhỏ. "
+    "Đội ngũ kỹ sư sử dụng Java và React để phát triển sản phẩm. "
+) * 3
+
+
+def _company(company_id, name, description=LONG_DESCRIPTION):
+    return {
+        "company_id": company_id,
+        "name": name,
+        "industries": "Phần mềm",
+        "addresses": "Hà Nội",
+        "size": "100-499",
+        "website": f"https://{name.lower()}.vn",
+        "description": description,
+    }
+
+
+def test_deduplicates_repeated_companies():
+    builder = ContextBuilder(COMPANY_FIELDS)
+    context = builder.build("công ty phần mềm", [_company(1, "MISA"), _company(1, "MISA"), _company(2, "FPT")])
+
+    lines = context.splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("- Tên: MISA")
+    assert "FPT" in lines[1]
+
+
+def test_long_description_keeps_query_relevant_sentences():
+    builder = ContextBuilder(COMPANY_FIELDS, field_max_chars=120)
+    context = builder.build("công ty dùng java react", [_company(1, "MISA")])
+
+    description = context.split("Mô tả: ", 1)[1]
+    assert len(description) <= 120
+    assert "Java và React" in description
+
+
+def test_context_fits_token_budget_and_is_smaller_than_raw_payload():
+    documents = [_company(i, f"Company{i}") for i in range(10)]
+    builder = ContextBuilder(COMPANY_FIELDS, token_budget=200)
+    context = builder.build("công ty phần mềm", documents)
+
+    assert estimate_tokens(context) <= 200
+    assert estimate_tokens(context) < estimate_tokens(str(documents))
+    # Tài liệu đầu tiên (liên quan nhất) luôn được giữ
+    assert context.startswith("- Tên: Company0")
+
+
+def test_falls_back_to_essential_fields_when_budget_is_tight():
+    builder = ContextBuilder(COMPANY_FIELDS, token_budget=30)
+    context = builder.build("công ty", [_company(1, "MISA")])
+
+    assert "Tên: MISA" in context
+    assert "Mô tả" not in context
+    assert "Website" not in context
+
+
+def test_job_fields_render_lists():
+    builder = ContextBuilder(JOB_FIELDS)
+    job = {
+        "job_posting_id": 7,
+        "position_name": "Backend Developer",
+        "company": "MISA",
+        "addresses": "Hà Nội",
+        "skills": ["Python", "Django"],
+        "salary": 20000000,
+        "description": "",
+    }
+    context = builder.build("backend python", [job])
+
+    assert "Kỹ năng: Python, Django" in context
+    assert "Lương: 20000000" in context
+    assert "Mô tả" not in context
+
+
+def test_jobs_from_the_same_company_are_kept():
+    jobs = [
+        {"job_posting_id": 1, "company_id": 7, "position_name": "Java Dev", "company": "FPT"},
+        {"job_posting_id": 2, "company_id": 7, "position_name": "Java Dev", "company": "FPT"},
+        {"job_posting_id": 1, "company_id": 7, "position_name": "Java Dev", "company": "FPT"},
+    ]
+    for builder in (ContextBuilder(JOB_FIELDS), ContextBuilder(JOB_FIELDS, id_keys=("job_posting_id",))):
+        assert builder.build("java", jobs).count("Vị trí: Java Dev") == 2
+
+
+def test_empty_documents():
+    assert ContextBuilder().build("công ty", []) == ""
@@ -0,0 +1,85 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from qdrant_client.models import FieldCondition, Filter, MatchAny, MatchValue
+
+from tool.retrieval.filters import (
+    FeatureFilterCompiler,
+    company_keys,
+    normalize_company_name,
+    parse_experience_years,
+    parse_salary,
+    skill_keys,
+    USD_TO_VND,
+)
+
+
+def _conditions_by_key(query_filter: Filter):
+    return {c.key: c for c in query_filter.must if isinstance(c, FieldCondition)}
+
+
+def test_parse_experience_years():
+    assert parse_experience_years("3 năm") == 3
+    assert parse_experience_years("1-2 năm") == 2
+    assert parse_experience_years("Internship") == 0
+    assert parse_experience_years("") is None
+
+
+def test_parse_salary():
+    assert parse_salary("20 triệu") == 20_000_000
+    assert parse_salary(15000000) == 15_000_000
+    assert parse_salary("thỏa thuận") is None
+
+
+def test_parse_salary_units_ranges_and_usd():
+    # "tr" trong "trên" / "trở lên" không phải đơn vị triệu
+    assert parse_salary("2000 USD trở lên") == 2000 * USD_TO_VND
+    assert parse_salary("trên 1000 USD") == 1000 * USD_TO_VND
+    assert parse_salary("15-20 triệu") == 15_000_000
+    assert parse_salary("15tr") == 15_000_000
+    assert parse_salary("20.000.000") == 20_000_000
+    assert parse_salary("dưới 20 triệu") is None
+
+
+def test_skill_keys_normalize_versions_and_aliases():
+    assert skill_keys("Python 3, python3, Python") == ["python"]
+    assert skill_keys("ReactJS, React.js, C++") == ["react", "cpp"]
+
+
+def test_company_keys_are_word_prefixes():
+    assert normalize_company_name("Công ty TNHH FPT Software") == "fpt software"
+    assert company_keys("FPT Software JSC") == ["fpt", "fpt software"]
+
+
+def test_empty_features_only_keep_open_jobs():
+    query_filter = FeatureFilterCompiler().compile_job_filter({})
+    assert query_filter.must == [FieldCondition(key="status", match=MatchValue(value="open"))]
+
+
+def test_job_filter_from_extracted_features():
+    features = {
+        "title": "Python Developer",
+        "location": "Hồ Chí Minh",
+        "company": "FPT",
+        "skills": "Python, SQL",
+        "experience": "2 năm",
+    }
+    query_filter = FeatureFilterCompiler().compile_job_filter(features)
+    conditions = _conditions_by_key(query_filter)
+
+    assert conditions["locations"].match == MatchAny(any=["tp.hcm"])
+    assert conditions["company_keys"].match == MatchAny(any=["fpt"])
+    assert conditions["skill_keys"].match == MatchAny(any=["python", "sql"])
+    # experience is a nested should(range | is_empty) filter
+    assert any(isinstance(c, Filter) for c in query_filter.must)
+    # title is ranking text, never a filter
+    assert "title" not in conditions
+
+
+def test_company_filter_is_none_without_filterable_fields():
+    compiler = FeatureFilterCompiler()
+    assert compiler.compile_company_filter({"title": "Data Analyst"}) is None
+    assert _conditions_by_key(compiler.compile_company_filter({"location": "Hà Nội"}))["locations"].match == MatchAny(any=["hà nội"])
+
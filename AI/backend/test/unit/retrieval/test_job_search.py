@@ -0,0 +1,120 @@
+import sys
+import os
+import zlib
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from setting import Settings
+from tool.database import QDrant
+from tool.embeddings.job import _build_job_payload, _build_job_text, _delete_stale_points, _ensure_job_collection
+from tool.question_enhancer import QuestionEnhancer
+from tool.retrieval import JobSearcher, encode_sparse
+from tool.retrieval.sparse import tokenize
+from tool.slot_extractor import RuleBasedFeatureExtractor
+
+
+class HashingEmbedding:
+    """Embedding giả lập: bag-of-words hash vào 32 chiều (không cần tải model)"""
+
+    def encode(self, text):
+        if isinstance(text, list):
+            return np.array([self.encode(t) for t in text])
+        vector = np.zeros(32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode("utf-8")) % 32] += 1.0
+        return vector if vector.any() else vector + 1e-3
+
+
+JOBS = [
+    {"job_posting_id": 1, "company_name": "FPT Software", "position_name": "Java Developer",
+     "skills": "Java, Spring", "addresses": "17 Duy Tân, Hà Nội", "experience_years": 2,
+     "salary": 25000000, "status": "open"},
+    {"job_posting_id": 2, "company_name": "VNG", "position_name": "Python Developer",
+     "skills": "Python 3, Django", "addresses": "Quận 7, TP.HCM", "experience_years": 1,
+     "salary": 20000000, "status": "open"},
+    {"job_posting_id": 3, "company_name": "Viettel", "position_name": "Java Developer",
+     "skills": "Java", "addresses": "Cầu Giấy, Hà Nội", "experience_years": 5,
+     "salary": 40000000, "status": "closed"},
+    {"job_posting_id": 4, "company_name": "MISA", "position_name": "Senior Java Engineer",
+     "skills": "Java, Kafka", "addresses": "Hà Nội", "experience_years": 5,
+     "salary": 45000000, "status": "open"},
+]
+
+
+@pytest.fixture
+def searcher():
+    settings = Settings.load_settings()
+    embedding = HashingEmbedding()
+    client = QdrantClient(":memory:")
+    _ensure_job_collection(client, "jobs_test", 32)
+
+    enhancer = QuestionEnhancer()
+    points = []
+    for record in JOBS:
+        text = _build_job_text(record)
+        points.append(PointStruct(
+            id=record["job_posting_id"],
+            vector={"dense": embedding.encode(text).tolist(), "keywords": encode_sparse(text)},
+            payload=_build_job_payload(record, enhancer),
+        ))
+    client.upsert(collection_name="jobs_test", points=points)
+
+    qdrant = QDrant.__new__(QDrant)
+    qdrant.client = client
+    return JobSearcher(settings, embedding_model=embedding, qdrant=qdrant, collection_name="jobs_test")
+
+
+def test_payload_has_canonical_locations():
+    payload = _build_job_payload(JOBS[1], QuestionEnhancer())
+    assert payload["locations"] == ["tp.hcm"]
+    assert payload["skills"] == ["Python 3", "Django"]
+    assert payload["skill_keys"] == ["python", "django"]
+    assert payload["company_keys"] == ["vng"]
+
+
+def test_closed_jobs_are_never_returned(searcher):
+    jobs = searcher.search("Java Developer")
+    assert jobs
+    assert all(job["status"] == "open" for job in jobs)
+    assert 3 not in [job["job_posting_id"] for job in jobs]
+
+
+def test_features_become_filters(searcher):
+    jobs = searcher.search_by_features({"title": "Java Developer", "location": "Hà Nội", "experience": "2 năm"})
+    assert [job["job_posting_id"] for job in jobs] == [1]
+
+
+def test_location_filter_uses_aliases(searcher):
+    jobs = searcher.search_by_features({"title": "Developer", "location": "Sài Gòn"})
+    assert [job["job_posting_id"] for job in jobs] == [2]
+
+
+def test_company_and_skill_filters(searcher):
+    jobs = searcher.search_by_features({"title": "Developer", "company": "Công ty MISA", "skills": "Kafka"})
+    assert [job["job_posting_id"] for job in jobs] == [4]
+
+
+def test_skill_filter_matches_normalized_skill_keys(searcher):
+    jobs = searcher.search_by_features({"title": "Developer", "skills": "python3"})
+    assert [job["job_posting_id"] for job in jobs] == [2]
+
+
+def test_salary_in_the_question_filters_jobs(searcher):
+    features = RuleBasedFeatureExtractor().extract("Tìm việc Java ở Hà Nội lương trên 30 triệu").fields
+    assert features["salary"] == "30 triệu"
+
+    jobs = searcher.search_by_features(features)
+    assert [job["job_posting_id"] for job in jobs] == [4]
+
+
+def test_postings_missing_from_the_source_are_deleted(searcher):
+    client = searcher.qdrant.client
+    assert _delete_stale_points(client, "jobs_test", {1, 2}, batch_size=1) == 2
+
+    points, _ = client.scroll(collection_name="jobs_test", with_payload=False)
+    assert sorted(point.id for point in points) == [1, 2]
@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from tool.retrieval.reranker import CrossEncoderReranker, ScoreCache, query_key
+
+
+class FakeCrossEncoder:
+    """Cross-encoder giả lập: điểm = số từ của query xuất hiện trong passage"""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(list(pairs))
+        time.sleep(self.delay)
+        return [sum(word in passage.lower() for word in query.lower().split()) for query, passage in pairs]
+
+
+DOCS = [
+    {"name": "VNG", "description": "game và cloud"},
+    {"name": "FPT", "description": "outsourcing phần mềm java"},
+    {"name": "MISA", "description": "phần mềm kế toán"},
+]
+
+
+def _text(doc):
+    return f"{doc['name']} {doc['description']}"
+
+
+def test_rerank_single_batched_forward_pass():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+
+    result = reranker.rerank("phần mềm java", DOCS, text_fn=_text, top_k=2)
+
+    assert [doc["name"] for doc in result] == ["FPT", "MISA"]
+    assert len(model.calls) == 1
+    assert len(model.calls[0]) == len(DOCS)
+
+
+def test_repeated_pairs_hit_the_cache():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+
+    reranker.rerank("phần mềm java", DOCS, text_fn=_text, top_k=2)
+    result = reranker.rerank("phần mềm java", DOCS, text_fn=_text, top_k=2)
+
+    assert [doc["name"] for doc in result] == ["FPT", "MISA"]
+    assert len(model.calls) == 1
+    assert reranker.cache.hits == len(DOCS)
+
+
+def test_skip_when_budget_already_spent():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model, latency_budget_ms=50)
+
+    started_at = time.perf_counter() - 1.0  # retrieval đã tốn 1s
+    result = reranker.rerank("phần mềm java", DOCS, text_fn=_text, top_k=2, started_at=started_at)
+
+    assert result == DOCS[:2]
+    assert model.calls == []
+    assert reranker.skipped == 1
+
+
+def test_skip_when_estimated_cost_exceeds_budget():
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = CrossEncoderReranker(model, latency_budget_ms=40)
+
+    # lần đầu là warm-up, không tính; lần hai học được ~17ms/cặp
+    reranker.rerank("java", DOCS, text_fn=_text, top_k=2)
+    reranker.rerank("game", DOCS, text_fn=_text, top_k=2)
+    result = reranker.rerank("kế toán", DOCS, text_fn=_text, top_k=2)
+
+    assert result == DOCS[:2]
+    assert len(model.calls) == 2
+
+
+def test_slow_warmup_call_does_not_disable_reranking():
+    model = FakeCrossEncoder(delay=0.2)
+    reranker = CrossEncoderReranker(model, latency_budget_ms=100)
+
+    reranker.rerank("java", DOCS, text_fn=_text, top_k=2)  # cold start chậm
+    model.delay = 0.0
+    result = reranker.rerank("phần mềm java", DOCS, text_fn=_text, top_k=2)
+
+    assert [doc["name"] for doc in result] == ["FPT", "MISA"]
+    assert reranker.skipped == 0
+
+
+def test_estimate_decays_while_skipping_and_recovers():
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model, latency_budget_ms=40, warmup_calls=0, skip_decay=0.5)
+    reranker._ms_per_pair = 100.0  # một lần chạy chậm bất thường
+
+    queries = ["q1", "q2", "q3", "q4", "q5", "phần mềm java"]
+    results = [reranker.rerank(q, DOCS, text_fn=_text, top_k=2) for q in queries]
+
+    assert 0 < reranker.skipped < len(queries)
+    assert [doc["name"] for doc in results[-1]] == ["FPT", "MISA"]
+    assert reranker.get_stats()["ms_per_pair"] < 100.0
+
+
+def test_cache_key_keeps_diacritics():
+    assert query_key("  Bán   HÀNG ") == query_key("bán hàng")
+    assert query_key("Ha\u0300 Nội") == query_key("Hà Nội")  # NFD -> NFC
+    assert query_key("bán hàng") != query_key("ban hang")
+
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model)
+    reranker.rerank("phần mềm", DOCS, text_fn=_text, top_k=2)
+    reranker.rerank("phan mem", DOCS, text_fn=_text, top_k=2)
+
+    assert len(model.calls) == 2
+
+
+def test_score_cache_evicts_least_recently_used():
+    cache = ScoreCache(max_size=2)
+    cache.put(("q", "a"), 1.0)
+    cache.put(("q", "b"), 2.0)
+    cache.get(("q", "a"))
+    cache.put(("q", "c"), 3.0)
+
+    assert cache.get(("q", "b")) is None
+    assert cache.get(("q", "a")) == 1.0
@@ -0,0 +1,90 @@
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from monitoring.metrics import SPECULATIVE_RETRIEVALS
+from tool.retrieval import SpeculativeRetriever
+
+
+class _FakeEmbedding:
+    """Maps each text to a fixed vector; unknown texts are orthogonal to everything."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, text):
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+
+def _retriever(vectors=None):
+    return SpeculativeRetriever(_FakeEmbedding(vectors or {}), threshold=0.9, max_workers=2)
+
+
+def test_prefetch_is_used_when_query_and_filters_match():
+    retriever = _retriever()
+    calls = []
+    turn = retriever.start(
+        "Tìm việc Python ở Hà Nội",
+        {"jobs": lambda: calls.append(1) or [{"id": 1}]},
+        {"jobs": {"skills": "Python", "location": "Hà Nội"}},
+    )
+    before = SPECULATIVE_RETRIEVALS.labels("jobs", "used").get()
+
+    # reflection chỉ đổi hoa/thường, dấu câu -> cùng normalize_key
+    results = turn.take("jobs", "tìm việc python ở hà nội?", {"skills": "Python", "location": "Hà Nội"})
+
+    assert results == [{"id": 1}]
+    assert calls == [1]
+    assert SPECULATIVE_RETRIEVALS.labels("jobs", "used").get() == before + 1
+    retriever.shutdown()
+
+
+def test_prefetch_is_discarded_when_filters_differ():
+    retriever = _retriever()
+    turn = retriever.start("Công ty FPT", {"companies": lambda: [{"id": 1}]}, {"companies": {}})
+    before = SPECULATIVE_RETRIEVALS.labels("companies", "discarded").get()
+
+    assert turn.take("companies", "Công ty FPT", {"location": "Hà Nội"}) is None
+    assert SPECULATIVE_RETRIEVALS.labels("companies", "discarded").get() == before + 1
+    # mỗi prefetch chỉ được lấy một lần
+    assert turn.take("companies", "Công ty FPT", {}) is None
+    retriever.shutdown()
+
+
+def test_similarity_threshold_uses_embeddings():
+    retriever = _retriever({
+        "Công ty đó ở đâu": [1.0, 0.0, 0.0],
+        "Công ty FPT Software ở đâu": [0.95, 0.3, 0.0],
+        "Lương ở VNG thế nào": [0.0, 1.0, 0.0],
+    })
+    turn = retriever.start("Công ty đó ở đâu", {}, {})
+
+    assert turn.similarity("Công ty FPT Software ở đâu") > 0.9
+    assert turn.similarity("Lương ở VNG thế nào") < 0.1
+    retriever.shutdown()
+
+
+def test_failed_and_unused_prefetches_are_recorded():
+    retriever = _retriever()
+    release = threading.Event()
+
+    def broken():
+        raise RuntimeError("qdrant down")
+
+    def slow():
+        release.wait(1)
+        return []
+
+    turn = retriever.start("Công ty FPT", {"companies": broken, "jobs": slow}, {})
+    failed = SPECULATIVE_RETRIEVALS.labels("companies", "failed").get()
+    unused = SPECULATIVE_RETRIEVALS.labels("jobs", "unused").get()
+
+    assert turn.take("companies", "Công ty FPT", {}) is None
+    turn.discard()
+    release.set()
+
+    assert SPECULATIVE_RETRIEVALS.labels("companies", "failed").get() == failed + 1
+    assert SPECULATIVE_RETRIEVALS.labels("jobs", "unused").get() == unused + 1
+    retriever.shutdown()
@@ -0,0 +1,173 @@
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from tool.conversation_history import ConversationHistory, HistoryStore, get_codec
+
+
+def test_rewrite_is_attached_to_the_user_record():
+    history = ConversationHistory()
+    history.append("user", "Tìm việc ở đây")
+    history.append("assistant", "Bạn muốn tìm việc gì?")
+    history.append("user", "Hà Nội")
+    history.set_rewrite("Tôi muốn tìm công việc ở Hà Nội")
+
+    assert len(history) == 3
+    assert history.to_list()[-1] == {"role": "user", "content": "Hà Nội"}
+    assert history.prompt_messages()[-1] == {"role": "user", "content": "Tôi muốn tìm công việc ở Hà Nội"}
+    assert history._messages[0].role is history._messages[2].role
+
+
+def test_discard_removes_the_pending_user_turn():
+    history = ConversationHistory()
+    history.append("user", "Chào bạn")
+    history.append("assistant", "Xin chào")
+    before = (history.tokens, history.memory_bytes, history.to_list())
+    pending = history.append("user", "việc java ở hà nội")
+    history.set_rewrite("Tìm việc Java ở Hà Nội")
+    version = history.version
+
+    assert history.discard(pending)
+    assert (history.tokens, history.memory_bytes, history.to_list()) == before
+    assert "Java" not in str(history.prompt_messages())
+    assert history.version > version
+    assert not history.discard(pending)
+
+
+def test_ring_buffer_bounds_messages_and_tokens():
+    history = ConversationHistory(max_messages=4, token_budget=10_000)
+    for i in range(10):
+        history.append("user", f"tin nhắn {i}")
+    assert [m["content"] for m in history.to_list()] == [f"tin nhắn {i}" for i in range(6, 10)]
+    assert history.evicted == 6
+
+    history = ConversationHistory(max_messages=100, token_budget=50)
+    for _ in range(5):
+        history.append("assistant", "x" * 60)  # 20 token mỗi message
+    assert len(history) == 2 and history.tokens <= 50
+
+    history.append("assistant", "y" * 1000)  # vượt budget một mình: vẫn giữ message mới nhất
+    assert history.to_list() == [{"role": "assistant", "content": "y" * 1000}]
+
+
+def test_system_prompt_is_never_evicted(tmp_path):
+    history = ConversationHistory("s0", max_messages=4, token_budget=10_000, store=HistoryStore(str(tmp_path)))
+    history.append("system", "Bạn là trợ lý tuyển dụng")
+    for i in range(2):
+        history.append("user", f"câu hỏi {i}")
+        history.append("assistant", f"trả lời {i}")
+
+    assert [m["content"] for m in history.to_list()] == ["Bạn là trợ lý tuyển dụng", "trả lời 0", "câu hỏi 1", "trả lời 1"]
+    # lượt đã spill vẫn đọc lại được theo đúng thứ tự seq, kể cả khi system prompt cũ hơn
+    assert [m["id"] for m in history.page(since=-1)[0]] == [0, 1, 2, 3, 4]
+    messages, has_more = history.page(since=-1, limit=2)
+    assert [m["id"] for m in messages] == [0, 1] and has_more
+
+    history = ConversationHistory(max_messages=100, token_budget=30)
+    history.append("system", "s" * 30)  # 10 token
+    for _ in range(3):
+        history.append("assistant", "x" * 30)
+    assert [m["role"] for m in history.to_list()] == ["system", "assistant", "assistant"]
+    history.append("user", "y" * 300)  # vượt budget: chỉ còn system prompt và message mới nhất
+    assert [m["role"] for m in history.to_list()] == ["system", "user"]
+
+
+def test_cold_messages_are_compressed_and_read_back():
+    long_answer = "Công ty FPT Software tuyển Java Developer tại Hà Nội, lương hấp dẫn. " * 20
+    history = ConversationHistory(hot_messages=2, codec=get_codec("zstd"), token_budget=100_000)
+    history.append("assistant", long_answer)
+    before = history.memory_bytes
+    history.append("user", "Còn ở Đà Nẵng thì sao")
+    history.append("assistant", "Để mình tìm thử")
+
+    assert history._messages[0].compressed
+    assert not history._messages[-1].compressed
+    assert history.memory_bytes < before
+    assert history.to_list()[0]["content"] == long_answer
+
+
+def test_evicted_messages_spill_to_store(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    history = ConversationHistory("session/1", max_messages=2, store=store)
+    history.append("user", "Tìm việc ở đây")
+    history.set_rewrite("Tôi muốn tìm việc")
+    history.append("assistant", "Bạn muốn tìm việc gì?")
+    history.append("user", "Hà Nội")
+
+    assert history.archived() == [{"seq": 0, "role": "user", "content": "Tìm việc ở đây", "rewrite": "Tôi muốn tìm việc"}]
+    assert len(history) == 2
+
+    history.clear()
+    assert history.archived() == [] and len(history) == 0
+
+
+def test_page_returns_messages_after_cursor():
+    history = ConversationHistory()
+    for i in range(5):
+        history.append("user" if i % 2 == 0 else "assistant", f"tin nhắn {i}")
+
+    messages, has_more = history.page(limit=2)
+    assert [m["id"] for m in messages] == [0, 1] and has_more
+    messages, has_more = history.page(since=messages[-1]["id"], limit=2)
+    assert [m["id"] for m in messages] == [2, 3] and has_more
+    messages, has_more = history.page(since=3)
+    assert messages == [{"id": 4, "role": "user", "content": "tin nhắn 4"}] and not has_more
+    assert history.page(since=4) == ([], False)
+
+
+def test_etag_changes_on_every_update_and_counters_are_o1():
+    history = ConversationHistory("abc", max_messages=2)
+    etags = {history.etag}
+    history.append("user", "Tìm việc ở đây")
+    etags.add(history.etag)
+    history.set_rewrite("Tôi muốn tìm việc")
+    etags.add(history.etag)
+    history.append("assistant", "Bạn muốn tìm việc gì?")
+    history.append("user", "Hà Nội")
+    etags.add(history.etag)
+    assert len(etags) == 4
+    assert (len(history), history.total_messages) == (2, 3)
+
+    history.clear()
+    assert history.etag not in etags and history.total_messages == 0
+
+
+def test_etag_varies_with_page_and_instance():
+    history = ConversationHistory("abc")
+    history.append("user", "Tìm việc ở đây")
+    tags = {history.page_etag(), history.page_etag(since=0), history.page_etag(limit=1), history.page_etag(0, 1)}
+    assert len(tags) == 4
+
+    # session tạo lại với cùng id và cùng version không lặp lại ETag cũ
+    recreated = ConversationHistory("abc")
+    recreated.append("user", "Tìm việc ở đây")
+    assert recreated.version == history.version and recreated.page_etag() != history.page_etag()
+
+
+def test_stale_cursor_reads_spilled_messages(tmp_path):
+    history = ConversationHistory("s1", max_messages=2, store=HistoryStore(str(tmp_path)))
+    for i in range(5):
+        history.append("user", f"tin nhắn {i}")
+
+    messages, has_more = history.page(since=0, limit=3)
+    assert [m["id"] for m in messages] == [1, 2, 3] and has_more
+    assert [m["id"] for m in history.page(since=-1)[0]] == [0, 1, 2, 3, 4]
+
+
+def test_stale_cursor_seeks_to_the_indexed_offset(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path))
+    history = ConversationHistory("s2", max_messages=2, store=store)
+    for i in range(50):
+        history.append("user", f"tin nhắn {i}")
+
+    parsed = []
+    real_loads = json.loads
+    monkeypatch.setattr("tool.conversation_history.json.loads", lambda line: parsed.append(line) or real_loads(line))
+    messages, has_more = history.page(since=40, limit=3)
+    assert [m["id"] for m in messages] == [41, 42, 43] and has_more
+    assert len(parsed) == 4  # trang + một bản ghi để biết has_more, không đọc cả file
+
+    # store mới (process khởi động lại) dựng lại chỉ mục từ file có sẵn
+    assert [r["seq"] for r in HistoryStore(str(tmp_path)).load("s2", after=45)] == [46, 47]
@@ -0,0 +1,47 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from tool.keyword_automaton import KeywordAutomaton
+from tool.question_enhancer import InfoType, QuestionEnhancer
+
+
+def test_automaton_finds_overlapping_keywords():
+    automaton = KeywordAutomaton([("he", 1), ("she", 2), ("hers", 3), ("his", 4)])
+    found = {(m.keyword, m.start) for m in automaton.find("she said hers his")}
+    assert found == {("she", 0), ("hers", 9), ("his", 14)}
+
+
+def test_automaton_respects_word_boundaries():
+    automaton = KeywordAutomaton([("hp", "hải phòng"), ("ca", "ca"), ("tp.hcm", "tp.hcm")])
+    assert automaton.find("lập trình php, lương cao") == []
+    assert [m.payload for m in automaton.find("Làm ca tối ở HP")] == ["ca", "hải phòng"]
+    assert [m.keyword for m in automaton.find("văn phòng tp.hcm")] == ["tp.hcm"]
+
+
+def test_extract_slots_returns_canonical_values():
+    enhancer = QuestionEnhancer()
+    slots = enhancer.extract_slots("Tìm việc dev ở Sài Gòn, lương 20 triệu, fresher")
+
+    assert slots[InfoType.JOB_POSITION] == ["lập trình"]
+    assert slots[InfoType.LOCATION] == ["tp.hcm"]
+    assert "lương" in slots[InfoType.SALARY]
+    assert slots[InfoType.EXPERIENCE] == ["fresher"]
+    assert InfoType.WORK_TYPE not in slots
+
+
+def test_analyze_incomplete_question():
+    enhancer = QuestionEnhancer()
+    status = enhancer.analyze_incomplete_question("Có việc nào đang tuyển không?")
+    assert set(status) == set(InfoType)
+    assert status[InfoType.LOCATION] is False
+
+    status = enhancer.analyze_incomplete_question("Kế toán ở Hà Nội part-time")
+    assert status[InfoType.JOB_POSITION] and status[InfoType.LOCATION] and status[InfoType.WORK_TYPE]
+
+
+def test_extract_locations_ignores_substrings():
+    enhancer = QuestionEnhancer()
+    assert enhancer.extract_locations("Tòa nhà Technosoft, Cầu Giấy, Hà Nội / Quận 1, TP HCM") == ["hà nội", "tp.hcm"]
+    assert enhancer.extract_locations("Senior PHP developer") == []
@@ -0,0 +1,58 @@
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from tool.reflection import ReflectionGate
+from monitoring.metrics import REFLECTION_GATE, REFLECTION_SECONDS_SAVED
+
+
+def _history(*turns):
+    return [{"role": role, "content": content} for role, content in turns]
+
+
+def test_first_turn_skips_reflection():
+    gate = ReflectionGate()
+    calls = []
+    text, decision = gate.rewrite(_history(("user", "Xin chào")), lambda history: calls.append(history) or "rewritten")
+    assert (text, decision.skip, decision.reason) == ("Xin chào", True, "first_turn")
+    assert calls == []
+
+
+def test_self_contained_question_skips_and_counts_saved_time():
+    gate = ReflectionGate()
+    history = _history(
+        ("user", "Xin chào"),
+        ("assistant", "Chào bạn, mình có thể giúp gì."),
+        ("user", "Tìm việc lập trình viên Python ở Hà Nội"),
+    )
+    # một lần reflection thật để gate học latency
+    gate.rewrite(history[:2] + _history(("user", "Tìm việc gì cũng được")), lambda history: time.sleep(0.01) or "Tôi muốn tìm việc")
+    skipped = REFLECTION_GATE.labels("skip", "self_contained").get()
+    saved = REFLECTION_SECONDS_SAVED.get()
+
+    text, decision = gate.rewrite(history, lambda history: "rewritten")
+
+    assert (text, decision.reason) == ("Tìm việc lập trình viên Python ở Hà Nội", "self_contained")
+    assert REFLECTION_GATE.labels("skip", "self_contained").get() == skipped + 1
+    assert REFLECTION_SECONDS_SAVED.get() - saved >= 0.01
+
+    status = gate.status()
+    assert status["decisions"]["skip/self_contained"] == skipped + 1
+    assert status["rewrite_latency_ewma_s"] >= 0.01
+
+
+def test_context_dependent_messages_run_reflection():
+    gate = ReflectionGate()
+    greeting = _history(("user", "Xin chào"), ("assistant", "Chào bạn."))
+    # trả lời câu hỏi lại của bot: cần gộp lịch sử ("Tìm việc ở đây" + "Hà Nội")
+    follow_up = _history(("user", "Tìm việc ở đây"), ("assistant", "Bạn muốn tìm việc gì?"), ("user", "Java developer ở Hà Nội"))
+    assert gate.decide(follow_up).reason == "follow_up"
+    assert gate.decide(greeting + _history(("user", "Còn ở Đà Nẵng thì sao"))).reason == "reference"
+    assert gate.decide(greeting + _history(("user", "Tìm việc developer khác ở Hà Nội"))).reason == "reference"
+    assert gate.decide(greeting + _history(("user", "lap trinh vien o do"))).reason == "reference"
+    assert gate.decide(greeting + _history(("user", "Ở Hà Nội"))).reason == "incomplete"
+
+    text, decision = gate.rewrite(follow_up, lambda history: "Tôi muốn tìm việc Java developer ở Hà Nội")
+    assert (text, decision.skip) == ("Tôi muốn tìm việc Java developer ở Hà Nội", False)
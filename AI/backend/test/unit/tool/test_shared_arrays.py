@@ -0,0 +1,66 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from monitoring.metrics import process_memory
+from tool.semantic_router import Route, SemanticRouter
+from tool.shared_arrays import SharedArrayStore, fingerprint
+
+
+class _CountingEmbedding:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_array_is_built_once_and_mapped_read_only(tmp_path):
+    store = SharedArrayStore(str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return np.arange(6, dtype=np.float32).reshape(2, 3)
+
+    first = store.get_or_build("matrix", "k1", build)
+    second = SharedArrayStore(str(tmp_path)).get_or_build("matrix", "k1", build)  # e.g. another worker
+
+    assert builds == [1]
+    assert isinstance(first, np.memmap)
+    np.testing.assert_array_equal(first, second)
+    with pytest.raises(ValueError):
+        first[0, 0] = 1.0
+    assert [name for name in os.listdir(tmp_path)] == ["matrix-k1.npy"]
+
+
+def test_fingerprint_changes_with_inputs():
+    assert fingerprint("model", ["xin chào"]) == fingerprint("model", ["xin chào"])
+    assert fingerprint("model", ["xin chào"]) != fingerprint("model", ["tạm biệt"])
+    assert fingerprint("model-a", ["xin chào"]) != fingerprint("model-b", ["xin chào"])
+
+
+def test_router_scores_are_identical_with_mmap_store(tmp_path):
+    routes = [Route(name="chitchat", samples=["xin chào", "bạn khỏe không"]), Route(name="jd", samples=["tìm việc python"])]
+    in_memory = SemanticRouter(embedding=_CountingEmbedding(), routes=routes, cache_size=0)
+    embedding = _CountingEmbedding()
+    mapped = SemanticRouter(embedding=embedding, routes=routes, cache_size=0, store=SharedArrayStore(str(tmp_path)))
+    assert embedding.calls == 2
+
+    # a second process reuses the files instead of encoding the samples again
+    reused = SemanticRouter(embedding=embedding, routes=routes, cache_size=0, store=SharedArrayStore(str(tmp_path)))
+    assert embedding.calls == 2
+
+    for query in ("xin chào bạn", "tìm việc java ở Hà Nội"):
+        assert mapped.guide(query) == in_memory.guide(query) == reused.guide(query)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux /proc")
+def test_process_memory_reads_proc():
+    memory = process_memory()
+    assert memory["rss"] >= memory["pss"] > 0
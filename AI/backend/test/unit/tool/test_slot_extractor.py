@@ -0,0 +1,167 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from monitoring.metrics import FEATURE_EXTRACTIONS
+from tool.extract_feature_question_about_jd import ExtractFeatureQuestion
+from tool.slot_extractor import RuleBasedFeatureExtractor
+
+
+def test_fully_resolved_query():
+    result = RuleBasedFeatureExtractor().extract("Tìm việc Java ở Hà Nội 2 năm kinh nghiệm")
+    assert result.fields == {"location": "Hà Nội", "experience": "2 năm", "skills": "Java"}
+    assert result.confidence == 1.0
+    assert result.fully_resolved
+
+
+def test_title_from_skill_and_role():
+    extractor = RuleBasedFeatureExtractor(skills=["Java", "C++", "Spring Boot"])
+    result = extractor.extract("Senior Java Developer tại HCM 1-2 năm")
+    assert result.fields["title"] == "Senior Java Developer"
+    assert result.fields["location"] == "Hồ Chí Minh"
+    assert result.fields["experience"] == "1-2 năm"
+
+    result = extractor.extract("lập trình viên C++ biết Spring Boot")
+    assert result.fields["skills"] == "C++, Spring Boot"
+    assert result.fields["title"] == "lập trình viên C++"
+
+
+def test_unexplained_words_lower_confidence():
+    result = RuleBasedFeatureExtractor().extract("Hà Nội có tuyển Data Analyst không?")
+    assert result.fields == {"location": "Hà Nội"}
+    assert result.unexplained == ["data", "analyst"]
+    assert result.confidence == 0.5
+    assert not result.fully_resolved
+
+
+def test_salary_with_unit():
+    extractor = RuleBasedFeatureExtractor()
+    assert extractor.extract("Tìm việc Java lương 20 triệu ở Hà Nội").fields["salary"] == "20 triệu"
+    assert extractor.extract("Python từ 15-20tr").fields["salary"] == "15-20 triệu"
+    assert extractor.extract("Java trên 1000 USD").fields["salary"] == "1000 USD"
+    assert extractor.extract("Tìm việc Java lương 20 triệu ở Hà Nội").fully_resolved
+
+    # mức tối đa và số có dấu phân cách để LLM xử lý
+    for query in ("việc Java dưới 20 triệu", "Java lương 1,5 triệu"):
+        result = extractor.extract(query)
+        assert "salary" not in result.fields and not result.fully_resolved
+
+
+def test_negation_and_comparison_words_are_unexplained():
+    extractor = RuleBasedFeatureExtractor()
+
+    result = extractor.extract("Java developer không ở Hà Nội")
+    assert result.unexplained == ["không"]
+    assert result.confidence < 1.0 and not result.fully_resolved
+
+    result = extractor.extract("Tìm việc Java dưới 2 năm kinh nghiệm")
+    assert result.unexplained == ["dưới"]
+    assert not result.fully_resolved
+
+    result = extractor.extract("Tuyển Python ít nhất 3 năm")
+    assert result.unexplained == ["ít", "nhất"]
+    assert extractor.extract("Việc Python ngoài Hà Nội").unexplained == ["ngoài"]
+
+    # từ so sánh thuộc về chính cụm đã khớp không làm trường bị loại
+    assert extractor.extract("Python lương từ 15 triệu").qualified == []
+
+    # "không" cuối câu là câu hỏi có/không, không phải phủ định
+    assert extractor.extract("Đà Nẵng có tuyển Java không ạ?").fully_resolved
+
+
+class _FakeLLM:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+        self.kwargs = {}
+
+    def chat(self, messages, **kwargs):
+        self.calls += 1
+        self.kwargs = kwargs
+        return self.response
+
+
+def _extractor(llm_response):
+    extractor = ExtractFeatureQuestion.__new__(ExtractFeatureQuestion)  # no Ollama client needed
+    extractor.valid_fields = ["title", "skills", "company", "location", "experience", "salary", "description"]
+    extractor.llm = _FakeLLM(llm_response)
+    extractor.rule_extractor = RuleBasedFeatureExtractor()
+    extractor.min_rule_confidence = 1.0
+    extractor.generation_options = {}
+    return extractor
+
+
+def test_extract_skips_llm_when_rules_resolve_everything():
+    extractor = _extractor('{"title": "wrong"}')
+    before = FEATURE_EXTRACTIONS.labels("rules").get()
+
+    features = extractor.extract("Tìm việc Python ở Đà Nẵng", "extract_feature_question_about_jd")
+
+    assert features == {"skills": "Python", "location": "Đà Nẵng"}
+    assert extractor.llm.calls == 0
+    assert FEATURE_EXTRACTIONS.labels("rules").get() == before + 1
+
+
+def test_extract_uses_llm_only_for_unresolved_fields():
+    extractor = _extractor('{"title": "Data Analyst", "location": "Ha Noi"}')
+
+    features = extractor.extract("Hà Nội có tuyển Data Analyst không?", "extract_feature_question_about_jd")
+
+    assert extractor.llm.calls == 1
+    assert features == {"title": "Data Analyst", "location": "Hà Nội"}
+    # the JSON schema only asks for fields the rules left open
+    schema = extractor.llm.kwargs["format"]
+    assert "location" not in schema["properties"]
+    assert set(schema["properties"]) == {"title", "skills", "company", "experience", "salary", "description"}
+    assert extractor.llm.kwargs["stage"] == "extract_feature_question_about_jd"
+
+
+def test_qualified_fields_are_left_to_the_llm():
+    cases = [
+        ("Tìm việc Java không ở Hà Nội", '{"location": "Đà Nẵng"}', "location", "Đà Nẵng"),
+        ("Java developer không ở Hà Nội", '{}', "location", None),
+        ("Tìm việc Java dưới 2 năm kinh nghiệm", '{"experience": "dưới 2 năm"}', "experience", "dưới 2 năm"),
+        ("Việc Python ngoài Hà Nội", '{"location": "ngoài Hà Nội"}', "location", "ngoài Hà Nội"),
+    ]
+    for query, llm_response, name, expected in cases:
+        extractor = _extractor(llm_response)
+        extractor.min_rule_confidence = 0.5  # confidence đủ cao vẫn không được đi đường rule-only
+
+        features = extractor.extract(query, "extract_feature_question_about_jd")
+
+        assert extractor.llm.calls == 1, query
+        assert features.get(name) == expected, query
+        assert name in extractor.llm.kwargs["format"]["properties"], query
+        assert name in RuleBasedFeatureExtractor().extract(query).qualified
+
+
+def test_parse_response_prefers_structured_json():
+    extractor = _extractor("")
+    assert extractor._parse_response('{"title": "Tester"}') == {"title": "Tester"}
+    # servers that ignore ``format`` may still wrap the JSON in prose
+    assert extractor._parse_response('Kết quả: {"title": "Tester"}') == {"title": "Tester"}
+    assert extractor._parse_response("[]") == {}
+
+
+def test_rule_features_only_when_fully_resolved():
+    extractor = _extractor('{"title": "wrong"}')
+
+    assert extractor.rule_features("Tìm việc Python ở Đà Nẵng") == {"skills": "Python", "location": "Đà Nẵng"}
+    assert extractor.rule_features("Hà Nội có tuyển Data Analyst không?") == {}
+    assert extractor.rule_features("xin chào") == {}
+    assert extractor.llm.calls == 0
+
+    extractor.rule_extractor = None
+    assert extractor.rule_features("Tìm việc Python ở Đà Nẵng") == {}
+
+
+def test_legacy_extraction_settings_override_the_profile():
+    extractor = _extractor('{"title": "Data Analyst"}')
+    extractor.extract("Hà Nội có tuyển Data Analyst không?", "extract_feature_question_about_jd")
+    assert "options" not in extractor.llm.kwargs  # profile của prompt áp dụng
+
+    extractor.generation_options = {"num_predict": 64}
+    extractor.extract("Hà Nội có tuyển Data Analyst không?", "extract_feature_question_about_jd")
+    assert extractor.llm.kwargs["options"] == {"num_predict": 64}
+    assert extractor.llm.kwargs["stage"] == "extract_feature_question_about_jd"
@@ -0,0 +1,95 @@
+import sys
+import os
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+import numpy as np
+
+from tool.question_enhancer import InfoType, QuestionEnhancer
+from tool.retrieval.filters import company_keys
+from tool.retrieval.sparse import tokenize
+from tool.semantic_router import Route, SemanticRouter
+from tool.text_normalizer import fold_diacritics, normalize_and_fold, normalize_key, normalize_text
+
+
+def test_normalize_text_collapses_case_punctuation_and_spaces():
+    assert normalize_text("  Tìm việc   ở HÀ NỘI!!  ") == "tìm việc ở hà nội"
+    assert normalize_text("UI/UX, full-time") == "ui ux full time"
+    assert normalize_text("") == ""
+
+
+def test_fold_diacritics_keeps_length():
+    text = "đường phố hồ chí minh, Đà Nẵng"
+    folded = fold_diacritics(text)
+    assert folded == "duong pho ho chi minh, Da Nang"
+    assert len(folded) == len(text)
+
+
+def test_normalize_key_is_unicode_form_insensitive():
+    decomposed = unicodedata.normalize("NFD", "Hà Nội")
+    assert normalize_key(decomposed) == normalize_key("ha noi") == normalize_key("HÀ NỘI?") == "ha noi"
+    long_text = "Kế toán " * 100
+    assert normalize_key(long_text) == " ".join(["ke toan"] * 100)
+
+
+def test_normalize_and_fold_returns_aligned_pair():
+    assert normalize_and_fold("Hà Nội!") == ("hà nội", "ha noi")
+    assert normalize_and_fold("") == ("", "")
+    long_text = "Đà Nẵng " * 100
+    normalized, folded = normalize_and_fold(long_text)
+    assert folded == " ".join(["da nang"] * 100)
+    assert len(normalized) == len(folded)
+
+
+def test_question_enhancer_shares_keyword_table_and_sees_edits():
+    first, second = QuestionEnhancer(), QuestionEnhancer()
+    assert first._keyword_table() is second._keyword_table()
+    assert first.keyword_automaton is second.keyword_automaton
+
+    edited = QuestionEnhancer()
+    edited.location_keywords = {**edited.location_keywords, "vũng tàu": ["vũng tàu"]}
+    assert edited.extract_locations("việc ở Vũng Tàu") == ["vũng tàu"]
+    assert first.extract_locations("việc ở Vũng Tàu") == []
+
+
+def test_question_enhancer_matches_unaccented_input():
+    enhancer = QuestionEnhancer()
+    slots = enhancer.extract_slots("tim viec ke toan o ha noi, luong 15 trieu, part time")
+
+    assert slots[InfoType.JOB_POSITION] == ["kế toán"]
+    assert slots[InfoType.LOCATION] == ["hà nội"]
+    assert slots[InfoType.WORK_TYPE] == ["part-time"]
+    assert enhancer.extract_locations("Da Nang hoặc Sai Gon") == ["đà nẵng", "tp.hcm"]
+
+
+def test_question_enhancer_rejects_wrong_diacritics():
+    enhancer = QuestionEnhancer()
+    # "cả" is not the shift keyword "ca"; "hà nọi" is a typo, not "hà nội"
+    assert InfoType.WORK_TYPE not in enhancer.extract_slots("Tất cả vị trí")
+    assert enhancer.extract_locations("việc ở hà nọi") == []
+    assert enhancer.extract_locations("việc ở ha nội") == ["hà nội"]
+
+
+def test_sparse_tokens_and_company_keys_ignore_diacritics():
+    assert tokenize("Lập trình viên Hà Nội") == tokenize("lap trinh vien ha noi")
+    assert company_keys("Công ty Cổ phần Viễn Thông FPT") == company_keys("cty co phan vien thong fpt")
+
+
+class _CountingEmbedding:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_semantic_router_caches_by_normalized_query():
+    embedding = _CountingEmbedding()
+    router = SemanticRouter(embedding=embedding, routes=[Route(name="chitchat", samples=["xin chào"])])
+    calls_after_init = embedding.calls
+
+    first = router.guide("Xin chào!")
+    assert router.guide("xin chao") == first
+    assert embedding.calls == calls_after_init + 1
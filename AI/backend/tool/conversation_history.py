@@ -0,0 +1,426 @@
+"""
+Lịch sử hội thoại gọn và có giới hạn cho mỗi session.
+
+* ``Message`` dùng ``__slots__`` (không có ``__dict__`` mỗi bản ghi); role được
+  intern nên mọi bản ghi cùng role trỏ tới một chuỗi duy nhất.
+* Ring buffer: giữ tối đa ``max_messages`` bản ghi và ``token_budget`` token
+  (ước lượng); bản ghi cũ nhất bị đẩy ra khi vượt giới hạn (luôn giữ bản ghi mới nhất).
+* Bản ghi "lạnh" (ngoài ``hot_messages`` bản ghi mới nhất) được nén bằng zstd
+  (gói ``zstandard``, thiếu thì dùng zlib); chỉ giải nén khi đọc.
+* Bản ghi bị đẩy ra được ghi vào ``HistoryStore`` (JSONL, mỗi session một file)
+  thay vì mất hẳn, nếu có store. Store giữ chỉ mục seq -> byte offset nên đọc
+  một trang cũ chỉ seek tới đúng dòng cần, không parse lại cả file.
+* Câu viết lại của reflection được gắn vào chính bản ghi user (``rewrite``) thay vì
+  thêm một message user thứ hai: prompt dùng câu viết lại, giao diện hiển thị câu gốc.
+"""
+import bisect
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import zlib
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from monitoring.metrics import CHAT_HISTORY_EVICTIONS
+from tool.retrieval import estimate_tokens
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_ROLES = {role: sys.intern(role) for role in ("system", "user", "assistant")}
+
+
+class _Codec:
+    def __init__(self, name: str, compress, decompress):
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+_ZLIB = _Codec("zlib", lambda data: zlib.compress(data, 6), zlib.decompress)
+# ZstdCompressor không dùng chung được giữa các thread: tạo mới mỗi lần (rẻ so với một lượt chat)
+_ZSTD = _Codec(
+    "zstd",
+    lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+    lambda data: zstandard.ZstdDecompressor().decompress(data),
+) if zstandard is not None else None
+
+
+@lru_cache(maxsize=None)
+def get_codec(name: str) -> Optional[_Codec]:
+    """``"zstd"`` (zlib nếu chưa cài ``zstandard``), ``"zlib"``, ``"none"``/rỗng -> không nén."""
+    name = (name or "none").lower()
+    if name == "zstd":
+        if _ZSTD is None:
+            logger.warning("zstandard is not installed, compressing chat history with zlib")
+            return _ZLIB
+        return _ZSTD
+    if name == "zlib":
+        return _ZLIB
+    return None
+
+
+class Message:
+    __slots__ = ("seq", "role", "tokens", "_content", "_rewrite", "_codec")
+
+    def __init__(self, seq: int, role: str, content: str):
+        self.seq = seq
+        self.role = _ROLES.get(role) or sys.intern(role)
+        self._content: Union[str, bytes] = content
+        self._rewrite: Union[str, bytes, None] = None
+        self._codec: Optional[_Codec] = None
+        self.tokens = estimate_tokens(content)
+
+    def _decode(self, value: Union[str, bytes, None]) -> Optional[str]:
+        if isinstance(value, bytes):
+            return self._codec.decompress(value).decode("utf-8")
+        return value
+
+    @property
+    def content(self) -> str:
+        return self._decode(self._content)
+
+    @property
+    def rewrite(self) -> Optional[str]:
+        return self._decode(self._rewrite)
+
+    @property
+    def compressed(self) -> bool:
+        return self._codec is not None
+
+    def compress(self, codec: _Codec, min_bytes: int) -> None:
+        """Nén content (và rewrite) khi đủ dài để nén có lợi."""
+        if self._codec is not None:
+            return
+        content = self._content.encode("utf-8")
+        if len(content) < min_bytes:
+            return
+        packed = codec.compress(content)
+        if len(packed) >= len(content):
+            return
+        self._codec = codec
+        self._content = packed
+        if self._rewrite is not None:
+            self._rewrite = codec.compress(self._rewrite.encode("utf-8"))
+
+    def footprint(self) -> int:
+        """Số byte ước lượng của bản ghi (role đã intern nên không tính)."""
+        size = sys.getsizeof(self) + sys.getsizeof(self._content)
+        return size + (sys.getsizeof(self._rewrite) if self._rewrite is not None else 0)
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    def prompt_dict(self) -> Dict[str, str]:
+        """Dạng đưa vào prompt: câu đã viết lại (tự đủ nghĩa) nếu có."""
+        rewrite = self.rewrite
+        return {"role": self.role, "content": rewrite if rewrite is not None else self.content}
+
+
+class HistoryStore:
+    """
+    Lưu các bản ghi bị đẩy khỏi ring buffer thành JSONL, mỗi session một file.
+
+    Mỗi session có chỉ mục (seq, byte offset) của từng dòng, cập nhật khi ghi
+    (hoặc dựng một lần cho file có sẵn từ trước), để ``load(after=...)`` seek
+    thẳng tới bản ghi đầu tiên cần đọc.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._index: Dict[str, Tuple[array, array]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, session_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w-]", "_", session_id) + ".jsonl")
+
+    def _build_index(self, session_id: str) -> Tuple[array, array]:
+        seqs, offsets = array("q"), array("q")
+        try:
+            with open(self.path(session_id), "rb") as handle:
+                offset = 0
+                for line in handle:
+                    if line.strip():
+                        seqs.append(json.loads(line)["seq"])
+                        offsets.append(offset)
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        return seqs, offsets
+
+    def _session_index(self, session_id: str) -> Tuple[array, array]:
+        index = self._index.get(session_id)
+        if index is None:
+            index = self._index[session_id] = self._build_index(session_id)
+        return index
+
+    def archive(self, session_id: str, messages: Sequence[Message]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            seqs, offsets = self._session_index(session_id)
+            with open(self.path(session_id), "ab") as handle:
+                offset = handle.seek(0, os.SEEK_END)
+                for message in messages:
+                    record = {"seq": message.seq, **message.as_dict()}
+                    if message.rewrite is not None:
+                        record["rewrite"] = message.rewrite
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                    handle.write(line)
+                    seqs.append(message.seq)
+                    offsets.append(offset)
+                    offset += len(line)
+
+    def load(self, session_id: str, after: int = -1, limit: Optional[int] = None) -> List[Dict]:
+        """Các bản ghi có ``seq`` > ``after`` (theo thứ tự), tối đa ``limit``."""
+        with self._lock:
+            seqs, offsets = self._session_index(session_id)
+            start = bisect.bisect_right(seqs, after)
+            if start >= len(seqs):
+                return []
+            offset = offsets[start]
+            count = len(seqs) - start if limit is None else min(limit, len(seqs) - start)
+        records = []
+        try:
+            with open(self.path(session_id), "rb") as handle:
+                handle.seek(offset)
+                for line in handle:
+                    if len(records) >= count:
+                        break
+                    if line.strip():
+                        records.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return records
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._index.pop(session_id, None)
+            try:
+                os.remove(self.path(session_id))
+            except FileNotFoundError:
+                pass
+
+
+class ConversationHistory:
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        *,
+        max_messages: int = 64,
+        token_budget: int = 4096,
+        hot_messages: int = 8,
+        codec: Optional[_Codec] = None,
+        compress_min_bytes: int = 256,
+        store: Optional[HistoryStore] = None,
+    ):
+        self.session_id = session_id
+        self.max_messages = max(1, max_messages)
+        self.token_budget = token_budget
+        # Bản ghi user mới nhất luôn chưa nén để reflection gắn rewrite vào
+        self.hot_messages = max(1, hot_messages)
+        self.codec = codec
+        self.compress_min_bytes = compress_min_bytes
+        self.store = store
+        self.tokens = 0
+        self.memory_bytes = 0
+        self.evicted = 0
+        # seq lớn nhất đã bị đẩy khỏi ring: cursor cũ hơn mốc này phải đọc thêm từ store
+        self._evicted_seq = -1
+        # Tăng sau mỗi thay đổi: dùng làm ETag cho API lịch sử
+        self.version = 0
+        # Ngẫu nhiên cho mỗi instance: session bị xóa rồi tạo lại (cùng session_id,
+        # version đếm lại từ 0) không bao giờ trả lại ETag cũ
+        self.epoch = secrets.token_hex(4)
+        self._next_seq = 0
+        self._messages: Deque[Message] = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings, session_id: Optional[str] = None) -> "ConversationHistory":
+        return cls(
+            session_id,
+            max_messages=settings.HISTORY_MAX_MESSAGES,
+            token_budget=settings.HISTORY_TOKEN_BUDGET,
+            hot_messages=settings.HISTORY_HOT_MESSAGES,
+            codec=get_codec(settings.HISTORY_COMPRESSION),
+            store=HistoryStore(settings.HISTORY_SPILL_DIR) if settings.HISTORY_SPILL_DIR and session_id else None,
+        )
+
+    def append(self, role: str, content: str) -> Message:
+        with self._lock:
+            message = Message(self._next_seq, role, content or "")
+            self._next_seq += 1
+            self.version += 1
+            self._messages.append(message)
+            self.tokens += message.tokens
+            self.memory_bytes += message.footprint()
+            if self.codec is not None and len(self._messages) > self.hot_messages:
+                self._resize(self._messages[-self.hot_messages - 1], lambda cold: cold.compress(self.codec, self.compress_min_bytes))
+            evicted = self._evict()
+        self._spill(evicted)
+        return message
+
+    def set_rewrite(self, rewrite: str) -> None:
+        """Gắn câu viết lại của reflection vào bản ghi user mới nhất."""
+        with self._lock:
+            message = next((m for m in reversed(self._messages) if m.role == "user"), None)
+            if message is None or message.compressed or rewrite == message.content:
+                return
+            self.version += 1
+            tokens = message.tokens
+            message.tokens = estimate_tokens(rewrite)
+            self.tokens += message.tokens - tokens
+            self._resize(message, lambda m: setattr(m, "_rewrite", rewrite))
+            evicted = self._evict()
+        self._spill(evicted)
+
+    def discard(self, message: Message) -> bool:
+        """
+        Bỏ một message (kèm rewrite) khỏi ring buffer, vd: lượt user bị từ chối vì Ollama quá tải.
+
+        Trả về False khi message không còn trong bộ nhớ (đã bị đẩy ra hoặc đã clear).
+        """
+        with self._lock:
+            try:
+                self._messages.remove(message)
+            except ValueError:
+                return False
+            self.tokens -= message.tokens
+            self.memory_bytes -= message.footprint()
+            self.version += 1
+            return True
+
+    def _resize(self, message: Message, change) -> None:
+        before = message.footprint()
+        change(message)
+        self.memory_bytes += message.footprint() - before
+
+    def _evict(self) -> List[Message]:
+        """
+        Đẩy message cũ nhất ra khi vượt ``max_messages`` hoặc ``token_budget``.
+
+        Message ``system`` (system prompt sau /api/chat/clear) được ghim, không bao giờ bị
+        đẩy ra; message mới nhất cũng luôn được giữ lại.
+        """
+        evicted = []
+        while len(self._messages) > self.max_messages or self.tokens > self.token_budget:
+            # System prompt nằm ở đầu ring nên vòng tìm này chỉ đi qua vài phần tử
+            index = next((i for i, m in enumerate(self._messages) if m.role != "system"), None)
+            if index is None or index == len(self._messages) - 1:
+                break
+            message = self._messages[index]
+            del self._messages[index]
+            self.tokens -= message.tokens
+            self.memory_bytes -= message.footprint()
+            self._evicted_seq = message.seq
+            evicted.append(message)
+        self.evicted += len(evicted)
+        return evicted
+
+    def _spill(self, evicted: List[Message]) -> None:
+        if not evicted:
+            return
+        if self.store is None:
+            CHAT_HISTORY_EVICTIONS.labels("dropped").inc(len(evicted))
+            return
+        try:
+            self.store.archive(self.session_id, evicted)
+            CHAT_HISTORY_EVICTIONS.labels("spilled").inc(len(evicted))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not spill chat history of {self.session_id}: {e}")
+            CHAT_HISTORY_EVICTIONS.labels("dropped").inc(len(evicted))
+
+    def _snapshot(self) -> List[Message]:
+        with self._lock:
+            return list(self._messages)
+
+    def to_list(self) -> List[Dict[str, str]]:
+        """Lịch sử để hiển thị (câu gốc của người dùng)."""
+        return [message.as_dict() for message in self._snapshot()]
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        """Lịch sử đưa vào prompt (câu user đã viết lại nếu có)."""
+        return [message.prompt_dict() for message in self._snapshot()]
+
+    @property
+    def etag(self) -> str:
+        """Định danh trạng thái hiện tại của lịch sử (session, epoch, version)."""
+        return f"{self.session_id or 'local'}-{self.epoch}-{self.version}"
+
+    def page_etag(self, since: Optional[int] = None, limit: Optional[int] = None) -> str:
+        """ETag của một trang: cùng lịch sử nhưng khác ``since``/``limit`` là nội dung khác."""
+        return f"{self.etag}-{'' if since is None else since}-{'' if limit is None else limit}"
+
+    @property
+    def total_messages(self) -> int:
+        """Số message từ lần clear gần nhất, kể cả các message đã bị đẩy khỏi ring buffer (O(1))."""
+        return len(self._messages) + self.evicted
+
+    def page(self, since: Optional[int] = None, limit: Optional[int] = None) -> Tuple[List[Dict], bool]:
+        """
+        Các message có ``id`` > ``since`` (tất cả khi ``since`` là None), tối đa ``limit``.
+
+        Cursor ``since`` cũ hơn message cũ nhất còn trong bộ nhớ thì đọc thêm các lượt
+        đã spill ra store. Trả về (messages, còn message sau trang này hay không).
+        """
+        after = -1 if since is None else since
+        snapshot = self._snapshot()
+        start = bisect.bisect_right(snapshot, after, key=lambda message: message.seq)
+
+        # Đọc thêm tối đa một bản ghi để biết còn trang sau hay không
+        remaining = snapshot[start:] if limit is None else snapshot[start:start + limit + 1]
+        if self.store is None or after >= self._evicted_seq:
+            entries = [(message.seq, message) for message in remaining]
+        else:
+            # Message system được ghim có thể cũ hơn các lượt đã spill: trộn theo seq
+            entries = sorted(
+                [
+                    (record["seq"], {"id": record["seq"], "role": record["role"], "content": record["content"]})
+                    for record in self.store.load(self.session_id, after, None if limit is None else limit + 1)
+                ]
+                + [(message.seq, message) for message in remaining],
+                key=lambda entry: entry[0],
+            )
+        has_more = limit is not None and len(entries) > limit
+        if limit is not None:
+            entries = entries[:limit]
+        # Chỉ giải nén các message nằm trong trang trả về
+        records = [
+            item if isinstance(item, dict) else {"id": seq, **item.as_dict()}
+            for seq, item in entries
+        ]
+        return records, has_more
+
+    def archived(self) -> List[Dict]:
+        """Các bản ghi đã bị đẩy ra và được lưu trong store."""
+        return self.store.load(self.session_id) if self.store is not None else []
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self.tokens = 0
+            self.memory_bytes = 0
+            self.evicted = 0
+            self._evicted_seq = -1
+            self.version += 1
+        if self.store is not None:
+            self.store.delete(self.session_id)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.to_list())
+
+
+__all__ = ["ConversationHistory", "HistoryStore", "Message", "get_codec"]
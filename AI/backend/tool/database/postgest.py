@@ -60,6 +60,21 @@ class PostgreSQLClient:
             logger.error(f"❌ Error getting {str(e)}")
             return self._get_companies_fallback(limit)
 
+    def get_skill_names(self) -> List[str]:
+        """
+        Lấy danh sách tên kỹ năng từ bảng skill (dùng làm từ điển cho rule-based extractor)
+        Returns:
+            List[str]: tên kỹ năng, bỏ trùng và bỏ giá trị rỗng
+        """
+        try:
+            response = self.client.table("skill").select("skill_name").execute()
+            names = [row.get("skill_name") for row in response.data or []]
+            logger.info(f"✅ Retrieved {len(names)} skills")
+            return sorted({name.strip() for name in names if name and name.strip()})
+        except Exception as e:
+            logger.error(f"❌ Error getting skills: {str(e)}")
+            return []
+
     
 
     
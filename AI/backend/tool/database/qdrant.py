@@ -1,11 +1,36 @@
+from typing import Optional
+
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import (
+    Distance,
+    Filter,
+    Fusion,
+    FusionQuery,
+    Prefetch,
+    SearchParams,
+    SparseVector,
+    VectorParams,
+)
+
+from monitoring.metrics import QDRANT_CALLS
+from monitoring.tracing import traced
+
+_SEARCH_CALLS = QDRANT_CALLS.labels("search")
+_HYBRID_SEARCH_CALLS = QDRANT_CALLS.labels("hybrid_search")
 
 
 class QDrant():
+    # QDRANT_URL=":memory:" -> một local in-memory client dùng chung cho cả process (benchmark / offline dev)
+    _memory_client = None
+
     def __init__(self, Settings=None):
         self.url = Settings.QDRANT_URL
         self.api_key = Settings.QDRANT_API_KEY
+        if self.url == ":memory:":
+            if QDrant._memory_client is None:
+                QDrant._memory_client = QdrantClient(":memory:")
+            self.client = QDrant._memory_client
+            return
         # Disable compatibility check and set timeout for better error handling
         try:
             self.client = QdrantClient(
@@ -94,18 +119,66 @@ class QDrant():
         else:
             print(f"ℹ️  No new vectors to insert - all IDs already exist in collection")
         
-    def search_vectors(self, collection_name: str, query_vector: list, top_k: int):
-        results = self.client.search(
-        collection_name=collection_name,
-        query_vector=query_vector,
-        limit=top_k,
-        search_params={
-            "hnsw_ef": 128,   # tăng độ chính xác (default thường 16-64)
-            "exact": False     # nếu True => brute-force, chính xác tuyệt đối nhưng chậm
-        }
-    )
-        return results
-    
+    @traced("qdrant.search")
+    def search_vectors(self, collection_name: str, query_vector: list, top_k: int, query_filter: Optional[Filter] = None):
+        """
+        Dense search; query_filter (payload filter) được Qdrant áp dụng trong lúc duyệt HNSW,
+        không phải lọc lại top-k ở phía Python.
+        """
+        _SEARCH_CALLS.inc()
+        response = self.client.query_points(
+            collection_name=collection_name,
+            query=query_vector,
+            query_filter=query_filter,
+            limit=top_k,
+            search_params=SearchParams(
+                hnsw_ef=128,   # tăng độ chính xác (default thường 16-64)
+                exact=False    # nếu True => brute-force, chính xác tuyệt đối nhưng chậm
+            ),
+            with_payload=True,
+        )
+        return response.points
+
+    @traced("qdrant.hybrid_search")
+    def hybrid_search(
+        self,
+        collection_name: str,
+        dense_vector: list,
+        sparse_vector: SparseVector,
+        top_k: int,
+        query_filter: Optional[Filter] = None,
+        prefetch_limit: int = 50,
+        dense_name: str = "dense",
+        sparse_name: str = "keywords",
+    ):
+        """
+        Hybrid search trong một round-trip: nhánh dense và nhánh keyword chạy song song
+        trên server (cùng filter), kết quả được trộn bằng Reciprocal Rank Fusion.
+        """
+        _HYBRID_SEARCH_CALLS.inc()
+        response = self.client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                Prefetch(
+                    query=dense_vector,
+                    using=dense_name,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                    params=SearchParams(hnsw_ef=128, exact=False),
+                ),
+                Prefetch(
+                    query=sparse_vector,
+                    using=sparse_name,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=top_k,
+            with_payload=True,
+        )
+        return response.points
+
     def delete_collection(self, collection_name: str):
         self.client.delete_collection(collection_name=collection_name)
         print(f"✅ Deleted collection '{collection_name}'")
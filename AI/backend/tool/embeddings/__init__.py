@@ -1,10 +1,12 @@
 from .sentenceTransformer import SentenceTransformerEmbedding
 from .base import BaseEmbedding, EmbeddingConfig
 from .company import sync_company_embeddings
+from .job import sync_job_embeddings
 
 __all__ = [
 	"SentenceTransformerEmbedding",
 	"BaseEmbedding",
 	"EmbeddingConfig",
 	"sync_company_embeddings",
+	"sync_job_embeddings",
 ]
\ No newline at end of file
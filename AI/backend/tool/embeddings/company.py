@@ -9,6 +9,8 @@ from qdrant_client.models import Distance, PointStruct, VectorParams
 
 from setting import Settings
 from tool.database import PostgreSQLClient, QDrant
+from tool.question_enhancer import QuestionEnhancer
+from tool.retrieval.filters import COMPANY_PAYLOAD_INDEXES, company_keys, ensure_payload_indexes
 
 from .base import EmbeddingConfig
 from .sentenceTransformer import SentenceTransformerEmbedding
@@ -119,6 +121,7 @@ def sync_company_embeddings(
     collection_name: Optional[str] = None,
     batch_size: int = 64,
     limit: Optional[int] = None,
+    records: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """Fetch company data from PostgreSQL and upsert embeddings into Qdrant.
 
@@ -127,6 +130,7 @@ def sync_company_embeddings(
         collection_name: Override for the Qdrant collection name.
         batch_size: Number of vectors to upsert per request.
         limit: Maximum number of companies to fetch from the procedure.
+        records: Pre-fetched company rows; skips the PostgreSQL procedure (benchmark fixtures).
 
     Returns:
         A dictionary summarising the sync results.
@@ -136,8 +140,11 @@ def sync_company_embeddings(
     collection = collection_name or getattr(settings, "COLLECTION_COMPANY", "companies")
     procedure_name = "get_company_infor"
 
-    pg_client = PostgreSQLClient(Settings=settings)
-    companies = pg_client.get_data_from_procedures(procedure_name, limit=limit or 1000)
+    if records is not None:
+        companies = records
+    else:
+        pg_client = PostgreSQLClient(Settings=settings)
+        companies = pg_client.get_data_from_procedures(procedure_name, limit=limit or 1000)
 
     if not companies:
         logger.info("No company records returned from procedure '%s'", procedure_name)
@@ -171,6 +178,8 @@ def sync_company_embeddings(
     qdrant = QDrant(Settings=settings)
     qdrant_client = qdrant.get_client()
     _ensure_collection(qdrant_client, collection, vector_size)
+    ensure_payload_indexes(qdrant_client, collection, COMPANY_PAYLOAD_INDEXES)
+    enhancer = QuestionEnhancer()
 
     points: List[PointStruct] = []
     skipped: List[int] = []
@@ -201,6 +210,8 @@ def sync_company_embeddings(
             "description": record.get("description"),
             "addresses": record.get("addresses"),
             "industries": record.get("industries"),
+            "locations": enhancer.extract_locations(record.get("addresses") or ""),
+            "company_keys": company_keys(record.get("name")),
         }
 
         point_id = company_id
@@ -0,0 +1,299 @@
+"""Utilities for syncing job posting embeddings into Qdrant."""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from qdrant_client.models import (
+    Distance,
+    Modifier,
+    PointIdsList,
+    PointStruct,
+    SparseVectorParams,
+    VectorParams,
+)
+
+from setting import Settings
+from tool.database import PostgreSQLClient, QDrant
+from tool.question_enhancer import QuestionEnhancer
+from tool.retrieval.filters import (
+    JOB_PAYLOAD_INDEXES,
+    company_keys,
+    ensure_payload_indexes,
+    parse_salary,
+    skill_keys,
+)
+from tool.retrieval.job_search import DENSE_VECTOR_NAME, SPARSE_VECTOR_NAME
+from tool.retrieval.sparse import encode_sparse
+
+from .company import _resolve_embedding_model
+
+logger = logging.getLogger(__name__)
+
+
+def _split_list(value: Any, separator: str = ",") -> List[str]:
+    """Split aggregated ``string_agg`` columns back into a clean list."""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(separator) if item.strip()]
+
+
+def _build_job_text(record: Dict[str, Any]) -> str:
+    """Build a single descriptive string used for embedding a job posting record."""
+    parts: List[str] = []
+
+    position = record.get("position_name")
+    if position:
+        parts.append(f"Position: {position}")
+
+    company = record.get("company_name")
+    if company:
+        parts.append(f"Company: {company}")
+
+    skills = record.get("skills")
+    if skills:
+        parts.append(f"Skills: {skills}")
+
+    industries = record.get("industries")
+    if industries:
+        parts.append(f"Industries: {industries}")
+
+    work_types = record.get("work_types")
+    if work_types:
+        parts.append(f"Work type: {work_types}")
+
+    addresses = record.get("addresses")
+    if addresses:
+        parts.append(f"Locations: {addresses}")
+
+    experience = record.get("experience_years")
+    if experience is not None:
+        parts.append(f"Experience: {experience} years")
+
+    description = record.get("job_description")
+    if description:
+        parts.append(f"Description: {description}")
+
+    requirements = record.get("requirements")
+    if requirements:
+        parts.append(f"Requirements: {requirements}")
+
+    return ". ".join(parts).strip()
+
+
+def _build_job_payload(record: Dict[str, Any], enhancer: QuestionEnhancer) -> Dict[str, Any]:
+    """Payload stored next to the vectors; structured fields are used by search filters."""
+    addresses = record.get("addresses") or ""
+    experience = record.get("experience_years")
+
+    return {
+        "job_posting_id": record.get("job_posting_id"),
+        "company_id": record.get("company_id"),
+        "company": record.get("company_name"),
+        "company_keys": company_keys(record.get("company_name")),
+        "position_name": record.get("position_name"),
+        "skills": _split_list(record.get("skills")),
+        "skill_keys": skill_keys(record.get("skills")),
+        "industries": _split_list(record.get("industries")),
+        "work_types": _split_list(record.get("work_types")),
+        "addresses": addresses,
+        "locations": enhancer.extract_locations(addresses),
+        "salary": parse_salary(record.get("salary")),
+        "experience_years": int(experience) if experience is not None else None,
+        "education_level": record.get("education_level"),
+        "working_time": record.get("working_time"),
+        "deadline": str(record["deadline"]) if record.get("deadline") else None,
+        "status": record.get("status"),
+        "description": record.get("job_description"),
+        "requirements": record.get("requirements"),
+        "benefits": record.get("benefits"),
+    }
+
+
+def _ensure_job_collection(client, collection_name: str, vector_size: int) -> None:
+    """Ensure the hybrid (named dense + sparse keyword) collection exists with the right size."""
+    try:
+        collection = client.get_collection(collection_name=collection_name)
+        vectors = collection.config.params.vectors
+        dense = vectors.get(DENSE_VECTOR_NAME) if isinstance(vectors, dict) else None
+        sparse = collection.config.params.sparse_vectors or {}
+
+        if dense is not None and dense.size == vector_size and SPARSE_VECTOR_NAME in sparse:
+            return
+
+        logger.info(
+            "Qdrant collection '%s' has an incompatible vector layout, recreating",
+            collection_name,
+        )
+        client.delete_collection(collection_name=collection_name)
+    except Exception:
+        logger.info("Qdrant collection '%s' missing. Creating...", collection_name)
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            DENSE_VECTOR_NAME: VectorParams(size=vector_size, distance=Distance.COSINE),
+        },
+        sparse_vectors_config={
+            SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF),
+        },
+    )
+    logger.info("Created Qdrant collection '%s' with vector size %s", collection_name, vector_size)
+
+
+def _delete_stale_points(client, collection_name: str, keep_ids: Set[int], batch_size: int = 256) -> int:
+    """Delete points whose job posting is no longer returned by the source (closed or deleted)."""
+    stale: List[Any] = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        stale.extend(point.id for point in points if point.id not in keep_ids)
+        if offset is None:
+            break
+
+    for start in range(0, len(stale), batch_size):
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=stale[start : start + batch_size]),
+        )
+    if stale:
+        logger.info("Deleted %s stale job embeddings from collection '%s'", len(stale), collection_name)
+    return len(stale)
+
+
+def sync_job_embeddings(
+    settings: Optional[Settings] = None,
+    *,
+    collection_name: Optional[str] = None,
+    batch_size: int = 64,
+    limit: Optional[int] = None,
+    records: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Fetch job postings from PostgreSQL and upsert dense + keyword vectors into Qdrant.
+
+    Points whose job posting is no longer in the source are deleted afterwards, so
+    closed or removed postings stop being searchable. Deletion is skipped when the
+    procedure returned exactly ``limit`` rows (the catalogue may be truncated) and
+    when it returned nothing at all (more likely a database problem than an empty
+    catalogue).
+
+    Args:
+        settings: Application settings instance. If omitted, settings will be loaded lazily.
+        collection_name: Override for the Qdrant collection name.
+        batch_size: Number of vectors to upsert per request.
+        limit: Maximum number of job postings to fetch from the procedure.
+        records: Pre-fetched job rows; skips the PostgreSQL procedure (benchmark fixtures).
+
+    Returns:
+        A dictionary summarising the sync results.
+    """
+
+    settings = settings or Settings.load_settings()
+    collection = collection_name or getattr(settings, "COLLECTION_JOB", "job_descriptions")
+    procedure_name = "get_job_posting_infor"
+
+    if records is not None:
+        jobs = records
+    else:
+        pg_client = PostgreSQLClient(Settings=settings)
+        jobs = pg_client.get_data_from_procedures(procedure_name, limit=limit or 1000)
+    complete = records is not None or len(jobs) < (limit or 1000)
+
+    if not jobs:
+        logger.info("No job records returned from procedure '%s'", procedure_name)
+        return {
+            "status": "empty",
+            "collection": collection,
+            "records": 0,
+            "upserted": 0,
+        }
+
+    embedding_model = _resolve_embedding_model(settings.TEXT_EMBEDDING_MODEL_ID)
+    enhancer = QuestionEnhancer()
+
+    points: List[PointStruct] = []
+    skipped: List[Any] = []
+    texts: List[str] = []
+    payloads: List[Dict[str, Any]] = []
+
+    for record in jobs:
+        job_id = record.get("job_posting_id")
+        text = _build_job_text(record)
+        if job_id is None or not text:
+            skipped.append(job_id)
+            continue
+        texts.append(text)
+        payloads.append(_build_job_payload(record, enhancer))
+
+    if not texts:
+        logger.warning("No valid job records to upsert into Qdrant")
+        return {
+            "status": "skipped",
+            "collection": collection,
+            "records": len(jobs),
+            "upserted": 0,
+            "skipped_ids": skipped,
+        }
+
+    # Encode the whole catalogue in one batched call instead of one forward pass per job
+    vectors = embedding_model.encode(texts)
+    if hasattr(vectors, "tolist"):
+        vectors = vectors.tolist()
+
+    vector_size = len(vectors[0])
+
+    qdrant = QDrant(Settings=settings)
+    qdrant_client = qdrant.get_client()
+    _ensure_job_collection(qdrant_client, collection, vector_size)
+    ensure_payload_indexes(qdrant_client, collection, JOB_PAYLOAD_INDEXES)
+
+    for text, payload, vector in zip(texts, payloads, vectors):
+        points.append(
+            PointStruct(
+                id=int(payload["job_posting_id"]),
+                vector={
+                    DENSE_VECTOR_NAME: list(vector),
+                    SPARSE_VECTOR_NAME: encode_sparse(text),
+                },
+                payload=payload,
+            )
+        )
+
+    total_upserted = 0
+    for start in range(0, len(points), batch_size):
+        batch = points[start : start + batch_size]
+        qdrant_client.upsert(collection_name=collection, points=batch)
+        total_upserted += len(batch)
+
+    logger.info("Upserted %s job embeddings into collection '%s'", total_upserted, collection)
+
+    deleted = 0
+    if complete:
+        deleted = _delete_stale_points(qdrant_client, collection, {point.id for point in points})
+    else:
+        logger.warning("Job source returned %s rows (the fetch limit), not deleting stale embeddings", len(jobs))
+
+    result: Dict[str, Any] = {
+        "status": "success",
+        "collection": collection,
+        "records": len(jobs),
+        "upserted": total_upserted,
+        "deleted": deleted,
+        "vector_dim": vector_size,
+    }
+
+    if skipped:
+        result["skipped_ids"] = skipped
+
+    return result
+
+
+__all__ = ["sync_job_embeddings"]
@@ -1,12 +1,29 @@
 from pydantic.v1 import BaseModel, Field, validator
 from .base import BaseEmbedding, EmbeddingConfig
 from sentence_transformers import SentenceTransformer
+from llms.singleflight import SingleFlight
+from monitoring.metrics import EMBEDDING_CALLS
+from monitoring.tracing import current_span, traced
 
 class SentenceTransformerEmbedding(BaseEmbedding):
+    # Cùng câu hỏi được embed đồng thời (nhiều user gửi cùng một câu chào) -> một forward pass
+    _single_flight = SingleFlight("embedding")
+
     def __init__(self, config: EmbeddingConfig):
         super().__init__(Settings=config)
         self.config = config
         self.embedding_model = SentenceTransformer(self.config.name, trust_remote_code=True)
 
-    def encode(self, text: str):
+    def _encode(self, text):
+        EMBEDDING_CALLS.inc()
         return self.embedding_model.encode(text)
+
+    @traced("embedding.encode")
+    def encode(self, text: str):
+        if not isinstance(text, str):
+            return self._encode(text)  # batch (sync dữ liệu): không gộp
+        # Vector trả về được chia sẻ giữa các caller, không sửa tại chỗ
+        vector, shared = self._single_flight.do((self.config.name, text), lambda: self._encode(text))
+        if shared:
+            current_span().set_attribute("coalesced", True)
+        return vector
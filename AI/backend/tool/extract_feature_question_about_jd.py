@@ -2,46 +2,118 @@
 import os
 import json
 import re
+from typing import Any, Dict, List, Optional
 
 
-from llms.ollama_llms import OllamaLLMs
+from llms.concurrency import OllamaOverloadedError
+from llms.llm_manager import llm_manager
 from prompt.promt_config import PromptConfig
 from setting import Settings
+from monitoring.metrics import FEATURE_EXTRACTIONS
+from monitoring.tracing import current_span, traced
+from tool.slot_extractor import RuleBasedFeatureExtractor, load_skill_names
 
 
 class ExtractFeatureQuestion:
-    def __init__(self, model_name: str = "", validate_response: list = ["title", "skills", "company", "location", "experience", "description"]):
+    def __init__(self, model_name: str = "", validate_response: list = ["title", "skills", "company", "location", "experience", "salary", "description"]):
         self.valid_fields = validate_response
 
         settings = Settings.load_settings()
         default_url = "http://host.docker.internal:11434" if os.getenv("DOCKER_ENV") == "true" else "http://localhost:11434"
         ollama_url = os.getenv("OLLAMA_URL", settings.OLLAMA_BASE_URL or default_url)
-        resolved_model = model_name or settings.OLLAMA_MODEL
+        resolved_model = model_name or llm_manager.model_for_tier("extraction", settings)
 
-        self.llm = OllamaLLMs(base_url=ollama_url, model_name=resolved_model)
+        # Dùng chung client (hoặc Ollama pool) với chatbot
+        self.llm = llm_manager.get_ollama_client(base_url=ollama_url, model_name=resolved_model)
 
+        # Rule-based fast path: chỉ gọi LLM khi câu còn từ chưa được giải thích
+        self.rule_extractor = RuleBasedFeatureExtractor(load_skill_names(settings)) if settings.ENABLE_RULE_EXTRACTION else None
+        self.min_rule_confidence = settings.RULE_EXTRACTION_MIN_CONFIDENCE
 
+        # EXTRACTION_NUM_PREDICT/EXTRACTION_TEMPERATURE (nếu đặt) ghi đè generation profile của prompt
+        self.generation_options = {
+            name: value
+            for name, value in (("num_predict", settings.EXTRACTION_NUM_PREDICT), ("temperature", settings.EXTRACTION_TEMPERATURE))
+            if value is not None
+        }
+
+
+    def rule_features(self, message: str) -> dict:
+        """
+        Trường trích xuất bằng rule (đã validate), chỉ khi rule giải thích được toàn bộ câu.
+
+        Trả về {} khi rule-based extraction tắt hoặc câu còn từ rule không hiểu,
+        tức là khi ``extract`` sẽ phải gọi LLM.
+        """
+        if self.rule_extractor is None:
+            return {}
+        result = self.rule_extractor.extract(message)
+        if not result.fully_resolved or result.confidence < self.min_rule_confidence:
+            return {}
+        return self._validate_query_fields(result.fields)
+
+    @traced("extract_features")
     def extract(self, query: str, prompt_type: str) -> str:
         try:
-            response = self._call_llm(query, prompt_type)
-            cleaned_response = self._clear_llm_response(response)
-            response_dict = json.loads(cleaned_response)
-            validated_dict = self._validate_query_fields(response_dict)
+            rule_fields = {}
+            if self.rule_extractor is not None:
+                rule_result = self.rule_extractor.extract(query)
+                # Trường bị phủ định / so sánh ("không ở Hà Nội") không được ép lên kết quả LLM
+                rule_fields = {
+                    name: value for name, value in self._validate_query_fields(rule_result.fields).items()
+                    if name not in rule_result.qualified
+                }
+                current_span().set_attribute("rule_confidence", rule_result.confidence)
+                if rule_fields and not rule_result.qualified and rule_result.confidence >= self.min_rule_confidence:
+                    FEATURE_EXTRACTIONS.labels("rules").inc()
+                    print(f"📝 User input: {query}")
+                    print(f"⚡ Extracted query (rules, confidence={rule_result.confidence}): {rule_fields}")
+                    return rule_fields
+
+            # LLM chỉ được phép trả về các trường rule-based chưa giải quyết được
+            fields = [name for name in self.valid_fields if name not in rule_fields]
+            response = self._call_llm(query, prompt_type, fields=fields)
+            validated_dict = self._validate_query_fields(self._parse_response(response))
+            validated_dict.update(rule_fields)
+            FEATURE_EXTRACTIONS.labels("rules+llm" if rule_fields else "llm").inc()
             print(f"📝 User input: {query}")
             print(f"🔍 Extracted query: {validated_dict}")
             return validated_dict
+        except OllamaOverloadedError:
+            raise
         except Exception as e:
             print(f"Error extracting features: {e}")
             return {}
 
-    def _call_llm(self, query: str, prompt_type: str) -> str:
-        promptConfig = PromptConfig()
-        prompt = promptConfig.get_prompt(prompt_name=prompt_type, user_input=query)
-        messages = [
-            {"role": "user", "content": prompt}
-        ]
-        response = self.llm.chat(messages)
+    def output_schema(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        JSON schema truyền vào ``format`` của Ollama: object chỉ gồm các trường cho phép, kiểu string.
+        """
+        fields = self.valid_fields if fields is None else fields
+        return {
+            "type": "object",
+            "properties": {name: {"type": "string"} for name in fields},
+            "additionalProperties": False,
+        }
+
+    def _call_llm(self, query: str, prompt_type: str, fields: Optional[List[str]] = None) -> str:
+        # System message = instructions + ví dụ (prefix cố định, Ollama giữ trong KV cache), user = câu hỏi
+        messages = PromptConfig().get_messages(prompt_type, user_input=query)
+        # Structured output: Ollama ràng buộc decoding theo JSON schema, output luôn parse được.
+        # num_predict/temperature lấy từ generation profile của prompt (PromptConfig), trừ khi settings ghi đè
+        options = {"options": self.generation_options} if self.generation_options else {}
+        response = self.llm.chat(messages, stage=prompt_type, format=self.output_schema(fields), **options)
         return response
+
+    def _parse_response(self, response: str) -> dict:
+        """
+        Parse output của structured decoding; chỉ dùng _clear_llm_response khi server bỏ qua ``format``.
+        """
+        try:
+            parsed = json.loads(response)
+        except json.JSONDecodeError:
+            parsed = json.loads(self._clear_llm_response(response))
+        return parsed if isinstance(parsed, dict) else {}
     
     def _clear_llm_response(self, response: str) -> str:
         """
@@ -0,0 +1,112 @@
+"""
+Aho–Corasick automaton để tìm nhiều từ khóa trong một lần duyệt câu hỏi.
+
+Mỗi từ khóa mang theo một payload (vd: ``(InfoType.LOCATION, "tp.hcm")``).
+``find`` chạy tuyến tính theo độ dài text (cộng số kết quả) và chỉ nhận các
+match nằm trọn trong ranh giới từ, nên "hp" không khớp bên trong "php" và
+"ca" không khớp bên trong "cao".
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    start: int
+    end: int  # exclusive
+    keyword: str
+    payload: Any
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordAutomaton:
+    """Multi-pattern matcher (Aho–Corasick) với kiểm tra ranh giới từ."""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        self._keywords: List[Tuple[str, Any]] = []
+        self._built = False
+        for keyword, payload in keywords:
+            self.add(keyword, payload)
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def add(self, keyword: str, payload: Any) -> None:
+        keyword = keyword.lower()
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append(len(self._keywords))
+        self._keywords.append((keyword, payload))
+        self._built = False
+
+    def build(self) -> "KeywordAutomaton":
+        """Tính failure links (BFS) và gộp output theo chuỗi suffix."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+        self._built = True
+        return self
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """Trả về mọi từ khóa (đúng ranh giới từ) xuất hiện trong text, theo vị trí kết thúc."""
+        if not self._built:
+            self.build()
+
+        text = text.lower()
+        goto, fail, outputs, keywords = self._goto, self._fail, self._outputs, self._keywords
+        length = len(text)
+        matches: List[KeywordMatch] = []
+        node = 0
+
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not outputs[node]:
+                continue
+
+            end = index + 1
+            if end < length and _is_word_char(text[end]) and _is_word_char(char):
+                continue
+            for keyword_index in outputs[node]:
+                keyword, payload = keywords[keyword_index]
+                start = end - len(keyword)
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(keyword[0]):
+                    continue
+                matches.append(KeywordMatch(start, end, keyword, payload))
+
+        return matches
+
+
+__all__ = ["KeywordAutomaton", "KeywordMatch"]
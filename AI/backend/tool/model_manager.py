@@ -8,6 +8,7 @@ from tool.embeddings import SentenceTransformerEmbedding, EmbeddingConfig
 from tool.semantic_router import SemanticRouter, Route
 from tool.semantic_router.sample import Sample
 from setting import Settings
+from monitoring.metrics import record_cache_lookup
 
 class ModelManager:
     """Singleton class để quản lý và cache các models"""
@@ -41,6 +42,7 @@ class ModelManager:
             model_name = "dangvantuan/vietnamese-document-embedding"
             
         cache_key = f"embedding_{model_name}"
+        record_cache_lookup("models", cache_key in self.models_cache)
         
         if cache_key not in self.models_cache:
             print(f"🚀 Loading embedding model: {model_name}")
@@ -58,6 +60,7 @@ class ModelManager:
         Lấy semantic router từ cache hoặc tạo mới nếu chưa có
         """
         cache_key = "semantic_router"
+        record_cache_lookup("models", cache_key in self.models_cache)
         
         if cache_key not in self.models_cache:
             print("🚀 Creating semantic router...")
@@ -72,8 +75,8 @@ class ModelManager:
                 Route(name="chitchat", samples=Sample.chitchatSample)
             ]
             
-            # Tạo semantic router
-            semantic_router = SemanticRouter(embedding=embedding_tool, routes=routes)
+            # Tạo semantic router (ma trận route mmap từ SHARED_ARTIFACT_DIR khi MMAP_ARTIFACTS bật)
+            semantic_router = SemanticRouter(embedding=embedding_tool, routes=routes, store=self.get_array_store())
             self.models_cache[cache_key] = semantic_router
             print("✅ Semantic router cached")
         else:
@@ -81,6 +84,101 @@ class ModelManager:
             
         return self.models_cache[cache_key]
     
+    def get_array_store(self):
+        """
+        SharedArrayStore cho các mảng NumPy chỉ đọc (None nếu MMAP_ARTIFACTS tắt)
+        """
+        if not self.settings.MMAP_ARTIFACTS:
+            return None
+        if "array_store" not in self.models_cache:
+            from tool.shared_arrays import SharedArrayStore
+
+            self.models_cache["array_store"] = SharedArrayStore(self.settings.SHARED_ARTIFACT_DIR or None)
+        return self.models_cache["array_store"]
+
+    def get_job_searcher(self):
+        """
+        Lấy JobSearcher từ cache (giữ embedding model và kết nối Qdrant giữa các request)
+        """
+        cache_key = "job_searcher"
+
+        if cache_key not in self.models_cache:
+            from tool.retrieval import JobSearcher
+
+            print("🚀 Creating job searcher...")
+            self.models_cache[cache_key] = JobSearcher(
+                settings=self.settings,
+                embedding_model=self.get_embedding_model(self.settings.TEXT_EMBEDDING_MODEL_ID),
+            )
+            print("✅ Job searcher cached")
+
+        return self.models_cache[cache_key]
+
+    def get_speculative_retriever(self):
+        """
+        Lấy SpeculativeRetriever dùng chung (None nếu ENABLE_SPECULATIVE_RETRIEVAL tắt)
+        """
+        if not self.settings.ENABLE_SPECULATIVE_RETRIEVAL:
+            return None
+
+        cache_key = "speculative_retriever"
+
+        if cache_key not in self.models_cache:
+            from tool.retrieval import SpeculativeRetriever
+
+            self.models_cache[cache_key] = SpeculativeRetriever(
+                self.get_embedding_model(self.settings.TEXT_EMBEDDING_MODEL_ID),
+                threshold=self.settings.SPECULATIVE_SIMILARITY_THRESHOLD,
+                max_workers=self.settings.SPECULATIVE_WORKERS,
+            )
+            print("✅ Speculative retriever cached")
+
+        return self.models_cache[cache_key]
+
+    def get_reflection_gate(self):
+        """
+        Lấy ReflectionGate dùng chung (None nếu ENABLE_REFLECTION_GATE tắt)
+        """
+        if not self.settings.ENABLE_REFLECTION_GATE:
+            return None
+
+        cache_key = "reflection_gate"
+
+        if cache_key not in self.models_cache:
+            from tool.reflection import ReflectionGate
+
+            self.models_cache[cache_key] = ReflectionGate()
+            print("✅ Reflection gate cached")
+
+        return self.models_cache[cache_key]
+
+    def get_reranker(self):
+        """
+        Lấy cross-encoder reranker từ cache (None nếu ENABLE_RERANKING tắt)
+        """
+        if not self.settings.ENABLE_RERANKING:
+            return None
+
+        cache_key = f"reranker_{self.settings.RERANKING_CROSS_ENCODER_MODEL_ID}"
+
+        if cache_key not in self.models_cache:
+            from sentence_transformers import CrossEncoder
+            from tool.retrieval import CrossEncoderReranker
+
+            print(f"🚀 Loading cross-encoder: {self.settings.RERANKING_CROSS_ENCODER_MODEL_ID}")
+            model = CrossEncoder(
+                self.settings.RERANKING_CROSS_ENCODER_MODEL_ID,
+                device=self.settings.RAG_MODEL_DEVICE,
+            )
+            self.models_cache[cache_key] = CrossEncoderReranker(
+                model,
+                latency_budget_ms=self.settings.RERANK_LATENCY_BUDGET_MS,
+                cache_size=self.settings.RERANK_CACHE_SIZE,
+            )
+            print("✅ Cross-encoder reranker cached")
+
+        return self.models_cache[cache_key]
+
     def get_llm_model(self, model_name: str = None):
         """
         Lấy LLM model từ cache (có thể extend cho Ollama, etc.)
@@ -92,10 +190,9 @@ class ModelManager:
         
         if cache_key not in self.models_cache:
             print(f"🚀 Loading LLM model: {model_name}")
-            # TODO: Implement LLM loading logic
-            # Ví dụ cho Ollama client
-            from llms.ollama_llms import OllamaLLMs
-            llm_model = OllamaLLMs(base_url=self.settings.OLLAMA_BASE_URL, model_name=model_name)
+            # Qua llm_manager để dùng chung client / Ollama pool (OLLAMA_BACKENDS)
+            from llms.llm_manager import llm_manager
+            llm_model = llm_manager.get_ollama_client(base_url=self.settings.OLLAMA_BASE_URL, model_name=model_name)
             self.models_cache[cache_key] = llm_model
             print(f"✅ LLM model cached: {model_name}")
         else:
@@ -114,6 +211,9 @@ class ModelManager:
         
         # Preload semantic router
         self.get_semantic_router()
+
+        # Preload cross-encoder (chỉ khi bật reranking)
+        self.get_reranker()
         
         # Preload LLM model (optional)
         # self.get_llm_model()
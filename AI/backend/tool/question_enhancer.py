@@ -7,6 +7,9 @@ import re
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
+from tool.keyword_automaton import KeywordAutomaton
+from tool.text_normalizer import fold_diacritics, normalize_and_fold, normalize_text
+
 class InfoType(Enum):
     """Các loại thông tin cần thu thập."""
     JOB_POSITION = "job_position"  # Vị trí công việc
@@ -17,9 +20,17 @@ class InfoType(Enum):
 
 class QuestionEnhancer:
     """Tool để hỏi thêm thông tin cho câu hỏi recruitment incomplete."""
+
+    # Bảng từ khóa đã chuẩn hóa và automaton dùng chung giữa các instance có cùng bảng
+    # từ khóa (build một lần cho cả process thay vì mỗi lần khởi tạo QuestionEnhancer)
+    _table_cache: Dict[Tuple, Tuple] = {}
+    _automaton_cache: Dict[Tuple, KeywordAutomaton] = {}
     
     def __init__(self):
-        # Từ khóa để nhận diện thông tin đã có trong câu hỏi
+        self._automaton: Optional[KeywordAutomaton] = None
+
+        # Từ khóa để nhận diện thông tin đã có trong câu hỏi.
+        # Chỉ cần ghi dạng có dấu: bản gõ không dấu ("ha noi", "ke toan") được khớp tự động
         self.job_keywords = {
     'lập trình': [
         'lập trình', 'developer', 'dev', 'programmer', 'coder',
@@ -74,15 +85,15 @@ class QuestionEnhancer:
         
         self.location_keywords = {
     'hà nội': ['hà nội', 'hn', 'hanoi'],
-    'tp.hcm': ['tp.hcm', 'hcm', 'sài gòn', 'saigon', 'ho chi minh', 'hochiminh'],
-    'đà nẵng': ['đà nẵng', 'da nang', 'danang'],
-    'hải phòng': ['hải phòng', 'hai phong', 'hp'],
-    'cần thơ': ['cần thơ', 'can tho'],
-    'bình dương': ['bình dương', 'binh duong'],
-    'đồng nai': ['đồng nai', 'dong nai'],
-    'nha trang': ['nha trang', 'khanh hoa'],
-    'quảng ninh': ['quảng ninh', 'quang ninh'],
-    'huế': ['huế', 'hue', 'thừa thiên huế'],
+    'tp.hcm': ['tp.hcm', 'hcm', 'hồ chí minh', 'sài gòn', 'saigon', 'hochiminh'],
+    'đà nẵng': ['đà nẵng', 'danang'],
+    'hải phòng': ['hải phòng', 'hp'],
+    'cần thơ': ['cần thơ'],
+    'bình dương': ['bình dương'],
+    'đồng nai': ['đồng nai'],
+    'nha trang': ['nha trang', 'khánh hòa'],
+    'quảng ninh': ['quảng ninh'],
+    'huế': ['huế', 'thừa thiên huế'],
     'remote': ['remote', 'từ xa', 'online', 'ở nhà', 'làm tại nhà', 'work from home', 'wfh']
 }
 
@@ -94,14 +105,14 @@ class QuestionEnhancer:
 ]
 
         self.salary_keywords = [
-    'lương', 'salary', 'mức lương', 'thu nhập', 'trả', 'offer',
+    'lương', 'salary', 'mức lương', 'thu nhập', 'trả lương', 'offer',
     'bao nhiêu', 'triệu', 'ngàn', 'usd', 'vnd', 'gross', 'net',
     'mức đãi ngộ', 'range', 'khoảng', 'tối thiểu', 'tối đa'
 ]
 
         self.work_type_keywords = [
-    'full-time', 'full time', 'toàn thời gian',
-    'part-time', 'part time', 'bán thời gian',
+    'full-time', 'toàn thời gian',
+    'part-time', 'bán thời gian',
     'ca', 'ca sáng', 'ca tối', 'shift',
     'intern', 'thực tập', 'hợp đồng', 'contract',
     'remote', 'onsite', 'hybrid', 'tại văn phòng', 'làm từ xa'
@@ -137,6 +148,117 @@ class QuestionEnhancer:
             ]
         }
 
+    def _raw_tables(self) -> Tuple:
+        """Ảnh chụp (bất biến) của các bảng từ khóa, dùng làm key cache."""
+        return (
+            tuple((canonical, tuple(keywords)) for canonical, keywords in self.job_keywords.items()),
+            tuple((canonical, tuple(keywords)) for canonical, keywords in self.location_keywords.items()),
+            tuple(self.experience_keywords),
+            tuple(self.salary_keywords),
+            tuple(self.work_type_keywords),
+        )
+
+    def _keyword_table(self) -> Tuple:
+        """
+        Bảng (từ khóa không dấu, (loại thông tin, giá trị chuẩn hóa, từ khóa có dấu)).
+
+        Từ khóa được chuẩn hóa như câu hỏi (lowercase, bỏ dấu câu) rồi bỏ dấu để
+        automaton khớp được cả bản gõ có dấu lẫn không dấu. Kết quả cache theo nội
+        dung bảng nên chỉ chuẩn hóa một lần cho mọi instance dùng bảng mặc định.
+        """
+        raw = self._raw_tables()
+        table = self._table_cache.get(raw)
+        if table is None:
+            table = self._build_keyword_table()
+            self.__class__._table_cache[raw] = table
+        return table
+
+    def _build_keyword_table(self) -> Tuple:
+        entries = []
+        for canonical, keywords in self.job_keywords.items():
+            entries.extend((keyword, InfoType.JOB_POSITION, canonical) for keyword in keywords)
+        for canonical, keywords in self.location_keywords.items():
+            entries.extend((keyword, InfoType.LOCATION, canonical) for keyword in keywords)
+        for info_type, keywords in (
+            (InfoType.EXPERIENCE, self.experience_keywords),
+            (InfoType.SALARY, self.salary_keywords),
+            (InfoType.WORK_TYPE, self.work_type_keywords),
+        ):
+            entries.extend((keyword, info_type, keyword) for keyword in keywords)
+
+        table = {}
+        for keyword, info_type, canonical in entries:
+            normalized = normalize_text(keyword)
+            payload = (info_type, canonical, normalized)
+            table.setdefault((fold_diacritics(normalized), payload), None)
+        return tuple(table)
+
+    @property
+    def keyword_automaton(self) -> KeywordAutomaton:
+        """
+        Automaton Aho–Corasick của tất cả bảng từ khóa.
+
+        Build lazily ở lần dùng đầu tiên và cache theo nội dung bảng, nên các instance
+        dùng bảng mặc định chia sẻ một automaton. Sửa bảng từ khóa sau lần gọi đầu
+        thì cần đặt lại ``self._automaton = None``.
+        """
+        if self._automaton is None:
+            table = self._keyword_table()
+            automaton = self._automaton_cache.get(table)
+            if automaton is None:
+                automaton = KeywordAutomaton(table).build()
+                self.__class__._automaton_cache[table] = automaton
+            self._automaton = automaton
+        return self._automaton
+
+    @staticmethod
+    def _typed_like(segment: str, folded: str, keyword: str) -> bool:
+        """
+        Đoạn text khớp từ khóa khi mỗi ký tự hoặc đúng dấu, hoặc không dấu.
+
+        "ha noi", "hà nội", "ha nội" đều khớp "hà nội"; nhưng "cả" không khớp "ca"
+        và "trà" không khớp "trả" (gõ sai dấu khác với gõ không dấu).
+        """
+        if segment == folded or segment == keyword:
+            return True
+        return all(char == expected or char == plain for char, expected, plain in zip(segment, keyword, folded))
+
+    def find_keywords(self, text: str) -> List[Tuple[int, int, InfoType, str]]:
+        """
+        Các từ khóa xuất hiện trong text dưới dạng (start, end, loại thông tin, giá trị chuẩn hóa).
+
+        Vị trí tính trên ``normalize_text(text)`` (lowercase, bỏ dấu câu, gộp khoảng trắng).
+        """
+        normalized, folded = normalize_and_fold(text or "")
+        found = []
+        for match in self.keyword_automaton.find(folded):
+            info_type, canonical, keyword = match.payload
+            segment = normalized[match.start:match.end]
+            # Đa số câu hỏi gõ không dấu hoặc đúng dấu: so sánh chuỗi trước khi xét từng ký tự
+            if segment == match.keyword or segment == keyword or self._typed_like(segment, match.keyword, keyword):
+                found.append((match.start, match.end, info_type, canonical))
+        return found
+
+    def extract_slots(self, text: str) -> Dict[InfoType, List[str]]:
+        """
+        Một lần duyệt text, trả về các giá trị chuẩn hóa theo từng loại thông tin.
+
+        Ví dụ: "dev ở sài gòn, lương 20 triệu" hoặc "dev o sai gon, luong 20 trieu" ->
+            {JOB_POSITION: ["lập trình"], LOCATION: ["tp.hcm"], SALARY: ["lương", "triệu"]}
+
+        Args:
+            text: Câu hỏi của người dùng
+
+        Returns:
+            Dict[InfoType, List[str]]: Giá trị chuẩn hóa theo thứ tự xuất hiện (không trùng lặp)
+        """
+        slots: Dict[InfoType, List[str]] = {}
+        for _, _, info_type, canonical in self.find_keywords(text):
+            values = slots.setdefault(info_type, [])
+            if canonical not in values:
+                values.append(canonical)
+        return slots
+
     def analyze_incomplete_question(self, question: str) -> Dict[InfoType, bool]:
         """
         Phân tích câu hỏi incomplete để xác định thông tin nào đã có, thông tin nào thiếu.
@@ -147,36 +269,20 @@ class QuestionEnhancer:
         Returns:
             Dict[InfoType, bool]: True nếu thông tin đã có, False nếu thiếu
         """
-        question_lower = question.lower()
-        info_status = {}
-        
-        # Kiểm tra vị trí công việc
-        has_job_position = any(
-            any(keyword in question_lower for keyword in keywords)
-            for keywords in self.job_keywords.values()
-        )
-        info_status[InfoType.JOB_POSITION] = has_job_position
-        
-        # Kiểm tra địa điểm
-        has_location = any(
-            any(keyword in question_lower for keyword in keywords)
-            for keywords in self.location_keywords.values()
-        )
-        info_status[InfoType.LOCATION] = has_location
-        
-        # Kiểm tra kinh nghiệm
-        has_experience = any(keyword in question_lower for keyword in self.experience_keywords)
-        info_status[InfoType.EXPERIENCE] = has_experience
-        
-        # Kiểm tra lương
-        has_salary = any(keyword in question_lower for keyword in self.salary_keywords)
-        info_status[InfoType.SALARY] = has_salary
-        
-        # Kiểm tra hình thức làm việc
-        has_work_type = any(keyword in question_lower for keyword in self.work_type_keywords)
-        info_status[InfoType.WORK_TYPE] = has_work_type
-        
-        return info_status
+        slots = self.extract_slots(question)
+        return {info_type: bool(slots.get(info_type)) for info_type in InfoType}
+
+    def extract_locations(self, text: str) -> List[str]:
+        """
+        Trả về danh sách địa điểm chuẩn hóa (key của location_keywords) xuất hiện trong text.
+
+        Args:
+            text: Câu hỏi hoặc địa chỉ cần phân tích
+
+        Returns:
+            List[str]: Các địa điểm chuẩn hóa, ví dụ ["hà nội", "tp.hcm"]
+        """
+        return self.extract_slots(text).get(InfoType.LOCATION, [])
 
     def get_priority_missing_info(self, info_status: Dict[InfoType, bool]) -> List[InfoType]:
         """
@@ -1,3 +1,4 @@
 from .core import Reflection
+from .gate import GateDecision, ReflectionGate
 
-__all__ = ["Reflection"]
\ No newline at end of file
+__all__ = ["Reflection", "GateDecision", "ReflectionGate"]
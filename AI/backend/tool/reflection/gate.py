@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Reflection gate: chỉ gọi LLM viết lại câu hỏi khi câu đó thật sự cần lịch sử.
+
+Gate bỏ qua reflection (dùng nguyên câu của người dùng) khi:
+
+* ``first_turn``: chưa có lượt user nào trước câu hiện tại, không có gì để gộp vào;
+* ``self_contained``: câu hiện tại tự đủ nghĩa theo bảng từ khóa của
+  ``QuestionEnhancer``: có vị trí công việc và ít nhất ``min_slots - 1`` thông tin
+  khác (địa điểm, kinh nghiệm, lương, hình thức), không có từ chỉ trỏ / tỉnh lược
+  ("đó", "này", "thì sao", ...) và không phải câu trả lời cho câu hỏi lại của
+  assistant ở lượt trước.
+
+Các trường hợp còn lại vẫn chạy reflection (``follow_up``, ``reference``,
+``incomplete``). Thời gian tiết kiệm được ước lượng bằng EWMA latency của các
+lần reflection thực sự chạy trong process (0 khi chưa có lần nào).
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from monitoring.metrics import REFLECTION_GATE, REFLECTION_SECONDS_SAVED
+from tool.question_enhancer import InfoType, QuestionEnhancer
+from tool.text_normalizer import fold_diacritics, normalize_text
+
+# Từ chỉ trỏ / tỉnh lược: câu chứa chúng thường chỉ hiểu được khi xem lịch sử
+_REFERENCE_WORDS = frozenset(("đó", "đấy", "này", "ấy", "kia", "nó", "họ", "vậy", "thế", "nữa", "khác", "thêm"))
+# Cụm dạng không dấu: bắt cả khi người dùng gõ không dấu
+_REFERENCE_PHRASES = ("thi sao", "o day", "o do", "cai nay", "cai do", "nhu tren", "nhu vay", "tuong tu", "cong ty nay")
+_EWMA_ALPHA = 0.2
+
+
+@dataclass(frozen=True)
+class GateDecision:
+    skip: bool
+    reason: str
+
+
+def _content(entry: Dict) -> str:
+    if entry.get("parts"):
+        return " ".join(part["text"] for part in entry["parts"])
+    return entry.get("content") or ""
+
+
+class ReflectionGate:
+    def __init__(self, enhancer: Optional[QuestionEnhancer] = None, min_slots: int = 2):
+        self.enhancer = enhancer or QuestionEnhancer()
+        self.min_slots = min_slots
+        self._latency_ewma: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def has_reference(self, message: str) -> bool:
+        normalized = normalize_text(message)
+        if _REFERENCE_WORDS.intersection(normalized.split()):
+            return True
+        folded = f" {fold_diacritics(normalized)} "
+        return any(f" {phrase} " in folded for phrase in _REFERENCE_PHRASES)
+
+    def decide(self, history: Sequence[Dict]) -> GateDecision:
+        """Quyết định cho câu cuối của ``history`` (câu user hiện tại nằm cuối)."""
+        if not history:
+            return GateDecision(True, "first_turn")
+        previous = history[:-1]
+        if not any(entry.get("role") == "user" for entry in previous):
+            return GateDecision(True, "first_turn")
+
+        last_assistant = next((_content(e) for e in reversed(previous) if e.get("role") == "assistant"), "")
+        if last_assistant.rstrip().endswith("?"):
+            return GateDecision(False, "follow_up")  # người dùng đang trả lời câu hỏi lại của bot
+
+        message = _content(history[-1])
+        if self.has_reference(message):
+            return GateDecision(False, "reference")
+
+        slots = self.enhancer.extract_slots(message)
+        if InfoType.JOB_POSITION in slots and len(slots) >= self.min_slots:
+            return GateDecision(True, "self_contained")
+        return GateDecision(False, "incomplete")
+
+    def rewrite(self, history: List[Dict], reflect: Callable[[List[Dict]], str]) -> Tuple[str, GateDecision]:
+        """Trả về (câu dùng cho các bước sau, quyết định); chỉ gọi ``reflect`` khi gate không bỏ qua."""
+        decision = self.decide(history)
+        REFLECTION_GATE.labels("skip" if decision.skip else "run", decision.reason).inc()
+        if decision.skip:
+            REFLECTION_SECONDS_SAVED.inc(self._latency_ewma or 0.0)
+            return (_content(history[-1]) if history else ""), decision
+
+        started_at = time.perf_counter()
+        rewritten = reflect(history)
+        seconds = time.perf_counter() - started_at
+        with self._lock:
+            self._latency_ewma = seconds if self._latency_ewma is None else (
+                self._latency_ewma + _EWMA_ALPHA * (seconds - self._latency_ewma)
+            )
+        return rewritten, decision
+
+    def status(self) -> Dict[str, object]:
+        decisions = {"/".join(labels): int(value) for labels, value in REFLECTION_GATE.values().items()}
+        return {
+            "decisions": decisions,
+            "rewrite_latency_ewma_s": round(self._latency_ewma or 0.0, 3),
+            "seconds_saved": round(REFLECTION_SECONDS_SAVED.get(), 3),
+        }
+
+
+__all__ = ["GateDecision", "ReflectionGate"]
@@ -0,0 +1,19 @@
+from .context import COMPANY_FIELDS, JOB_FIELDS, ContextBuilder, estimate_tokens
+from .job_search import JobSearcher, job_passage
+from .reranker import CrossEncoderReranker
+from .sparse import encode_sparse, encode_sparse_query
+from .speculative import SpeculativeRetriever, SpeculativeTurn
+
+__all__ = [
+    "COMPANY_FIELDS",
+    "JOB_FIELDS",
+    "ContextBuilder",
+    "CrossEncoderReranker",
+    "JobSearcher",
+    "SpeculativeRetriever",
+    "SpeculativeTurn",
+    "encode_sparse",
+    "encode_sparse_query",
+    "estimate_tokens",
+    "job_passage",
+]
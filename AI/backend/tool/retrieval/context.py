@@ -0,0 +1,189 @@
+"""Compact retrieval context assembly to keep LLM prefill small.
+
+Retrieved payloads are deduplicated, every field is truncated to a per-field
+limit (long descriptions keep their sentences most related to the query) and
+documents are packed, in relevance order, under a token budget.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .sparse import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Qwen tokenizers average roughly 3 characters per token on Vietnamese text
+CHARS_PER_TOKEN = 3.0
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer round-trip to Ollama)."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class ContextField:
+    key: str
+    label: str
+    max_chars: Optional[int] = None  # None -> use the builder default
+    essential: bool = False  # kept when a document must be shrunk to fit the budget
+
+
+COMPANY_FIELDS = (
+    ContextField("name", "Tên", 120, essential=True),
+    ContextField("industries", "Ngành", 150, essential=True),
+    ContextField("addresses", "Địa chỉ", 150, essential=True),
+    ContextField("size", "Quy mô", 40),
+    ContextField("website", "Website", 80),
+    ContextField("description", "Mô tả"),
+)
+
+JOB_FIELDS = (
+    ContextField("position_name", "Vị trí", 120, essential=True),
+    ContextField("company", "Công ty", 120, essential=True),
+    ContextField("addresses", "Địa điểm", 150, essential=True),
+    ContextField("skills", "Kỹ năng", 150, essential=True),
+    ContextField("experience_years", "Kinh nghiệm (năm)", 10),
+    ContextField("salary", "Lương", 20),
+    ContextField("work_types", "Hình thức", 60),
+    ContextField("deadline", "Hạn nộp", 20),
+    ContextField("description", "Mô tả"),
+    ContextField("requirements", "Yêu cầu"),
+)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;") + "…"
+
+
+def _select_passages(text: str, query_tokens: set, max_chars: int) -> str:
+    """Keep the sentences sharing most words with the query, in their original order."""
+    if len(text) <= max_chars:
+        return text
+
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    if len(sentences) <= 1 or not query_tokens:
+        return _truncate(text, max_chars)
+
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(query_tokens.intersection(tokenize(sentences[i]))), i),
+    )
+    chosen: List[int] = []
+    used = 0
+    for i in ranked:
+        length = len(sentences[i]) + 1
+        if used + length > max_chars:
+            continue
+        chosen.append(i)
+        used += length
+
+    if not chosen:
+        return _truncate(sentences[ranked[0]], max_chars)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class ContextBuilder:
+    """Pack retrieved documents into a compact prompt context under a token budget.
+
+    Documents are deduplicated on the first of ``id_keys`` that has a value, so the
+    most specific id comes first: a job payload also carries its ``company_id``.
+    """
+
+    def __init__(
+        self,
+        fields: Sequence[ContextField] = COMPANY_FIELDS,
+        *,
+        token_budget: int = 600,
+        field_max_chars: int = 300,
+        id_keys: Sequence[str] = ("job_posting_id", "company_id", "name"),
+    ):
+        self.fields = tuple(fields)
+        self.token_budget = token_budget
+        self.field_max_chars = field_max_chars
+        self.id_keys = tuple(id_keys)
+
+    def _identity(self, document: Dict[str, Any]) -> Any:
+        for key in self.id_keys:
+            value = document.get(key)
+            if value not in (None, ""):
+                return (key, str(value).strip().lower())
+        return None
+
+    def _deduplicate(self, documents: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seen = set()
+        unique = []
+        for document in documents:
+            identity = self._identity(document)
+            if identity is not None and identity in seen:
+                continue
+            seen.add(identity)
+            unique.append(document)
+        return unique
+
+    def _render(self, document: Dict[str, Any], query_tokens: set, essential_only: bool = False) -> str:
+        parts = []
+        for field in self.fields:
+            if essential_only and not field.essential:
+                continue
+            value = document.get(field.key)
+            if value in (None, "", []):
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ", ".join(str(item) for item in value)
+            text = " ".join(str(value).split())
+            limit = field.max_chars or self.field_max_chars
+            parts.append(f"{field.label}: {_select_passages(text, query_tokens, limit)}")
+        return "- " + " | ".join(parts) if parts else ""
+
+    def build(self, query: str, documents: Sequence[Dict[str, Any]]) -> str:
+        """Return the packed context; documents are expected in relevance order."""
+        documents = documents or []
+        raw_tokens = estimate_tokens(str(list(documents)))
+        query_tokens = set(tokenize(query))
+
+        lines: List[str] = []
+        used = 0
+        for document in self._deduplicate(documents):
+            line = self._render(document, query_tokens)
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.token_budget:
+                # Shrink to the essential fields before giving up on this document
+                line = self._render(document, query_tokens, essential_only=True)
+                cost = estimate_tokens(line) + 1
+                if not line or used + cost > self.token_budget:
+                    break
+            if line:
+                lines.append(line)
+                used += cost
+
+        context = "\n".join(lines)
+        logger.debug(
+            "Packed retrieval context: %s docs -> %s docs, ~%s -> ~%s tokens (budget %s)",
+            len(documents),
+            len(lines),
+            raw_tokens,
+            estimate_tokens(context),
+            self.token_budget,
+        )
+        return context
+
+
+__all__ = [
+    "COMPANY_FIELDS",
+    "JOB_FIELDS",
+    "ContextBuilder",
+    "ContextField",
+    "estimate_tokens",
+]
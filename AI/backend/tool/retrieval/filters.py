@@ -0,0 +1,238 @@
+"""Compile extracted question features into Qdrant payload filters.
+
+Filtering happens inside Qdrant (backed by payload indexes created at sync
+time), so a filtered search visits only matching points instead of pulling
+top-k and discarding results in Python.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchAny,
+    MatchValue,
+    PayloadField,
+    PayloadSchemaType,
+    Range,
+)
+
+from tool.question_enhancer import QuestionEnhancer
+from tool.slot_extractor import skill_key
+from tool.text_normalizer import normalize_key
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+_THOUSANDS_PATTERN = re.compile(r"^\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*$")
+# Đơn vị phải đứng riêng thành từ: "tr" trong "trên" / "trở lên" không phải "triệu"
+_SALARY_PATTERN = re.compile(r"(\d+(?:[.,]\d+)*)\s*(tỷ|tỉ|ty|triệu|trieu|tr|m|nghìn|nghin|ngàn|ngan|k)?(?!\w)")
+_SALARY_UNITS = {
+    "tỷ": 1_000_000_000, "tỉ": 1_000_000_000, "ty": 1_000_000_000,
+    "triệu": 1_000_000, "trieu": 1_000_000, "tr": 1_000_000, "m": 1_000_000,
+    "nghìn": 1_000, "nghin": 1_000, "ngàn": 1_000, "ngan": 1_000, "k": 1_000,
+}
+_USD_PATTERN = re.compile(r"(?<!\w)usd(?!\w)|\$")
+_SALARY_UPPER_BOUND_WORDS = ("dưới", "duoi", "tối đa", "toi da", "không quá", "khong qua", "up to", "upto", "max")
+USD_TO_VND = 25_000  # Tỷ giá quy đổi lương USD để so sánh với payload (VND)
+_ENTRY_LEVEL_KEYWORDS = ("intern", "thực tập", "fresher", "mới ra trường", "chưa có kinh nghiệm")
+# Dạng đã qua normalize_key (không dấu, không dấu câu)
+_COMPANY_PREFIXES = ("cong ty", "cty", "tap doan", "co phan", "tnhh", "trach nhiem huu han")
+_COMPANY_SUFFIXES = ("jsc", "co ltd", "ltd", "corp", "corporation", "inc")
+
+# Payload indexes created by the sync jobs; the compiler only filters on these fields
+JOB_PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    "status": PayloadSchemaType.KEYWORD,
+    "locations": PayloadSchemaType.KEYWORD,
+    "company_keys": PayloadSchemaType.KEYWORD,
+    "skill_keys": PayloadSchemaType.KEYWORD,
+    "experience_years": PayloadSchemaType.INTEGER,
+    "salary": PayloadSchemaType.INTEGER,
+}
+
+COMPANY_PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    "locations": PayloadSchemaType.KEYWORD,
+    "company_keys": PayloadSchemaType.KEYWORD,
+}
+
+
+def parse_experience_years(value: Any) -> Optional[int]:
+    """Turn an extracted experience value ("3 năm", "1-2 năm", "Internship") into years."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    text = str(value).lower()
+    numbers = [float(n.replace(",", ".")) for n in _NUMBER_PATTERN.findall(text)]
+    if numbers:
+        # "1-2 năm" -> the candidate qualifies for jobs asking up to 2 years
+        return int(max(numbers))
+    if any(keyword in text for keyword in _ENTRY_LEVEL_KEYWORDS):
+        return 0
+    return None
+
+
+def _parse_amount(number: str) -> float:
+    """ "20.000.000" / "1,500" (dấu phân cách hàng nghìn) hoặc "1,5" / "2.5" (số thập phân)."""
+    if _THOUSANDS_PATTERN.match(number):
+        return float(re.sub(r"[.,]", "", number))
+    return float(number.replace(",", "."))
+
+
+def parse_salary(value: Any) -> Optional[int]:
+    """Turn an extracted salary value ("20 triệu", "15tr", "15-20 triệu", "1000 USD trở lên") into VND.
+
+    Ranges give their lower bound (the value is used as a minimum). "dưới 20 triệu"
+    / "tối đa ..." only state a maximum, so they return None.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    text = unicodedata.normalize("NFC", str(value)).lower()
+    if any(re.search(rf"(?<!\w){re.escape(word)}(?!\w)", text) for word in _SALARY_UPPER_BOUND_WORDS):
+        return None
+    amounts = _SALARY_PATTERN.findall(text)
+    if not amounts:
+        return None
+
+    # "15-20 triệu": đơn vị chỉ viết sau số cuối nhưng áp dụng cho cả khoảng
+    unit = next((unit for _, unit in amounts if unit), "")
+    amount = _parse_amount(amounts[0][0]) * _SALARY_UNITS.get(amounts[0][1] or unit, 1)
+    if _USD_PATTERN.search(text):
+        amount *= USD_TO_VND
+    return int(amount)
+
+
+def normalize_company_name(name: Any) -> str:
+    """Normalize a company name (``normalize_key``) and drop legal-form prefixes/suffixes."""
+    text = normalize_key(str(name or ""))
+    for prefix in _COMPANY_PREFIXES:
+        if text.startswith(prefix + " "):
+            text = text[len(prefix) + 1:]
+    for suffix in _COMPANY_SUFFIXES:
+        if text.endswith(" " + suffix):
+            text = text[: -len(suffix) - 1]
+    return text.strip()
+
+
+def company_keys(name: Any) -> List[str]:
+    """Keyword keys stored for a company: every leading word prefix of its normalized name.
+
+    "Công ty FPT Software" -> ["fpt", "fpt software"], so a user asking for
+    "FPT" or "FPT Software" hits the keyword index exactly.
+    """
+    words = normalize_company_name(name).split()
+    return [" ".join(words[: i + 1]) for i in range(len(words))]
+
+
+def split_values(value: Any) -> List[str]:
+    """Split "Python, SQL" (or a list) into lowercase keyword values."""
+    if not value:
+        return []
+    items = value if isinstance(value, list) else str(value).split(",")
+    return [str(item).strip().lower() for item in items if str(item).strip()]
+
+
+def skill_keys(value: Any) -> List[str]:
+    """Khóa kỹ năng chuẩn (``skill_key``) của "Python 3, SQL": giống nhau cho payload job và câu hỏi."""
+    return list(dict.fromkeys(key for key in map(skill_key, split_values(value)) if key))
+
+
+class FeatureFilterCompiler:
+    """Turn the ``ExtractFeatureQuestion`` output dict into Qdrant filters."""
+
+    def __init__(self, enhancer: Optional[QuestionEnhancer] = None):
+        self.enhancer = enhancer or QuestionEnhancer()
+
+    def _location_condition(self, features: Dict[str, Any]) -> Optional[FieldCondition]:
+        location = features.get("location")
+        if not location:
+            return None
+        locations = self.enhancer.extract_locations(str(location))
+        if not locations:
+            return None
+        return FieldCondition(key="locations", match=MatchAny(any=locations))
+
+    def _company_condition(self, features: Dict[str, Any]) -> Optional[FieldCondition]:
+        company = normalize_company_name(features.get("company"))
+        if not company:
+            return None
+        return FieldCondition(key="company_keys", match=MatchAny(any=[company]))
+
+    def compile_job_filter(self, features: Optional[Dict[str, Any]] = None) -> Filter:
+        """Filter for the job collection; only open postings are ever returned."""
+        features = features or {}
+        must: List[Any] = [FieldCondition(key="status", match=MatchValue(value="open"))]
+
+        for condition in (self._location_condition(features), self._company_condition(features)):
+            if condition is not None:
+                must.append(condition)
+
+        # Chuẩn hóa cả hai phía qua cùng từ điển: "Python" khớp job ghi "Python 3" / "python3"
+        skills = skill_keys(features.get("skills"))
+        if skills:
+            must.append(FieldCondition(key="skill_keys", match=MatchAny(any=skills)))
+
+        experience_years = parse_experience_years(features.get("experience"))
+        if experience_years is not None:
+            # Jobs asking for at most the candidate's experience, or not stating any
+            must.append(
+                Filter(
+                    should=[
+                        FieldCondition(key="experience_years", range=Range(lte=experience_years)),
+                        IsEmptyCondition(is_empty=PayloadField(key="experience_years")),
+                    ]
+                )
+            )
+
+        min_salary = parse_salary(features.get("salary"))
+        if min_salary is not None:
+            must.append(FieldCondition(key="salary", range=Range(gte=min_salary)))
+
+        return Filter(must=must)
+
+    def compile_company_filter(self, features: Optional[Dict[str, Any]] = None) -> Optional[Filter]:
+        """Filter for the company collection, or None when nothing is filterable."""
+        features = features or {}
+        must = [
+            condition
+            for condition in (self._location_condition(features), self._company_condition(features))
+            if condition is not None
+        ]
+        return Filter(must=must) if must else None
+
+
+def ensure_payload_indexes(client, collection_name: str, indexes: Dict[str, PayloadSchemaType]) -> None:
+    """Create the payload indexes a collection needs (no-op for indexes that already exist)."""
+    try:
+        existing = client.get_collection(collection_name=collection_name).payload_schema or {}
+    except Exception:
+        existing = {}
+
+    for field_name, schema in indexes.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+        )
+
+
+__all__ = [
+    "FeatureFilterCompiler",
+    "JOB_PAYLOAD_INDEXES",
+    "COMPANY_PAYLOAD_INDEXES",
+    "company_keys",
+    "ensure_payload_indexes",
+    "normalize_company_name",
+    "parse_experience_years",
+    "parse_salary",
+    "skill_keys",
+    "split_values",
+]
@@ -0,0 +1,129 @@
+"""Hybrid (dense + keyword) job posting search on top of Qdrant."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.models import Filter
+
+from setting import Settings
+from tool.database import QDrant
+
+from .filters import FeatureFilterCompiler
+from .sparse import encode_sparse_query
+
+logger = logging.getLogger(__name__)
+
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "keywords"
+
+
+def job_passage(payload: Dict[str, Any]) -> str:
+    """Short passage describing a job payload (used by the reranker)."""
+    parts = [
+        payload.get("position_name"),
+        payload.get("company"),
+        ", ".join(payload.get("skills") or []),
+        payload.get("addresses"),
+        payload.get("description"),
+    ]
+    return ". ".join(str(part) for part in parts if part)
+
+
+class JobSearcher:
+    """Search open job postings with one hybrid Qdrant query.
+
+    The dense branch (sentence embedding) and the keyword branch (sparse
+    term vector with server-side IDF) are evaluated by Qdrant under the same
+    structured filter and fused with Reciprocal Rank Fusion, so a search costs
+    one query embedding plus one round-trip.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        *,
+        embedding_model: Any = None,
+        qdrant: Optional[QDrant] = None,
+        collection_name: Optional[str] = None,
+    ):
+        self.settings = settings or Settings.load_settings()
+        self.collection_name = collection_name or self.settings.COLLECTION_JOB
+        self._embedding_model = embedding_model
+        self._qdrant = qdrant
+        self.filter_compiler = FeatureFilterCompiler()
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            from tool.model_manager import model_manager  # Local import to avoid circular dependency
+
+            self._embedding_model = model_manager.get_embedding_model(self.settings.TEXT_EMBEDDING_MODEL_ID)
+        return self._embedding_model
+
+    @property
+    def qdrant(self) -> QDrant:
+        if self._qdrant is None:
+            self._qdrant = QDrant(Settings=self.settings)
+        return self._qdrant
+
+    def search(
+        self,
+        query: str,
+        *,
+        query_filter: Optional[Filter] = None,
+        top_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the payloads of the best matching open job postings."""
+        start = time.perf_counter()
+        top_k = top_k or self.settings.JOB_SEARCH_TOP_K
+
+        dense_vector = self.embedding_model.encode(query)
+        if hasattr(dense_vector, "tolist"):
+            dense_vector = dense_vector.tolist()
+
+        points = self.qdrant.hybrid_search(
+            collection_name=self.collection_name,
+            dense_vector=dense_vector,
+            sparse_vector=encode_sparse_query(query),
+            top_k=top_k,
+            query_filter=query_filter or self.filter_compiler.compile_job_filter(),
+            prefetch_limit=self.settings.JOB_SEARCH_PREFETCH_LIMIT,
+            dense_name=DENSE_VECTOR_NAME,
+            sparse_name=SPARSE_VECTOR_NAME,
+        )
+
+        jobs = [point.payload for point in points if point.payload]
+        logger.info(
+            "Job search returned %s results in %.1f ms", len(jobs), (time.perf_counter() - start) * 1000
+        )
+        return jobs
+
+    def search_by_features(
+        self,
+        features: Dict[str, Any],
+        query: str = "",
+        top_k: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search with the dict produced by ``ExtractFeatureQuestion.extract``.
+
+        Free-text fields (title, skills, description) drive the dense and
+        keyword ranking; location, company, skills, experience and salary are
+        compiled into a payload filter evaluated by Qdrant.
+        """
+        text_parts = [
+            str(features[key])
+            for key in ("title", "skills", "company", "description")
+            if features.get(key)
+        ]
+        search_text = " ".join(text_parts) or query or str(features.get("location", ""))
+
+        return self.search(
+            search_text,
+            query_filter=self.filter_compiler.compile_job_filter(features),
+            top_k=top_k,
+        )
+
+
+__all__ = ["JobSearcher", "job_passage"]
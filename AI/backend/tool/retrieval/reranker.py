@@ -0,0 +1,190 @@
+"""Optional cross-encoder rerank stage with a latency budget and a score cache."""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from monitoring.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+_RERANK_HITS = CACHE_LOOKUPS.labels("rerank_scores", "hit")
+_RERANK_MISSES = CACHE_LOOKUPS.labels("rerank_scores", "miss")
+
+
+def query_key(query: str) -> str:
+    """NFC + casefold + collapsed whitespace, diacritics kept."""
+    return " ".join(unicodedata.normalize("NFC", query).casefold().split())
+
+
+class ScoreCache:
+    """Thread-safe LRU cache of cross-encoder scores keyed by (query, document).
+
+    The query part is ``query_key(query)``: queries that only differ in case,
+    Unicode composition or spacing reuse the same scores. Diacritics are kept
+    because they change the meaning in Vietnamese ("bán hàng" vs "ban hang")
+    and so the cross-encoder score.
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+                _RERANK_MISSES.inc()
+                return None
+            self._scores.move_to_end(key)
+            self.hits += 1
+            _RERANK_HITS.inc()
+            return score
+
+    def put(self, key: Tuple[str, str], score: float) -> None:
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class CrossEncoderReranker:
+    """Rerank retrieved candidates with a cross-encoder in one batched forward pass.
+
+    ``latency_budget_ms`` is a per-request budget measured from ``started_at``
+    (usually the start of the retrieval stage). Reranking is skipped, and the
+    first-stage order kept, when the budget is already spent or when the
+    estimated cost of scoring the uncached pairs would exceed what is left.
+
+    The first ``warmup_calls`` forward passes (lazy weight loading, CUDA/JIT
+    warm-up) are not used for the estimate. Every skip caused by the estimate
+    multiplies it by ``skip_decay``, so one slow call cannot disable reranking
+    for good: after a few skips a request runs again and re-measures the cost.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        *,
+        latency_budget_ms: float = 150.0,
+        cache_size: int = 2048,
+        warmup_calls: int = 1,
+        skip_decay: float = 0.8,
+    ):
+        self.model = model
+        self.latency_budget_ms = latency_budget_ms
+        self.cache = ScoreCache(cache_size)
+        self.warmup_calls = warmup_calls
+        self.skip_decay = skip_decay
+        # Exponential moving average of the cost of scoring one pair, learned online
+        self._ms_per_pair: Optional[float] = None
+        self._forward_calls = 0
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    @staticmethod
+    def _document_key(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _estimate_ms(self, pair_count: int) -> float:
+        if self._ms_per_pair is None:
+            return 0.0
+        return self._ms_per_pair * pair_count
+
+    def _record_cost(self, elapsed_ms: float, pair_count: int) -> None:
+        per_pair = elapsed_ms / max(pair_count, 1)
+        with self._lock:
+            self._forward_calls += 1
+            if self._forward_calls <= self.warmup_calls:
+                return
+            if self._ms_per_pair is None:
+                self._ms_per_pair = per_pair
+            else:
+                self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * per_pair
+
+    def _decay_estimate(self) -> None:
+        with self._lock:
+            if self._ms_per_pair is not None:
+                self._ms_per_pair *= self.skip_decay
+
+    def rerank(
+        self,
+        query: str,
+        documents: Sequence[Dict[str, Any]],
+        *,
+        text_fn: Callable[[Dict[str, Any]], str],
+        top_k: int,
+        started_at: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` documents ordered by cross-encoder relevance.
+
+        Args:
+            query: User query.
+            documents: First-stage candidates (already in first-stage order).
+            text_fn: Builds the passage text the cross-encoder sees for a document.
+            top_k: Number of documents to keep.
+            started_at: ``time.perf_counter()`` at the start of the request stage.
+        """
+        if len(documents) <= 1:
+            return list(documents)[:top_k]
+
+        started_at = started_at if started_at is not None else time.perf_counter()
+        remaining_ms = self.latency_budget_ms - (time.perf_counter() - started_at) * 1000
+
+        texts = [text_fn(document) for document in documents]
+        normalized_query = query_key(query)
+        keys = [(normalized_query, self._document_key(text)) for text in texts]
+        scores: List[Optional[float]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing and (remaining_ms <= 0 or self._estimate_ms(len(missing)) > remaining_ms):
+            self.skipped += 1
+            if remaining_ms > 0:
+                self._decay_estimate()
+            logger.info(
+                "Skipping rerank: %s uncached pairs, %.1f ms left of %.0f ms budget",
+                len(missing),
+                remaining_ms,
+                self.latency_budget_ms,
+            )
+            return list(documents)[:top_k]
+
+        if missing:
+            pairs = [(query, texts[i]) for i in missing]
+            forward_start = time.perf_counter()
+            predicted = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            self._record_cost((time.perf_counter() - forward_start) * 1000, len(pairs))
+
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                self.cache.put(keys[i], float(score))
+
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return [documents[i] for i in order[:top_k]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "cache_size": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "skipped": self.skipped,
+            "ms_per_pair": self._ms_per_pair,
+            "forward_calls": self._forward_calls,
+        }
+
+
+__all__ = ["CrossEncoderReranker", "ScoreCache", "query_key"]
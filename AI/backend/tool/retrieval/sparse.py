@@ -0,0 +1,46 @@
+"""Keyword (sparse) vectors used for the lexical side of hybrid search.
+
+Tokens are hashed into a fixed index space so no vocabulary has to be stored
+or shipped between the sync job and the query path. Qdrant applies the IDF
+weighting server-side (``Modifier.IDF``), so only term frequencies are sent.
+
+Tokens go through :func:`tool.text_normalizer.normalize_key`, so "ha noi" and
+"Hà Nội" hash to the same indices. Points indexed with an older tokenizer must
+be re-synced for the keyword branch to match them.
+"""
+from __future__ import annotations
+
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.models import SparseVector
+
+from tool.text_normalizer import normalize_key
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens with Vietnamese diacritics folded."""
+    if not text:
+        return []
+    return normalize_key(text).split()
+
+
+def _token_index(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+def encode_sparse(text: str) -> SparseVector:
+    """Encode a document as term-frequency sparse vector."""
+    counts = Counter(_token_index(token) for token in tokenize(text))
+    indices = sorted(counts)
+    return SparseVector(indices=indices, values=[float(counts[i]) for i in indices])
+
+
+def encode_sparse_query(text: str) -> SparseVector:
+    """Encode a query: every distinct token weighs 1, IDF does the rest."""
+    indices = sorted({_token_index(token) for token in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+__all__ = ["tokenize", "encode_sparse", "encode_sparse_query"]
@@ -0,0 +1,134 @@
+"""Speculative retrieval started from the raw user message.
+
+Reflection and intent classification are two LLM calls that run before any
+retrieval. ``SpeculativeRetriever.start`` launches the company / job searches
+for the raw message on a thread pool at the start of the turn, so they overlap
+with those LLM calls. Once the rewritten query and the final filters are
+known, ``SpeculativeTurn.take`` returns the prefetched results only if the
+filters are identical and the rewritten query is close enough to the raw
+message (cosine similarity of their embeddings); otherwise the caller runs the
+regular retrieval.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from monitoring.metrics import SPECULATIVE_RETRIEVALS
+from monitoring.tracing import span
+from tool.text_normalizer import normalize_key
+
+logger = logging.getLogger(__name__)
+
+
+def _cosine(a: Any, b: Any) -> float:
+    a = np.asarray(a, dtype=np.float32).ravel()
+    b = np.asarray(b, dtype=np.float32).ravel()
+    denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(np.dot(a, b)) / denominator if denominator else 0.0
+
+
+class _Prefetch:
+    __slots__ = ("features", "future")
+
+    def __init__(self, features: Dict[str, Any], future: Future):
+        self.features = features
+        self.future = future
+
+
+class SpeculativeTurn:
+    """Prefetched retrievals of one chat turn."""
+
+    def __init__(self, message: str, embedding_model: Any, embedding: Future, threshold: float):
+        self.message = message
+        self.embedding_model = embedding_model
+        self._embedding = embedding
+        self.threshold = threshold
+        self._prefetches: Dict[str, _Prefetch] = {}
+
+    def similarity(self, query: str) -> float:
+        """Cosine similarity between the raw message and ``query`` (1.0 if they normalize to the same key)."""
+        if normalize_key(query) == normalize_key(self.message):
+            return 1.0
+        return _cosine(self._embedding.result(), self.embedding_model.encode(query))
+
+    def take(self, kind: str, query: str, features: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Prefetched results for ``kind`` if they are valid for (query, features), else None."""
+        prefetch = self._prefetches.pop(kind, None)
+        if prefetch is None:
+            return None
+
+        if prefetch.features != (features or {}):
+            outcome = "discarded"
+        else:
+            try:
+                outcome = "used" if self.similarity(query) >= self.threshold else "discarded"
+            except Exception as e:
+                logger.warning("Speculative similarity failed: %s", e)
+                outcome = "discarded"
+
+        if outcome == "used":
+            try:
+                results = prefetch.future.result()
+            except Exception as e:
+                logger.warning("Speculative %s retrieval failed: %s", kind, e)
+                results, outcome = None, "failed"
+        else:
+            prefetch.future.cancel()
+            results = None
+
+        SPECULATIVE_RETRIEVALS.labels(kind, outcome).inc()
+        return results
+
+    def discard(self) -> None:
+        """Drop prefetches the turn did not need (e.g. chitchat)."""
+        for kind, prefetch in self._prefetches.items():
+            prefetch.future.cancel()
+            SPECULATIVE_RETRIEVALS.labels(kind, "unused").inc()
+        self._prefetches.clear()
+
+
+class SpeculativeRetriever:
+    """Thread pool running prefetches; one instance per process (see ``model_manager``)."""
+
+    def __init__(self, embedding_model: Any, *, threshold: float = 0.9, max_workers: int = 4):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative")
+
+    def _submit(self, name: str, function: Callable[[], Any]) -> Future:
+        # Chạy trong context hiện tại để span của prefetch nằm trong trace của request
+        context = contextvars.copy_context()
+
+        def run():
+            with span(name):
+                return function()
+
+        return self.executor.submit(context.run, run)
+
+    def start(
+        self,
+        message: str,
+        fetchers: Dict[str, Callable[[], List[Dict[str, Any]]]],
+        features: Dict[str, Dict[str, Any]],
+    ) -> SpeculativeTurn:
+        """Start embedding ``message`` and every fetcher (``{"companies": fn, "jobs": fn}``) concurrently.
+
+        ``features[kind]`` are the filters each fetcher uses; ``take`` only
+        reuses a prefetch whose filters match the final ones.
+        """
+        embedding = self._submit("speculative.embedding", lambda: self.embedding_model.encode(message))
+        turn = SpeculativeTurn(message, self.embedding_model, embedding, self.threshold)
+        for kind, fetch in fetchers.items():
+            turn._prefetches[kind] = _Prefetch(features.get(kind) or {}, self._submit(f"speculative.{kind}", fetch))
+        return turn
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["SpeculativeRetriever", "SpeculativeTurn"]
@@ -1,30 +1,71 @@
+import threading
+from collections import OrderedDict
+
 import numpy as np
 
+from monitoring.metrics import record_cache_lookup
+from tool.shared_arrays import fingerprint
+from tool.text_normalizer import normalize_key
+
 class SemanticRouter():
-    def __init__(self, embedding, routes):
+    def __init__(self, embedding, routes, cache_size: int = 1024, store=None):
         self.routes = routes
         self.embedding = embedding
         self.routesEmbedding = {}
 
+        # Embedding của mỗi route được chuẩn hóa một lần ở đây; có store (SharedArrayStore)
+        # thì ma trận được mmap từ file .npy để các worker gunicorn dùng chung
         for route in self.routes:
-            self.routesEmbedding[
-                route.name
-            ] = self.embedding.encode(route.samples)
+            self.routesEmbedding[route.name] = self._route_matrix(route, store)
+
+        # Cache (score, route) theo key đã chuẩn hóa: "Hà Nội?" và "ha noi" dùng chung một kết quả
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _route_matrix(self, route, store):
+        def build():
+            matrix = np.asarray(self.embedding.encode(route.samples))
+            return matrix / np.linalg.norm(matrix)
+
+        if store is None:
+            return build()
+        model_name = getattr(getattr(self.embedding, "config", None), "name", type(self.embedding).__name__)
+        return store.get_or_build(f"router-{route.name}", fingerprint(model_name, list(route.samples)), build)
 
     def get_routes(self):
         return self.routes
 
     def guide(self, query):
-        queryEmbedding = self.embedding.encode([query]) 
+        if self.cache_size <= 0:
+            return self._score(query)
+
+        key = normalize_key(query)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        record_cache_lookup("semantic_router", cached is not None)
+        if cached is not None:
+            return cached
+
+        result = self._score(query)
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _score(self, query):
+        queryEmbedding = self.embedding.encode([query])
         queryEmbedding = queryEmbedding / np.linalg.norm(queryEmbedding)
         scores = []
 
         # Calculate the cosine similarity of the query embedding with the sample embeddings of the router.
 
         for route in self.routes:
-            routesEmbedding = self.routesEmbedding[route.name] / np.linalg.norm(self.routesEmbedding[route.name])
-            score = np.mean(np.dot(routesEmbedding, queryEmbedding.T).flatten())
+            score = np.mean(np.dot(self.routesEmbedding[route.name], queryEmbedding.T).flatten())
             scores.append((score, route.name))
 
         scores.sort(reverse=True)
-        return scores[0]
\ No newline at end of file
+        return scores[0]
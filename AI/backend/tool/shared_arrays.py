@@ -0,0 +1,54 @@
+"""
+Mảng NumPy chỉ đọc (router embeddings, ...) lưu thành file ``.npy`` và mở bằng mmap.
+
+Các worker gunicorn (và các lần khởi động sau) map cùng một file nên dùng chung
+page cache của hệ điều hành thay vì mỗi process giữ một bản copy trên heap.
+Tên file chứa fingerprint của dữ liệu đầu vào (model + samples): đổi model hoặc
+samples thì tự tính lại, không cần xóa file cũ bằng tay.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class SharedArrayStore:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "ai-recruitment-artifacts")
+        self._lock = threading.Lock()
+
+    def path(self, name: str, key: str) -> str:
+        return os.path.join(self.directory, f"{name}-{key}.npy")
+
+    def get_or_build(self, name: str, key: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Trả về mảng read-only được mmap từ ``<directory>/<name>-<key>.npy``;
+        file chưa có thì gọi ``build()`` và ghi file (atomic) trước.
+        """
+        path = self.path(name, key)
+        with self._lock:
+            if not os.path.exists(path):
+                array = np.ascontiguousarray(build())
+                os.makedirs(self.directory, exist_ok=True)
+                # Ghi ra file tạm rồi rename: process khác không bao giờ đọc file ghi dở
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy.tmp")
+                try:
+                    with os.fdopen(fd, "wb") as handle:
+                        np.save(handle, array, allow_pickle=False)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+__all__ = ["SharedArrayStore", "fingerprint"]
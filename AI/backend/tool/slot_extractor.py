@@ -0,0 +1,327 @@
+"""
+Rule-based trích xuất title/location/experience/salary/skills trước khi gọi LLM.
+
+Câu như "Tìm việc Java ở Hà Nội 2 năm kinh nghiệm" parse được hoàn toàn bằng
+bảng từ khóa của ``QuestionEnhancer`` + từ điển kỹ năng (bảng ``skill``) +
+vài regex. Extractor trả về các trường đã chắc chắn và một ``confidence``:
+tỷ lệ từ mang nội dung (không phải stopword) đã được giải thích bởi các trường
+đó. Từ phủ định / so sánh ("không ở Hà Nội", "dưới 2 năm", "ít nhất") luôn tính
+là chưa giải thích: rule chỉ trích xuất giá trị, không hiểu chúng đảo hay giới
+hạn nghĩa của giá trị đó. ``confidence == 1.0`` nghĩa là không còn từ nào "lạ" trong câu, nên
+``ExtractFeatureQuestion`` có thể bỏ qua LLM; ngược lại LLM chỉ được dùng cho
+các trường còn thiếu.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tool.question_enhancer import InfoType, QuestionEnhancer
+from tool.text_normalizer import fold_diacritics, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Dùng khi không đọc được bảng skill (offline, benchmark) và để bổ sung alias phổ biến
+DEFAULT_SKILLS = (
+    "Python", "Java", "JavaScript", "TypeScript", "C++", "C#", ".NET", "PHP", "Golang", "Ruby",
+    "Kotlin", "Swift", "Dart", "Flutter", "React", "React.js", "ReactJS", "React Native", "Vue.js",
+    "VueJS", "Angular", "Node.js", "NodeJS", "Django", "Flask", "FastAPI", "Spring", "Spring Boot",
+    "Laravel", "SQL", "MySQL", "PostgreSQL", "MongoDB", "Redis", "Docker", "Kubernetes", "AWS",
+    "Azure", "GCP", "Linux", "Git", "HTML", "CSS", "Unity", "Android", "iOS", "Figma", "Photoshop",
+    "Excel", "Power BI", "Tableau", "Machine Learning", "Deep Learning", "TensorFlow", "PyTorch",
+    "Selenium", "DevOps",
+)
+
+# Tên kỹ năng mà normalize_text sẽ làm mất (dấu câu) -> token thay thế, áp dụng cho cả từ điển lẫn câu hỏi
+_SKILL_ALIASES = {"c++": "cpp", "c#": "csharp", "f#": "fsharp", ".net": "dotnet"}
+_SKILL_ALIAS_PATTERN = re.compile(r"c\+\+|c#|f#|\.net", re.IGNORECASE)
+
+# Hiển thị địa điểm theo dạng prompt trích xuất đang dùng
+_LOCATION_DISPLAY = {"hà nội": "Hà Nội", "tp.hcm": "Hồ Chí Minh", "đà nẵng": "Đà Nẵng"}
+
+# "2 năm", "1-2 năm" (-> "1 2 nam" sau chuẩn hóa), "1 đến 2 năm", "3+ years"
+_EXPERIENCE_PATTERN = re.compile(r"\b(\d+)(?: (?:den |toi )?(\d+))? ?(nam|years?|yrs?)\b")
+_ENTRY_LEVEL_PHRASES = ("fresher", "mới ra trường", "chưa có kinh nghiệm")
+# "lương 20 triệu", "từ 15-20tr", "1000 usd" (dạng không dấu, sau chuẩn hóa); bắt buộc có đơn vị.
+# Cụm mức tối thiểu ("từ", "trên", "ít nhất") thuộc về trường: lương luôn được lọc như mức tối thiểu.
+# Mức tối đa ("dưới", "tối đa") thì không phải: bỏ qua, để LLM trích xuất nguyên văn.
+_SALARY_PATTERN = re.compile(
+    r"\b(?:(?:muc )?luong (?:la )?|salary |thu nhap )?"
+    r"(?:(duoi|toi da|khong qua|under|up to) |(?:tu|tren|khoang|it nhat|toi thieu|from|over) )?"
+    r"(\d+)(?: (?:den |toi )?(\d+))? ?(trieu|tr|cu|usd)\b"
+)
+# "1,5 triệu" / "20.000.000": chuẩn hóa bỏ dấu câu làm sai số, để LLM xử lý
+_SEPARATED_NUMBER = re.compile(r"\d[.,]\d")
+
+_ROLE_SUFFIXES = {"developer", "dev", "engineer", "programmer", "tester", "architect", "admin"}
+_ROLE_PREFIXES = (("lap", "trinh", "vien"), ("ky", "su"))
+_SENIORITY = {"senior", "junior", "middle", "lead", "intern"}
+
+# Từ không mang thông tin trích xuất (dạng không dấu)
+_STOPWORDS = frozenset(
+    """
+    tim kiem viec lam cong job jobs o tai in at for of to toi minh em muon can co khong nao cac nhung
+    mot dang tuyen dung cho ve voi va hoac thi la gi nhu the kinh nghiem nam vi tri
+    yeu cau ky nang biet hay giup ban xem danh sach nhe a an with experience year years looking need
+    want find i me my please any some
+    """.split()
+)
+
+
+# Từ phủ định / so sánh (dạng không dấu): đổi nghĩa của trường đứng sau nên không bao giờ là stopword
+_QUALIFIER_PHRASES = frozenset(
+    tuple(phrase.split())
+    for phrase in (
+        "khong", "ko", "chang", "tru", "ngoai", "ngoai tru", "tren", "duoi", "hon", "it nhat", "toi thieu",
+        "toi da", "not", "except", "under", "over", "below", "above", "at least", "at most",
+        "more than", "less than",
+    )
+)
+_MAX_QUALIFIER = max(len(phrase) for phrase in _QUALIFIER_PHRASES)
+_QUESTION_PARTICLE = "khong"  # "... có tuyển Java không (ạ)?": cuối câu là câu hỏi có/không, không phải phủ định
+
+
+def _qualifier_positions(folded: Sequence[str]) -> List[int]:
+    positions = []
+    for i in range(len(folded)):
+        for size in range(min(_MAX_QUALIFIER, len(folded) - i), 0, -1):
+            if tuple(folded[i:i + size]) in _QUALIFIER_PHRASES:
+                if size == 1 and folded[i] == _QUESTION_PARTICLE and all(t in _STOPWORDS for t in folded[i + 1:]):
+                    break
+                positions.extend(range(i, i + size))
+                break
+    return positions
+
+
+def _replace_skill_aliases(text: str) -> str:
+    return _SKILL_ALIAS_PATTERN.sub(lambda m: f" {_SKILL_ALIASES[m.group(0).lower()]} ", text)
+
+
+def _phrase_key(text: str) -> Tuple[str, ...]:
+    return tuple(fold_diacritics(normalize_text(_replace_skill_aliases(text))).split())
+
+
+_SKILL_VERSION = re.compile(r"^v?\d+$")
+_SKILL_TRAILING_VERSION = re.compile(r"^([a-z][a-z+#]{2,}?)\d+$")
+
+
+def skill_key(name: str) -> str:
+    """
+    Khóa chuẩn của một kỹ năng, dùng chung cho payload job và filter từ câu hỏi.
+
+    "Python 3", "python3", "Python" -> "python"; "React.js", "ReactJS" -> "react";
+    "C++" -> "cpp". Bỏ số phiên bản ở cuối và hậu tố "js".
+    """
+    words = list(_phrase_key(name))
+    while len(words) > 1 and _SKILL_VERSION.match(words[-1]):
+        words.pop()
+    match = _SKILL_TRAILING_VERSION.match(words[-1]) if words else None
+    if match:
+        words[-1] = match.group(1)
+    key = "".join(words)
+    if key.endswith("js") and len(key) > 2:
+        key = key[:-2]
+    return key
+
+
+@dataclass
+class RuleExtraction:
+    fields: Dict[str, str] = field(default_factory=dict)
+    confidence: float = 0.0
+    unexplained: List[str] = field(default_factory=list)  # từ nội dung chưa được trường nào giải thích
+    # Trường đứng ngay sau từ phủ định / so sánh ("không ở Hà Nội", "dưới 2 năm"): giá trị
+    # rule trích ra ngược nghĩa hoặc thiếu điều kiện, phải để LLM quyết định
+    qualified: List[str] = field(default_factory=list)
+
+    @property
+    def fully_resolved(self) -> bool:
+        return bool(self.fields) and not self.unexplained
+
+
+class RuleBasedFeatureExtractor:
+    """Trích xuất đặc trưng câu hỏi tìm việc bằng từ điển + regex, không cần LLM."""
+
+    def __init__(self, skills: Optional[Iterable[str]] = None, enhancer: Optional[QuestionEnhancer] = None):
+        self.enhancer = enhancer or QuestionEnhancer()
+        self._skills: Dict[Tuple[str, ...], str] = {}
+        for name in skills if skills is not None else DEFAULT_SKILLS:
+            key = _phrase_key(name)
+            # Bỏ tên 1 ký tự ("C", "R"): dễ trùng với từ thường trong câu tiếng Việt
+            if key and len("".join(key)) > 1:
+                self._skills.setdefault(key, name.strip())
+        self._entry_levels = {_phrase_key(phrase): phrase for phrase in _ENTRY_LEVEL_PHRASES}
+        self._max_phrase = max((len(key) for key in list(self._skills) + list(self._entry_levels)), default=1)
+
+    def _match_phrases(self, folded: Sequence[str], covered: List[bool], table: Dict[Tuple[str, ...], str]) -> List[Tuple[int, int, str]]:
+        """Khớp cụm dài nhất trước, không chồng lên token đã dùng."""
+        found = []
+        i = 0
+        while i < len(folded):
+            for size in range(min(self._max_phrase, len(folded) - i), 0, -1):
+                value = table.get(tuple(folded[i:i + size]))
+                if value is not None and not any(covered[i:i + size]):
+                    found.append((i, i + size, value))
+                    covered[i:i + size] = [True] * size
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def _title(self, words: Sequence[str], folded: Sequence[str], covered: List[bool], skills: List[Tuple[int, int, str]]) -> Optional[str]:
+        def with_seniority(start: int, title: str) -> str:
+            if start > 0 and folded[start - 1] in _SENIORITY and not covered[start - 1]:
+                covered[start - 1] = True
+                return f"{words[start - 1].capitalize()} {title}"
+            return title
+
+        for start, end, skill in skills:
+            # "Java developer" -> title "Java Developer"
+            if end < len(folded) and folded[end] in _ROLE_SUFFIXES and not covered[end]:
+                covered[end] = True
+                return with_seniority(start, f"{skill} {words[end].capitalize()}")
+            # "lập trình viên Java" -> title giữ nguyên cụm tiếng Việt
+            for prefix in _ROLE_PREFIXES:
+                head = start - len(prefix)
+                if head >= 0 and tuple(folded[head:start]) == prefix and not any(covered[head:start]):
+                    covered[head:start] = [True] * len(prefix)
+                    return with_seniority(head, " ".join(list(words[head:start]) + [skill]))
+
+        # "senior developer" (không kèm kỹ năng) -> giữ nguyên như người dùng gõ
+        for index, token in enumerate(folded):
+            if token in _ROLE_SUFFIXES and not covered[index]:
+                covered[index] = True
+                return with_seniority(index, words[index])
+        return None
+
+    def extract(self, query: str) -> RuleExtraction:
+        text = _replace_skill_aliases(query or "")
+        normalized = normalize_text(text)
+        words = normalized.split()
+        folded = fold_diacritics(normalized).split()
+        if not words:
+            return RuleExtraction()
+
+        covered = [False] * len(words)
+        token_at = {}
+        offset = 0
+        for index, word in enumerate(words):
+            token_at[offset] = index
+            token_at[offset + len(word)] = index + 1
+            offset += len(word) + 1
+
+        fields: Dict[str, str] = {}
+        spans: Dict[str, List[Tuple[int, int]]] = {}
+
+        locations = []
+        for start, end, info_type, canonical in self.enhancer.find_keywords(text):
+            if info_type is not InfoType.LOCATION or canonical == "remote":
+                continue
+            first, last = token_at[start], token_at[end]
+            covered[first:last] = [True] * (last - first)
+            spans.setdefault("location", []).append((first, last))
+            display = _LOCATION_DISPLAY.get(canonical, canonical.title())
+            if display not in locations:
+                locations.append(display)
+        if locations:
+            fields["location"] = ", ".join(locations)
+
+        folded_text = " ".join(folded)
+        for match in _EXPERIENCE_PATTERN.finditer(folded_text):
+            low, high, unit = match.groups()
+            years = f"{low}-{high}" if high else low
+            fields["experience"] = f"{years} năm" if unit == "nam" else f"{years} years"
+            first, last = token_at[match.start()], token_at[match.end()]
+            covered[first:last] = [True] * (last - first)
+            spans["experience"] = [(first, last)]
+            break
+        else:
+            entry_levels = self._match_phrases(folded, covered, self._entry_levels)
+            if entry_levels:
+                fields["experience"] = entry_levels[0][2]
+                spans["experience"] = [entry_levels[0][:2]]
+
+        if not _SEPARATED_NUMBER.search(query or ""):
+            for match in _SALARY_PATTERN.finditer(folded_text):
+                upper_bound, low, high, unit = match.groups()
+                if upper_bound:
+                    break
+                amount = f"{low}-{high}" if high else low
+                fields["salary"] = f"{amount} USD" if unit == "usd" else f"{amount} triệu"
+                first, last = token_at[match.start()], token_at[match.end()]
+                covered[first:last] = [True] * (last - first)
+                spans["salary"] = [(first, last)]
+                break
+
+        skills = self._match_phrases(folded, covered, self._skills)
+        if skills:
+            fields["skills"] = ", ".join(dict.fromkeys(skill for _, _, skill in skills))
+            spans["skills"] = [(start, end) for start, end, _ in skills]
+
+        title = self._title(words, folded, covered, skills)
+        if title:
+            fields["title"] = title
+
+        qualifiers = set(_qualifier_positions(folded))
+        content = [i for i, token in enumerate(folded) if covered[i] or i in qualifiers or token not in _STOPWORDS]
+        unexplained = [words[i] for i in content if not covered[i]]
+        confidence = (len(content) - len(unexplained)) / len(content) if content else 0.0
+        qualified = [
+            name for name, field_spans in spans.items()
+            if any(self._qualified(start, folded, covered, qualifiers) for start, _ in field_spans)
+        ]
+        return RuleExtraction(
+            fields=fields, confidence=round(confidence, 3), unexplained=unexplained, qualified=qualified
+        )
+
+    @staticmethod
+    def _qualified(start: int, folded: Sequence[str], covered: List[bool], qualifiers: set) -> bool:
+        """
+        Cụm bắt đầu ở ``start`` có từ phủ định / so sánh đứng trước, chỉ cách bởi stopword.
+
+        "không ở Hà Nội", "ngoài Hà Nội", "dưới 2 năm" -> True. Từ so sánh nằm trong chính
+        cụm đã khớp ("từ 15 triệu") thuộc về trường nên không tính.
+        """
+        i = start - 1
+        while i >= 0 and not covered[i]:
+            if i in qualifiers:
+                return True
+            if folded[i] not in _STOPWORDS:
+                return False
+            i -= 1
+        return False
+
+
+_skill_names: Optional[List[str]] = None
+_skill_lock = threading.Lock()
+
+
+def load_skill_names(settings=None) -> List[str]:
+    """
+    Từ điển kỹ năng = bảng ``skill`` (PostgreSQL/Supabase) + ``DEFAULT_SKILLS``.
+
+    Chỉ đọc database một lần cho cả process; lỗi kết nối hoặc
+    ``LOAD_SKILLS_FROM_DATABASE=false`` thì dùng danh sách mặc định.
+    """
+    global _skill_names
+    if _skill_names is not None:
+        return _skill_names
+
+    with _skill_lock:
+        if _skill_names is None:
+            names: List[str] = []
+            if settings is not None and settings.LOAD_SKILLS_FROM_DATABASE:
+                try:
+                    from tool.database import PostgreSQLClient
+
+                    names = PostgreSQLClient(Settings=settings).get_skill_names()
+                except Exception as e:
+                    logger.warning("Could not load skill dictionary, using defaults: %s", e)
+            _skill_names = list(dict.fromkeys(list(names) + list(DEFAULT_SKILLS)))
+    return _skill_names
+
+
+__all__ = ["DEFAULT_SKILLS", "RuleBasedFeatureExtractor", "RuleExtraction", "load_skill_names", "skill_key"]
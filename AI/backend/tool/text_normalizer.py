@@ -0,0 +1,94 @@
+"""
+Chuẩn hóa text tiếng Việt dùng chung cho keyword matching và cache key.
+
+Người dùng gõ "Hà Nội", "ha noi", "HÀ  NỘI!" hay dán text ở dạng NFD (dấu tách
+rời) — các hàm dưới đây đưa chúng về cùng một dạng:
+
+* ``normalize_text``: NFC, lowercase, bỏ dấu câu, gộp khoảng trắng (giữ dấu tiếng Việt)
+* ``fold_diacritics``: bỏ dấu (``"hà nội" -> "ha noi"``, ``"đ" -> "d"``), giữ nguyên độ dài
+  để vị trí ký tự trên text gốc và text đã bỏ dấu khớp nhau
+* ``normalize_key``: ``fold_diacritics(normalize_text(text))``, memoize cho chuỗi ngắn —
+  dùng làm key cho route cache, score cache, sparse token...
+* ``normalize_and_fold``: cặp (text đã chuẩn hóa, text đã bỏ dấu), memoize cho chuỗi ngắn —
+  dùng cho keyword matching cần vị trí trên cả hai dạng
+
+Bỏ dấu dùng ``str.translate`` với bảng dựng sẵn cho các khối Latin có chữ tiếng
+Việt, nên chạy ở tốc độ C và không cần tách NFD cho từng ký tự.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Chuỗi dài hơn ngưỡng này (vd: mô tả công việc) không được memoize
+MEMOIZE_MAX_CHARS = 256
+
+_PUNCTUATION = re.compile(r"[^\w\s]+|_+")
+
+# Latin-1 Supplement, Latin Extended-A/B và Latin Extended Additional (ạ, ế, ộ, ữ...)
+_LATIN_RANGES = ((0x00C0, 0x0250), (0x1E00, 0x1F00))
+
+
+def _build_fold_table() -> Dict[int, str]:
+    table: Dict[int, str] = {ord("đ"): "d", ord("Đ"): "D"}
+    for start, stop in _LATIN_RANGES:
+        for code_point in range(start, stop):
+            decomposed = unicodedata.normalize("NFD", chr(code_point))
+            base = decomposed[0]
+            if len(decomposed) > 1 and base.isascii() and all(unicodedata.combining(c) for c in decomposed[1:]):
+                table[code_point] = base
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def normalize_text(text: str) -> str:
+    """NFC + lowercase + thay dấu câu bằng khoảng trắng + gộp khoảng trắng."""
+    if not text:
+        return ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def fold_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt, giữ nguyên độ dài chuỗi (text nên ở dạng NFC)."""
+    if not text or text.isascii():
+        return text
+    return text.translate(_FOLD_TABLE)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_key_cached(text: str) -> str:
+    return fold_diacritics(normalize_text(text))
+
+
+def normalize_key(text: str) -> str:
+    """Key không phân biệt hoa thường, dấu và dấu câu: ``"Hà Nội!" -> "ha noi"``."""
+    if not text:
+        return ""
+    if len(text) <= MEMOIZE_MAX_CHARS:
+        return _normalize_key_cached(text)
+    return fold_diacritics(normalize_text(text))
+
+
+@lru_cache(maxsize=8192)
+def _normalize_and_fold_cached(text: str) -> Tuple[str, str]:
+    normalized = normalize_text(text)
+    return normalized, fold_diacritics(normalized)
+
+
+def normalize_and_fold(text: str) -> Tuple[str, str]:
+    """``(normalize_text(text), fold_diacritics(normalize_text(text)))``, hai chuỗi cùng độ dài."""
+    if not text:
+        return "", ""
+    if len(text) <= MEMOIZE_MAX_CHARS:
+        return _normalize_and_fold_cached(text)
+    normalized = normalize_text(text)
+    return normalized, fold_diacritics(normalized)
+
+
+__all__ = ["MEMOIZE_MAX_CHARS", "fold_diacritics", "normalize_and_fold", "normalize_key", "normalize_text"]
@@ -26,6 +26,9 @@ returns setof record
 language sql
 as $$
 select
+  j.job_posting_id,
+  j.company_id,
+  c.name as company_name,
   j.position_name,
   j.job_description,
   j.requirements,
@@ -36,16 +39,19 @@ select
   j.benefits,
   j.working_time,
   j.status,
+  string_agg(distinct a.address_detail, ' / ') as addresses,
   string_agg(distinct wt.work_type_name, ', ') as work_types,
   string_agg(distinct i.name, ', ') as industries,
   string_agg(distinct s.skill_name, ', ') as skills
 from
   job_posting j
-  join work_type wt on wt.job_posting_id = j.job_posting_id
-  join job_posting_industry jpi on jpi.job_posting_id = j.job_posting_id
-  join industry i on jpi.industry_id = i.industry_id
-  join job_posting_skill jpk on jpk.job_posting_id = j.job_posting_id
-  join skill s on s.skill_id = jpk.skill_id
+  join company c on c.company_id = j.company_id
+  left join address a on a.company_id = c.company_id
+  left join work_type wt on wt.job_posting_id = j.job_posting_id
+  left join job_posting_industry jpi on jpi.job_posting_id = j.job_posting_id
+  left join industry i on jpi.industry_id = i.industry_id
+  left join job_posting_skill jpk on jpk.job_posting_id = j.job_posting_id
+  left join skill s on s.skill_id = jpk.skill_id
 group by
-  j.job_posting_id, j.job_description
+  j.job_posting_id, c.name
 $$;